@@ -2,7 +2,7 @@ from math import *
 import numpy as np
 
 from loadnavdata import load_navdata
-from bluesky.tools import geo
+from bluesky.tools import geo, position
 from bluesky.tools.aero import nm
 from bluesky.tools.misc import findall
 
@@ -95,6 +95,8 @@ class Navdatabase:
 
         self.rwythresholds = rwythresholds
 
+        position.clearcache()
+
     def defwpt(self,name=None,lat=None,lon=None,wptype=None):
 
         # Prevent polluting the database: check arguments
@@ -133,6 +135,8 @@ class Navdatabase:
         self.wpfreq.append(0.0)               # frequency [kHz/MHz]
         self.wpdesc.append("Custom waypoint") # description
 
+        position.clearcache()
+
          # Update screen info
         bs.scr.addnavwpt(name.upper(),lat,lon)
 
@@ -3,8 +3,11 @@ import os
 import sys
 import shutil
 
+# Headless fast-time batch mode: a single simulation loop without gui
+headless = ('--headless' in sys.argv)
+
 # This file is used to start the gui mainloop or a single node simulation loop
-node_only = ('--node' in sys.argv)
+node_only = ('--node' in sys.argv) or headless
 
 def init():
     '''Initialize configuration.
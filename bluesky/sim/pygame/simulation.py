@@ -1,6 +1,6 @@
 import time
 import bluesky as bs
-from bluesky.tools import datalog, areafilter, plugin
+from bluesky.tools import datalog, areafilter, plugin, scheduler
 from bluesky.tools.misc import txt2tim,tim2txt
 from bluesky import stack
 from bluesky.traf.metric import Metric
@@ -185,6 +185,7 @@ class Simulation:
         bs.traf.reset()
         datalog.reset()
         areafilter.reset()
+        scheduler.reset()
         self.delclock  = 0.0   # SImulated clock time at simt=0.
         self.simtclock = 0.0
 
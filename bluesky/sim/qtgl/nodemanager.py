@@ -1,4 +1,5 @@
 """ NodeManager manages I/O with the simulation processes on the Sim side. """
+import sys
 from multiprocessing.connection import Client
 try:
     from PyQt5.QtCore import QEvent
@@ -7,10 +8,11 @@ except ImportError:
 
 # Local imports
 import bluesky as bs
-from bluesky import stack
+from bluesky import settings, stack
 from bluesky.tools import plugin
+from bluesky.tools.misc import txt2tim
 from timer import Timer
-from simevents import SetNodeIdType, SetActiveNodeType, AddNodeType
+from simevents import SetNodeIdType, SetActiveNodeType, AddNodeType, StackTextEventType
 # import faulthandler
 # faulthandler.enable()
 
@@ -22,6 +24,19 @@ active     = True
 
 def run():
     global connection
+    if settings.headless:
+        # Headless batch run: no connection to a main process. The scenario
+        # file is passed with --scenfile, the optional end time of the run
+        # with --tend (in seconds or HH:MM:SS)
+        plugin.init()
+        stack.init()
+        fname = sys.argv[sys.argv.index('--scenfile') + 1] if '--scenfile' in sys.argv[:-1] else None
+        tend  = sys.argv[sys.argv.index('--tend') + 1] if '--tend' in sys.argv[:-1] else None
+        if tend is not None:
+            tend = txt2tim(tend) if ':' in tend else float(tend)
+        bs.sim.runBatch(fname, tend)
+        return
+
     connection = Client(('localhost', 6000), authkey='bluesky')
     plugin.init()
     stack.init()
@@ -31,11 +46,17 @@ def run():
 
 
 def close():
-    connection.close()
+    if connection is not None:
+        connection.close()
 
 
 def processEvents():
     global nodeid, active
+    # Without connection (headless) there are no events, and no gui to
+    # send timed updates to
+    if connection is None:
+        return
+
     # Process incoming data, and send to sim
     while connection.poll():
         (eventtype, event) = connection.recv()
@@ -54,12 +75,19 @@ def processEvents():
 
 
 def sendEvent(event):
+    if connection is None:
+        # Headless: only text output is shown, on the console
+        if event.type() == StackTextEventType and event.disptext:
+            print event.disptext
+        return
+
     # Send event to the main process
     connection.send((int(event.type()), event))
 
 
 def addNodes(count):
-    connection.send((AddNodeType, count))
+    if connection is not None:
+        connection.send((AddNodeType, count))
 
 
 def isActive():
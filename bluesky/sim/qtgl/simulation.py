@@ -14,7 +14,7 @@ from simevents import StackTextEventType, BatchEventType, BatchEvent, \
     SimStateEvent, SimQuitEventType, StackInitEvent
 from bluesky import settings, stack
 from bluesky.traf import Metric
-from bluesky.tools import datalog, areafilter, plugin
+from bluesky.tools import datalog, areafilter, plugin, scheduler
 from bluesky.tools.misc import txt2tim, tim2txt
 
 onedayinsec = 24 * 3600  # [s] time of one day in seconds for clock time
@@ -74,44 +74,22 @@ class Simulation(QObject):
         manager.sendEvent(StackInitEvent(stackdict))
 
         while self.running:
-            if self.state == Simulation.op:
-                # Plugins pre-update
-                plugin.preupdate(self.simt)
-                # Datalog pre-update (communicate current sim time to loggers)
-                datalog.preupdate(self.simt)
-
-            # Update screen logic
-            bs.scr.update()
-
             # Simulation starts as soon as there is traffic, or pending commands
             if self.state == Simulation.init:
-                if bs.traf.ntraf > 0 or len(stack.get_scendata()[0]) > 0:
+                if bs.traf.ntraf > 0 or stack.has_scendata():
                     self.start()
                     if self.benchdt > 0.0:
                         self.fastforward(self.benchdt)
                         self.bencht = time.time()
 
-            if self.state == Simulation.op:
-                stack.checkfile(self.simt)
-
-            # Always update stack
-            stack.process()
+            # Update screen logic
+            bs.scr.update()
 
             if self.state == Simulation.op:
-
-                bs.traf.update(self.simt, self.simdt)
-
-                # Update metrics
-                self.metric.update()
-
-                # Update plugins
-                plugin.update(self.simt)
-
-                # Update loggers
-                datalog.postupdate()
-
-                # Update time for the next timestep
-                self.simt += self.simdt
+                self.step()
+            else:
+                # Always update stack
+                stack.process()
 
             # Update clock
             self.simtclock = (self.deltclock + self.simt) % onedayinsec
@@ -140,6 +118,64 @@ class Simulation(QObject):
                 self.sendState()
                 self.prevstate = self.state
 
+    def step(self):
+        """ Advance the simulation with one time step. """
+        # Plugins pre-update
+        plugin.preupdate(self.simt)
+        # Datalog pre-update (communicate current sim time to loggers)
+        datalog.preupdate(self.simt)
+
+        stack.checkfile(self.simt)
+        stack.process()
+
+        bs.traf.update(self.simt, self.simdt)
+
+        # Update metrics
+        self.metric.update()
+
+        # Update plugins
+        plugin.update(self.simt)
+
+        # Update loggers
+        datalog.postupdate()
+
+        # Update time for the next timestep
+        self.simt += self.simdt
+
+    def runBatch(self, fname=None, tend=None):
+        """ Headless fast-time batch run of scenario fname: time steps are
+            taken in a tight loop without screen updates or event processing
+            (a headless run has no connection to poll). The run ends at
+            simulation time tend [s], when the scenario is done (no traffic
+            and no pending scenario commands), at the fast-forward stop time,
+            or on HOLD/STOP/QUIT from the scenario. """
+        if fname:
+            result = stack.ic(fname)
+            if result is not None and result is not True:
+                print result[1]
+                if not result[0]:
+                    return
+
+        self.start()
+        self.fastforward()
+        nsteps  = 0
+        tstart  = time.time()
+        while self.running and self.state == Simulation.op:
+            self.step()
+            nsteps += 1
+
+            # Stop at the end time, the fast-forward stop time, or when the
+            # scenario is done
+            if (tend is not None and self.simt >= tend) or \
+                    (self.ffstop is not None and self.simt >= self.ffstop) or \
+                    (bs.traf.ntraf == 0 and not stack.has_scendata()):
+                break
+
+        trun = max(1e-6, time.time() - tstart)
+        print 'Batch complete: %d steps (%s simulated) in %.2f seconds, %.0f steps/s.' % \
+            (nsteps, tim2txt(self.simt), trun, nsteps / trun)
+        self.stop()
+
     def stop(self):
         self.state = Simulation.end
         datalog.reset()
@@ -164,6 +200,7 @@ class Simulation(QObject):
         stack.reset()
         datalog.reset()
         areafilter.reset()
+        scheduler.reset()
         bs.scr.reset()
 
     def quit(self):
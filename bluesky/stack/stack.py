@@ -17,25 +17,39 @@ Created by  : Jacco M. Hoekstra (TU Delft)
 """
 from math import *
 from random import seed
+from heapq import heapify, heappush, heappop
+import gzip
+import json
 import os
 import os.path
 import subprocess
 import numpy as np
 import bluesky as bs
-from bluesky.tools import geo, areafilter, plugin
+from bluesky.tools import geo, areafilter, plugin, randomstreams, scheduler
 from bluesky.tools.aero import kts, ft, fpm, tas2cas, density
 from bluesky.tools.misc import txt2alt, cmdsplit
 from bluesky.tools.calculator import calculator
 from bluesky.tools.position import txt2pos, islat
+from bluesky.navdb.loadnavdata import check_cache
 from bluesky import settings
 
 # Temporary fix for synthetic
 import synthetic as syn
 # Register settings defaults
-settings.set_variable_defaults(start_location='EHAM', scenario_path='scenario')
+settings.set_variable_defaults(start_location='EHAM', scenario_path='scenario', scenario_lookahead=1000,
+                               scenario_binary=False)
+
+# Version of the binary scenario file format (.scnb)
+scnbversion = 2
+
+# Argument types that can be parsed without simulation state, when
+# compiling a scenario file to binary
+staticargtypes = set(["txt", "float", "int", "onoff", "bool", "pandir", "spd",
+                      "vspd", "alt", "hdg", "time"])
 
 # Global variables
 cmddict   = dict()  # Defined in stack.init
+cmdsigs   = dict()  # Parsed argument signatures of the commands in cmddict
 
 #
 # Command synonym dictionary definea equivalent commands globally in stack
@@ -88,8 +102,13 @@ cmdstack  = []
 
 scenname  = ""
 scenfile  = ""
-scentime  = []
-scencmd   = []
+
+# Scenario timeline: heap of (time, seqnr, cmdline, stream). The sequence
+# number keeps commands with the same time in the order in which they were
+# added. Scenario files are read lazily: for each open file (stream) only its
+# next command is in the timeline (see readscn).
+scenheap  = []
+scenseq   = 0
 
 
 def init():
@@ -221,6 +240,12 @@ def init():
             lambda name, *coords: areafilter.defineArea(name, 'CIRCLE', coords[:3], *coords[3:]),
             "Define a circle-shaped area"
         ],
+        "COMPILE": [
+            "COMPILE filename",
+            "string",
+            compilescn,
+            "Compile a scenario file to a pre-parsed binary scenario file (.scnb)"
+        ],
         "CRE": [
             "CRE acid,type,lat,lon,hdg,alt,spd",
             "txt,txt,latlon,hdg,alt,spd",
@@ -328,9 +353,15 @@ def init():
         "ENG": [
             "ENG acid,[engine_id]",
             "acid,[txt]",
-            bs.traf.perf.engchange,
+            bs.traf.engchange,
             "Specify a different engine type"
         ],
+        "EXPTIME": [
+            "EXPTIME [tstart,tend]",
+            "[time,time]",
+            bs.traf.asas.SetExpTime,
+            "Set the experiment time window in which conflicts and losses of separation are counted"
+        ],
         "FF": [
             "FF [timeinsec]",
             "[time]",
@@ -386,6 +417,18 @@ def init():
             bs.scr.cmdline,
             "Insert text op edit line in command window"
         ],
+        "ISADEV": [
+            "ISADEV [dtemp,dpres]",
+            "[float,float]",
+            bs.traf.atmdev.setcmd,
+            "Set uniform deviation from ISA: temperature [K], sea level pressure [Pa]"
+        ],
+        "ISADEVFILE": [
+            "ISADEVFILE filename",
+            "string",
+            bs.traf.atmdev.load,
+            "Load a gridded (3D, time-varying) field of deviations from ISA"
+        ],
         "LINE": [
             "LINE name,lat,lon,lat,lon",
             "txt,latlon,latlon",
@@ -428,6 +471,12 @@ def init():
             bs.traf.move,
             "Move an aircraft to a new position"
         ],
+        "MULTIRATE": [
+            "MULTIRATE [dt/OFF]",
+            "[float/txt]",
+            bs.traf.setMultiRate,
+            "Update the state of aircraft in steady flight once per dt seconds (multi-rate integration)"
+        ],
         "ND": [
             "ND acid",
             "txt",
@@ -476,6 +525,12 @@ def init():
             lambda *args: openfile(*args, mergeWithExisting=True),
             "Call commands in another scenario file"
         ],
+        "PERF": [
+            "PERF [BLUESKY/BADA/KINEMATIC]",
+            "[txt]",
+            bs.traf.setPerfModel,
+            "Select the aircraft performance model"
+        ],
         "PLUGINS": [
             "PLUGINS LIST or LOAD plugin or REMOVE plugin",
             "txt,[txt]",
@@ -621,6 +676,12 @@ def init():
             syn.process,
             "Macro for generating synthetic (geometric) traffic scenarios"
         ],
+        "TASK": [
+            "TASK [name,dt,phase,nparts]",
+            "[txt,float,float,int]",
+            scheduler.setcmd,
+            "List the periodic tasks or set update interval, phase offset and number of parts of a task"
+        ],
         "TAXI": [
             "TAXI ON/OFF : OFF auto deletes traffic below 1500 ft",
             "onoff",
@@ -657,6 +718,12 @@ def init():
             bs.traf.wind.add,
             "Define a wind vector as part of the 2D or 3D wind field"
         ],
+        "WINDFILE": [
+            "WINDFILE filename",
+            "string",
+            bs.traf.wind.load,
+            "Load a gridded (3D, time-varying) wind field from a wind grid file"
+        ],
         "ZONEDH": [
             "ZONEDH [height]",
             "[float]",
@@ -681,6 +748,7 @@ def init():
     }
 
     cmddict.update(commands)
+    cmdsigs.update((cmd, CommandSignature(entry)) for cmd, entry in commands.iteritems())
 
     #--------------------------------------------------------------------
 
@@ -698,13 +766,63 @@ def get_scenname():
 
 
 def get_scendata():
-    return scentime, scencmd
+    """ Pending scenario commands as time-ordered lists of times and commands.
+        Scenario files that are still open are read completely. """
+    global scenheap, scenseq
+    entries = []
+    for t, seqnr, cmdline, stream in scenheap:
+        entries.append((t, seqnr, cmdline, None))
+        if stream is not None:
+            for t, cmdline in stream:
+                entries.append((t, scenseq, cmdline, None))
+                scenseq += 1
+
+    # Commands of binary scenario files as text
+    for i, (t, seqnr, cmdline, stream) in enumerate(entries):
+        if isinstance(cmdline, list):
+            entries[i] = (t, seqnr, ';'.join(cmdrec[1] for cmdrec in cmdline), None)
+    scenheap = entries
+    heapify(scenheap)
+    entries = sorted(scenheap)
+    return [entry[0] for entry in entries], [entry[2] for entry in entries]
 
 
 def set_scendata(newtime, newcmd):
-    global scentime, scencmd
-    scentime = newtime
-    scencmd  = newcmd
+    global scenheap, scenseq
+    closescen()
+    scenheap = [(t, i, cmd, None) for i, (t, cmd) in enumerate(zip(newtime, newcmd))]
+    heapify(scenheap)
+    scenseq  = len(scenheap)
+
+
+def has_scendata():
+    """ True when there are scenario commands waiting to be executed """
+    return len(scenheap) > 0
+
+
+def add_scencmd(t, cmdline):
+    """ Add a command to the scenario timeline, after the commands already
+        scheduled for the same time. """
+    global scenseq
+    heappush(scenheap, (t, scenseq, cmdline, None))
+    scenseq += 1
+
+
+def add_scenstream(stream):
+    """ Add a stream of (time, cmdline) to the scenario timeline: only its
+        next command is put in the timeline """
+    global scenseq
+    for t, cmdline in stream:
+        heappush(scenheap, (t, scenseq, cmdline, stream))
+        scenseq += 1
+        break
+
+
+def closescen():
+    """ Close the scenario files that are still being read """
+    for entry in scenheap:
+        if entry[3] is not None:
+            entry[3].close()
 
 
 def scenarioinit(name):
@@ -716,11 +834,24 @@ def scenarioinit(name):
 def append_commands(newcommands):
     """ Append additional functions to the stack command dictionary """
     cmddict.update(newcommands)
+    cmdsigs.update((cmd, CommandSignature(entry)) for cmd, entry in newcommands.iteritems())
 
 def remove_commands(commands):
     """ Remove functions from the stack """
     for cmd in commands:
         cmddict.pop(cmd)
+        cmdsigs.pop(cmd, None)
+
+def getsignature(cmd):
+    """ Parsed signature of command cmd (None if cmd is not in cmddict) """
+    entry = cmddict.get(cmd)
+    if entry is None:
+        return None
+    sig = cmdsigs.get(cmd)
+    # Parse again when the command was changed in cmddict directly
+    if sig is None or sig.entry is not entry:
+        sig = cmdsigs[cmd] = CommandSignature(entry)
+    return sig
 
 def showhelp(cmd=''):
     """ Generate help text for displaying or dump command reference in file
@@ -840,13 +971,15 @@ def showhelp(cmd=''):
 def setSeed(value):
     seed(value)
     np.random.seed(value)
+    randomstreams.seed(value)
 
 
 def reset():
-    global scentime, scencmd, scenname
+    global scenheap, scenseq, scenname
 
-    scentime = []
-    scencmd  = []
+    closescen()
+    scenheap = []
+    scenseq  = 0
     scenname = ''
 
 
@@ -860,32 +993,15 @@ def stack(cmdline):
 
 def sched_cmd(time, args, relative=False):
     tostack = ','.join(args)
-    # find spot in time list corresponding to passed time, get idx
-    # insert time at idx in scentime, insert cmd at idx in scencmd
     if relative:
         time += bs.sim.simt
-    # in case there is no scentime yet, only extend
-
-    if len(scentime) == 0:
-        scentime.extend([time])
-        scencmd.extend([tostack])
-    else:
-        try:
-            idx = scentime.index(next(sctime for sctime in scentime if sctime > time))
-
-            scentime.insert(idx, time)
-            scencmd.insert(idx, tostack)
-        except:
-            scentime.extend([time])
-            scencmd.extend([tostack])
-
 
+    add_scencmd(time, tostack)
     return True
 
 
-def openfile(fname, absrel='ABS', mergeWithExisting=False):
-    global scentime, scencmd
-
+def findscen(fname):
+    """ Full path of scenario file fname """
     # Split the incoming filename into a path, a filename and an extension
     path, fname   = os.path.split(os.path.normpath(fname))
     scenname, ext = os.path.splitext(fname)
@@ -897,6 +1013,17 @@ def openfile(fname, absrel='ABS', mergeWithExisting=False):
     # The entire filename, possibly with added path and extension
     scenfile = os.path.join(path, scenname + ext)
 
+    # Fall back to a gzip-compressed scenario file
+    if not os.path.exists(scenfile) and os.path.exists(scenfile + '.gz'):
+        scenfile += '.gz'
+
+    return scenfile
+
+
+def openfile(fname, absrel='ABS', mergeWithExisting=False):
+    global scenheap, scenseq
+
+    scenfile = findscen(fname)
     print "Opening ", scenfile
 
     # If timestamps in file should be interpreted as relative we need to add
@@ -906,16 +1033,39 @@ def openfile(fname, absrel='ABS', mergeWithExisting=False):
     if not os.path.exists(scenfile):
         return False, "Error: cannot find file: " + scenfile
 
-    # Split scenario file line in times and commands
     if not mergeWithExisting:
         # When a scenario file is read with PCALL the resulting commands
         # need to be merged with the existing commands. Otherwise the
         # old scenario commands are cleared.
-        scentime = []
-        scencmd  = []
+        closescen()
+        scenheap = []
+        scenseq  = 0
+
+    # The file is read while the scenario is running
+    if scenfile.endswith('.scnb'):
+        add_scenstream(readscnb(scenfile, t_offset))
+
+    elif settings.scenario_binary:
+        # Replay the binary version of the scenario, compile it when the
+        # scenario file is new or has changed
+        binfile = scnbname(scenfile)
+        if not check_cache(binfile, scenfile) or readscnbheader(binfile) is None:
+            compilefile(scenfile, binfile)
+        add_scenstream(readscnb(binfile, t_offset))
+
+    else:
+        add_scenstream(readscn(scenfile, t_offset))
+
+    return True
+
 
-    with open(scenfile, 'r') as fscen:
-        for line in fscen:
+def readscn(scenfile, t_offset=0.0):
+    """ Generator reading scenario file scenfile (optionally gzip-compressed):
+        yields the times and commands in time order. Lines up to
+        scenario_lookahead lines apart may be out of order in the file. """
+    buf = []
+    with (gzip.open if scenfile.endswith('.gz') else open)(scenfile, 'r') as fscen:
+        for iline, line in enumerate(fscen):
             if len(line.strip()) > 12 and line[0] != "#":
                 # Try reading timestamp and command
                 try:
@@ -925,19 +1075,99 @@ def openfile(fname, absrel='ABS', mergeWithExisting=False):
                     ihr      = int(ttxt[0]) * 3600.0
                     imin     = int(ttxt[1]) * 60.0
                     xsec     = float(ttxt[2])
-                    scentime.append(ihr + imin + xsec + t_offset)
-                    scencmd.append(line[icmdline + 1:].strip("\n"))
+                    heappush(buf, (ihr + imin + xsec + t_offset, iline,
+                                   line[icmdline + 1:].strip("\n")))
                 except:
                     if not(len(line.strip()) > 0 and line.strip()[0] == "#"):
                         print "except this:", line
-                    pass  # nice try, we will just ignore this syntax error
+                    continue  # nice try, we will just ignore this syntax error
+
+                if len(buf) > settings.scenario_lookahead:
+                    t, _, cmdline = heappop(buf)
+                    yield t, cmdline
+
+    while buf:
+        t, _, cmdline = heappop(buf)
+        yield t, cmdline
+
+
+def scnbname(scenfile):
+    """ Name of the binary version of scenario file scenfile """
+    if scenfile.endswith('.gz'):
+        scenfile = scenfile[:-3]
+    return os.path.splitext(scenfile)[0] + '.scnb'
+
+
+def compilefile(scenfile, binfile):
+    """ Compile scenario file scenfile to binary scenario file binfile. The
+        command lines are pre-parsed (see compileline), and the commands with
+        the same time are stored, and executed, as one group.
+        The file holds only data, no code: a JSON header line followed by a
+        JSON line [time, group] per group of command records. """
+    print "Compiling", scenfile, "to", binfile
+    trafids = []
+    with open(binfile, 'wb') as fbin:
+        fbin.write(json.dumps({'version': scnbversion, 'source': scenfile}) + '\n')
+        tgroup, group = None, []
+        for t, cmdline in readscn(scenfile):
+            if t != tgroup and group:
+                fbin.write(json.dumps([tgroup, group]) + '\n')
+                group = []
+            tgroup = t
+            group.extend(compileline(line, trafids) for line in cmdline.split(';')
+                         if len(line.strip()) > 0)
+        if group:
+            fbin.write(json.dumps([tgroup, group]) + '\n')
+
+
+def jsonstr(obj):
+    """ Convert the unicode strings from the JSON decoder to str """
+    if isinstance(obj, unicode):
+        return str(obj)
+    if isinstance(obj, list):
+        return [jsonstr(item) for item in obj]
+    if isinstance(obj, dict):
+        return dict((jsonstr(key), jsonstr(value)) for key, value in obj.items())
+    return obj
+
+
+def readscnbheader(binfile):
+    """ Header of binary scenario file binfile, None when it has another format """
+    try:
+        with open(binfile, 'rb') as fbin:
+            header = json.loads(fbin.readline())
+    except (IOError, ValueError):
+        return None
+    if not isinstance(header, dict) or header.get('version') != scnbversion:
+        return None
+    return header
+
+
+def readscnb(binfile, t_offset=0.0):
+    """ Generator reading binary scenario file binfile: yields the times and
+        command groups in time order """
+    if readscnbheader(binfile) is None:
+        print "Binary scenario", binfile, "has an old format, compile it again"
+        return
+    with open(binfile, 'rb') as fbin:
+        fbin.readline()
+        for line in fbin:
+            try:
+                t, group = jsonstr(json.loads(line))
+            except ValueError:
+                print "Binary scenario", binfile, "is damaged, compile it again"
+                return
+            yield t + t_offset, group
 
-    if mergeWithExisting:
-        # If we are merging we need to sort the resulting command list
-        scentime, scencmd = [list(x) for x in zip(*sorted(
-            zip(scentime, scencmd), key=lambda pair: pair[0]))]
 
-    return True
+def compilescn(fname):
+    """ COMPILE command: compile a scenario file to binary (.scnb) """
+    scenfile = findscen(fname)
+    if not os.path.exists(scenfile):
+        return False, "Error: cannot find file: " + scenfile
+    binfile = scnbname(scenfile)
+    compilefile(scenfile, binfile)
+    return True, "Compiled " + scenfile + " to " + binfile
 
 
 def ic(filename=''):
@@ -958,7 +1188,7 @@ def ic(filename=''):
         result = openfile(filename)
         if result is True:
             scenfile    = filename
-            scenname, _ = os.path.splitext(os.path.basename(filename))
+            scenname, _ = os.path.splitext(os.path.basename(filename).replace('.gz', ''))
             return True, "Opened " + filename
         else:
             return result
@@ -966,10 +1196,16 @@ def ic(filename=''):
 
 def checkfile(simt):
     # Empty command buffer when it's time
-    while len(scencmd) > 0 and simt >= scentime[0]:
-        stack(scencmd[0])
-        del scencmd[0]
-        del scentime[0]
+    while scenheap and simt >= scenheap[0][0]:
+        t, seqnr, cmdline, stream = heappop(scenheap)
+        # Next command of a scenario file
+        if stream is not None:
+            add_scenstream(stream)
+        # Pre-parsed commands of a binary scenario are processed as a group
+        if isinstance(cmdline, list):
+            cmdstack.append(cmdline)
+        else:
+            stack(cmdline)
 
     return
 
@@ -1083,172 +1319,398 @@ def process():
     # Process stack of commands
     for line in cmdstack:
         #debug       print "stack is processing:",line
-        # Empty line: next command
-        line = line.strip()
-        if len(line) == 0:
-            continue
-
-        # Split command line into command and arguments, pass traf ids to check for
-        # switched acid and command
-        cmd, args = cmdsplit(line.upper(), bs.traf.id)
-        numargs   = len(args)
-        # Check if this is a POS command with only an aircraft id
-        if numargs == 0 and bs.traf.id.count(cmd) > 0:
-            args    = [cmd]
-            cmd     = 'POS'
-            numargs = 1
-
-        # Assume syntax is ok (default)
-        synerr = False
-
-        #**********************************************************************
-        #=====================  Start of command parsing  =====================
-        #**********************************************************************
-
-        #----------------------------------------------------------------------
-        # First check command synonyms list, then in dictionary
-        #----------------------------------------------------------------------
-        orgcmd = cmd  # save for string cutting out of line and use of synonyms
-        if cmd in cmdsynon.keys():
-            cmd    = cmdsynon[cmd]
-
-        if cmd in cmddict.keys():
-            # Look up command in dictionary to get string with argtypes andhelp texts
-            helptext, argtypelist, function = cmddict[cmd][:3]
-
-            # Make list of argtypes and whether entering an argument is optional
-            argtypes = []
-            argisopt = []
-
-            # Process and reduce arglist from left to right
-            # First cut at square brackets, then take separate argument types
-            while len(argtypelist) > 0:
-                opt = (argtypelist[0] == '[')
-                cut = argtypelist.find(']') if opt else \
-                      argtypelist.find('[') if '[' in argtypelist else \
-                      len(argtypelist)
-
-                types = argtypelist[:cut].strip('[,]').split(',')
-                argtypes += types
-                argisopt += len(types) * [opt]
-                argtypelist = argtypelist[cut:].lstrip(',]')
-
-            # Check if at least the number of mandatory arguments is given,
-            # by finding the last argument that is not optional.
-            if False in argisopt:
-                minargs = len(argisopt) - argisopt[::-1].index(False)
-                if numargs < minargs:
-                    bs.scr.echo("Syntax error: Too few arguments")
-                    bs.scr.echo(line)
-                    bs.scr.echo(helptext)
-                    continue
-
-            # Special case: single text string argument: case sensitive,
-            # possibly with spaces/newlines pass the original
-            if argtypes == ['string']:
-                arglist = [line[len(orgcmd) + 1:]]
+        # Pre-parsed commands of a binary scenario file (see compileline)
+        if isinstance(line, list):
+            processgroup(line)
+        else:
+            processline(line)
 
-            else:
-                # Start with a fresh argument parser for each command
-                parser  = Argparser()
-                arglist = []
-                curtype = 0
-                curarg  = 0
-
-                # Iterate over list of argument types & arguments
-                while curtype < len(argtypes) and curarg < len(args) and not synerr:
-                    # Optional repeat with "...", e.g. for lat/lon list for polygon
-                    if argtypes[curtype][:3] == '...':
-                        repeatsize = len(argtypes) - curtype
-                        curtype = curtype - repeatsize
-                    argtype    = argtypes[curtype].strip().split('/')
-
-                    # Save error messages from argument parsing for each possible type for this field
-                    errors = ''
-                    # Go over all argtypes separated by "/" in this place in the command line
-                    for i, argtypei in enumerate(argtype):
-                        # Try to parse the argument for the given argument type
-                        # First successful parsing is used!
-                        if parser.parse(argtypei, curarg, args):
-                            # No value = None when this is allowed because it is an optional argument
-                            if parser.result[0] is None and argisopt[curtype] is False:
-                                synerr = True
-                                bs.scr.echo('No value given for mandatory argument ' + argtypes[curtype])
-                                break
-                            arglist += parser.result
-                            curarg  += parser.argstep
+    # End of for-loop of cmdstack
+    cmdstack = []
+    return
+
+
+def processline(line):
+    """ Parse and execute one command line """
+    # Empty line: next command
+    line = line.strip()
+    if len(line) == 0:
+        return
+
+    # Split command line into command and arguments, pass traf ids to check for
+    # switched acid and command
+    cmd, args = cmdsplit(line.upper(), bs.traf.id)
+    numargs   = len(args)
+    # Check if this is a POS command with only an aircraft id
+    if numargs == 0 and bs.traf.id.count(cmd) > 0:
+        args    = [cmd]
+        cmd     = 'POS'
+        numargs = 1
+
+    # Assume syntax is ok (default)
+    synerr = False
+
+    #**********************************************************************
+    #=====================  Start of command parsing  =====================
+    #**********************************************************************
+
+    #----------------------------------------------------------------------
+    # First check command synonyms list, then in dictionary
+    #----------------------------------------------------------------------
+    orgcmd = cmd  # save for string cutting out of line and use of synonyms
+    cmd    = cmdsynon.get(cmd, cmd)
+    sig    = getsignature(cmd)
+
+    if sig is not None:
+        # Look up command signature to get argtypes and help texts
+        helptext = sig.helptext
+        argtypes, argisopt = sig.argtypes, sig.argisopt
+
+        # Check if at least the number of mandatory arguments is given
+        if numargs < sig.minargs:
+            bs.scr.echo("Syntax error: Too few arguments")
+            bs.scr.echo(line)
+            bs.scr.echo(helptext)
+            return
+
+        # Special case: single text string argument: case sensitive,
+        # possibly with spaces/newlines pass the original
+        curarg = 0
+        if sig.isstring:
+            arglist = [line[len(orgcmd) + 1:]]
+
+        else:
+            # Start with a fresh argument parser for each command
+            parser  = Argparser()
+            arglist = []
+            curtype = 0
+
+            # Iterate over list of argument types & arguments
+            while curtype < len(argtypes) and curarg < len(args) and not synerr:
+                # Optional repeat with "...", e.g. for lat/lon list for polygon
+                if sig.isrepeat[curtype]:
+                    repeatsize = len(argtypes) - curtype
+                    curtype = curtype - repeatsize
+                argtype    = sig.alttypes[curtype]
+
+                # Save error messages from argument parsing for each possible type for this field
+                errors = ''
+                # Go over all argtypes separated by "/" in this place in the command line
+                for i, argtypei in enumerate(argtype):
+                    # Try to parse the argument for the given argument type
+                    # First successful parsing is used!
+                    if parser.parse(argtypei, curarg, args):
+                        # No value = None when this is allowed because it is an optional argument
+                        if parser.result[0] is None and argisopt[curtype] is False:
+                            synerr = True
+                            bs.scr.echo('No value given for mandatory argument ' + argtypes[curtype])
                             break
-                        # No success yet with this type (maybe we can try other ones)
+                        arglist += parser.result
+                        curarg  += parser.argstep
+                        break
+                    # No success yet with this type (maybe we can try other ones)
+                    else:
+                        # Store the error message and see if there are alternatives
+                        errors += parser.error + '\n'
+                        if i < len(argtype) - 1:
+                            # We have alternative argument formats that we can try
+                            continue
                         else:
-                            # Store the error message and see if there are alternatives
-                            errors += parser.error + '\n'
-                            if i < len(argtype) - 1:
-                                # We have alternative argument formats that we can try
-                                continue
-                            else:
-                                # No more types to check: print error message
-                                synerr = True
-                                bs.scr.echo('Syntax error processing "' + args[curarg] + '":')
-                                bs.scr.echo(errors)
-                                bs.scr.echo(helptext)
-                                print "Error in processing arguments:"
-                                print line
-
-                    curtype += 1
-
-            # Call function return flag,text
-            # flag: indicates sucess
-            # text: optional error message
-            if not synerr:
-                results = function(*arglist)  # * = unpack list to call arguments
-
-                if isinstance(results, bool):  # Only flag is returned
-                    synerr = not results
-                    if synerr:
-                        if numargs <= 0 or curarg < len(args) and args[curarg] == "?":
+                            # No more types to check: print error message
+                            synerr = True
+                            bs.scr.echo('Syntax error processing "' + args[curarg] + '":')
+                            bs.scr.echo(errors)
                             bs.scr.echo(helptext)
-                        else:
-                            bs.scr.echo("Syntax error: " + helptext)
-
-                elif isinstance(results, (tuple, list)) and len(results) > 0:
-                    synerr = not results[0]
-                    if synerr:
-                        bs.scr.echo("Syntax error: " + (helptext if len(results) < 2 else ""))
-                    # Maybe there is also an error/info message returned?
-                    if len(results) >= 2:
-                        bs.scr.echo(cmd + ":" + results[1])
-
-                synerr =  False  # Prevent further nagging
-
-            else:  # synerr:
-                bs.scr.echo("Syntax error: " + helptext)
-
-        #----------------------------------------------------------------------
-        # ZOOM command (or use ++++  or --  to zoom in or out)
-        #----------------------------------------------------------------------
-        elif cmd[0] in ["+", "=", "-"]:
-            nplus = cmd.count("+") + cmd.count("=")  # = equals + (same key)
-            nmin  = cmd.count("-")
-            bs.scr.zoom(sqrt(2) ** (nplus - nmin), absolute=False)
-
-        #-------------------------------------------------------------------
-        # Command not found
-        #-------------------------------------------------------------------
+                            print "Error in processing arguments:"
+                            print line
+
+                curtype += 1
+
+        # Call function return flag,text
+        if not synerr:
+            callcommand(cmd, sig, arglist, args, curarg)
+
+        else:  # synerr:
+            bs.scr.echo("Syntax error: " + helptext)
+
+    #----------------------------------------------------------------------
+    # ZOOM command (or use ++++  or --  to zoom in or out)
+    #----------------------------------------------------------------------
+    elif cmd[0] in ["+", "=", "-"]:
+        nplus = cmd.count("+") + cmd.count("=")  # = equals + (same key)
+        nmin  = cmd.count("-")
+        bs.scr.zoom(sqrt(2) ** (nplus - nmin), absolute=False)
+
+    #-------------------------------------------------------------------
+    # Command not found
+    #-------------------------------------------------------------------
+    else:
+        if numargs == 0:
+            bs.scr.echo("Unknown command or aircraft: " + cmd)
         else:
-            if numargs == 0:
-                bs.scr.echo("Unknown command or aircraft: " + cmd)
-            else:
-                bs.scr.echo("Unknown command: " + cmd)
+            bs.scr.echo("Unknown command: " + cmd)
 
-        #**********************************************************************
-        #======================  End of command branches ======================
-        #**********************************************************************
+    #**********************************************************************
+    #======================  End of command branches ======================
+    #**********************************************************************
 
-    # End of for-loop of cmdstack
-    cmdstack = []
     return
 
 
+def callcommand(cmd, sig, arglist, args, curarg=0):
+    """ Call the function of command cmd with the parsed arguments.
+        The function returns a flag, or a flag and a text
+        flag: indicates sucess
+        text: optional error message """
+    results = sig.function(*arglist)  # * = unpack list to call arguments
+    reportresults(cmd, sig, results, args, curarg)
+
+
+def reportresults(cmd, sig, results, args, curarg=0):
+    """ Echo the syntax error or message in the results of command cmd """
+    if isinstance(results, bool):  # Only flag is returned
+        if not results:
+            if len(args) == 0 or curarg < len(args) and args[curarg] == "?":
+                bs.scr.echo(sig.helptext)
+            else:
+                bs.scr.echo("Syntax error: " + sig.helptext)
+
+    elif isinstance(results, (tuple, list)) and len(results) > 0:
+        if not results[0]:
+            bs.scr.echo("Syntax error: " + (sig.helptext if len(results) < 2 else ""))
+        # Maybe there is also an error/info message returned?
+        if len(results) >= 2:
+            bs.scr.echo(cmd + ":" + results[1])
+
+
+def compileline(line, trafids):
+    """ Pre-parse a scenario command line for a binary scenario file.
+        Returns a command record (cmd, line, args, plan). The plan lists per
+        argument the parsed values ("V"), an explicit position ("P"), or the
+        argument type to parse when the command is executed ("D"), for the
+        argument types that depend on the traffic and the reference position.
+        The plan is None when the line can only be parsed at execution.
+        trafids: aircraft created so far in the scenario """
+    line = line.strip()
+    cmd, args = cmdsplit(line.upper(), trafids)
+    orgcmd = cmd
+    cmd    = cmdsynon.get(cmd, cmd)
+    sig    = getsignature(cmd)
+    if sig is None or len(args) < sig.minargs:
+        return cmd, line, args, None
+
+    if sig.isstring:
+        return cmd, line, args, [("V", [line[len(orgcmd) + 1:]])]
+
+    # Keep track of the created aircraft to recognise "acid command" lines
+    if cmd == "CRE" and len(args) > 0:
+        trafids.append(args[0])
+
+    parser  = Argparser()
+    plan    = []
+    curtype = 0
+    curarg  = 0
+    while curtype < len(sig.argtypes) and curarg < len(args):
+        # Optional repeat with "...", e.g. for lat/lon list for polygon
+        if sig.isrepeat[curtype]:
+            curtype = curtype - (len(sig.argtypes) - curtype)
+        alttypes = sig.alttypes[curtype]
+        arg      = args[curarg]
+        argstep  = 1
+
+        # Wildcards use results of other arguments: parse at execution
+        if arg == "*":
+            return cmd, line, args, None
+
+        elif arg == "" and alttypes != ["txt"]:
+            if not sig.argisopt[curtype]:
+                return cmd, line, args, None
+            plan.append(("V", [None]))
+
+        elif all(argtype in staticargtypes for argtype in alttypes):
+            for argtype in alttypes:
+                if parser.parse(argtype, curarg, args):
+                    break
+            else:
+                # Syntax error: reported at execution
+                return cmd, line, args, None
+            plan.append(("V", parser.result))
+            argstep = parser.argstep
+
+        elif len(alttypes) == 1 and alttypes[0] in ("acid", "wpinroute"):
+            plan.append(("D", alttypes[0], curarg, 1))
+
+        elif len(alttypes) == 1 and alttypes[0] in ("wpt", "latlon"):
+            # lat,lon and apt,runway positions take two arguments
+            if curarg < len(args) - 1 and islat(arg) and arg not in trafids:
+                argstep = 2
+                if alttypes[0] == "wpt":
+                    plan.append(("V", [arg + "," + args[curarg + 1]]))
+                else:
+                    success, posobj = txt2pos(arg + "," + args[curarg + 1], 0.0, 0.0)
+                    if not success:
+                        return cmd, line, args, None
+                    plan.append(("P", [posobj.lat, posobj.lon]))
+            else:
+                # Names and aircraft are looked up at execution
+                if curarg < len(args) - 1 and args[curarg + 1][:2] == "RW" and \
+                        arg in bs.navdb.aptid:
+                    argstep = 2
+                plan.append(("D", alttypes[0], curarg, argstep))
+
+        else:
+            return cmd, line, args, None
+
+        curarg  += argstep
+        curtype += 1
+
+    return cmd, line, args, plan
+
+
+def processgroup(group):
+    """ Execute a group of pre-parsed commands with the same time. Runs of CRE
+        commands, and of ADDWPT commands for one aircraft, are dispatched as
+        one batch (see processbatch). """
+    i = 0
+    while i < len(group):
+        key = batchkey(group[i])
+        j   = i + 1
+        while key is not None and j < len(group) and batchkey(group[j]) == key:
+            j += 1
+
+        if j - i > 1:
+            processbatch(group[i:j])
+        else:
+            processcompiled(group[i])
+        i = j
+
+
+def batchkey(cmdrec):
+    """ Key of the batch a pre-parsed command can be dispatched in, or None.
+        The arguments in a batch are parsed before the first command is
+        executed, so they should not depend on the commands before them in
+        the batch: CRE with explicit positions, and ADDWPT without afterwp. """
+    cmd, line, args, plan = cmdrec
+    if plan is None:
+        return None
+    if cmd == "CRE" and all(item[0] != "D" for item in plan):
+        return cmd
+    if cmd == "ADDWPT" and len(plan) > 0 and tuple(plan[0][:2]) == ("D", "acid") and \
+            all(tuple(item[:2]) != ("D", "wpinroute") for item in plan):
+        return cmd, args[0]
+    return None
+
+
+def processbatch(cmdrecs):
+    """ Execute a batch of pre-parsed CRE commands, or ADDWPT commands for one
+        aircraft: the aircraft are created with one update of the traffic
+        arrays (Traffic.cregroup), the route is calculated once after the
+        last waypoint (Route.addwptBatch). """
+    cmd    = cmdrecs[0][0]
+    sig    = getsignature(cmd)
+    parsed = []
+    for cmdrec in cmdrecs:
+        result = parsecompiled(cmdrec)
+        if result is not None:
+            parsed.append((cmdrec, result[1]))
+    if not parsed:
+        return
+
+    if cmd == "CRE":
+        # Pad the optional arguments: acid,type,lat,lon,hdg,alt,spd
+        arglists = [arglist + (7 - len(arglist)) * [None] for cmdrec, arglist in parsed]
+        results  = bs.traf.cregroup(*zip(*arglists))
+    else:
+        idx     = parsed[0][1][0]
+        results = bs.traf.ap.route[idx].addwptBatch(idx, [arglist[1:] for cmdrec, arglist in parsed])
+
+    for (cmdrec, arglist), result in zip(parsed, results):
+        reportresults(cmd, sig, result, cmdrec[2], len(cmdrec[2]))
+
+
+def processcompiled(cmdrec):
+    """ Execute a pre-parsed command of a binary scenario file """
+    parsed = parsecompiled(cmdrec)
+    if parsed is not None:
+        callcommand(cmdrec[0], parsed[0], parsed[1], cmdrec[2], len(cmdrec[2]))
+
+
+def parsecompiled(cmdrec):
+    """ Complete the arguments of a pre-parsed command. Returns the command
+        signature and argument list, or None when the command could not be
+        completed: it is then processed as text, or a syntax error is shown. """
+    cmd, line, args, plan = cmdrec
+    sig = getsignature(cmd)
+    if plan is None or sig is None:
+        processline(line)
+        return None
+
+    parser  = Argparser()
+    arglist = []
+    for item in plan:
+        if item[0] == "V":
+            arglist += item[1]
+
+        elif item[0] == "P":
+            # Explicit position: update the reference position
+            Argparser.reflat, Argparser.reflon = item[1]
+            arglist += item[1]
+
+        else:
+            # Aircraft and navdb dependent arguments
+            argtype, curarg, argstep = item[1:]
+            if not parser.parse(argtype, curarg, args):
+                bs.scr.echo('Syntax error processing "' + args[curarg] + '":')
+                bs.scr.echo(parser.error)
+                bs.scr.echo("Syntax error: " + sig.helptext)
+                return
+
+            # Compiled for other arguments, e.g. an aircraft as position
+            if parser.argstep != argstep:
+                processline(line)
+                return
+
+            arglist += parser.result
+
+    return sig, arglist
+
+
+class CommandSignature(object):
+    """ Argument signature of a stack command, parsed once from its argument
+        type list in cmddict (see init for the syntax) """
+    def __init__(self, entry):
+        self.entry = entry
+        self.helptext, argtypelist, self.function = entry[:3]
+
+        # Make list of argtypes and whether entering an argument is optional
+        self.argtypes = []
+        self.argisopt = []
+
+        # Process and reduce arglist from left to right
+        # First cut at square brackets, then take separate argument types
+        while len(argtypelist) > 0:
+            opt = (argtypelist[0] == '[')
+            cut = argtypelist.find(']') if opt else \
+                  argtypelist.find('[') if '[' in argtypelist else \
+                  len(argtypelist)
+
+            types = argtypelist[:cut].strip('[,]').split(',')
+            self.argtypes += types
+            self.argisopt += len(types) * [opt]
+            argtypelist = argtypelist[cut:].lstrip(',]')
+
+        # Minimum number of arguments: up to the last argument that is not optional
+        self.minargs  = len(self.argisopt) - self.argisopt[::-1].index(False) \
+            if False in self.argisopt else 0
+
+        # Alternative types per argument ("/"), and repeat markers ("...")
+        self.alttypes = [argtype.strip().split('/') for argtype in self.argtypes]
+        self.isrepeat = [argtype[:3] == '...' for argtype in self.argtypes]
+
+        # Single text string argument: passed as is
+        self.isstring = (self.argtypes == ['string'])
+
+
 class Argparser:
     # Global variables
     reflat    = -999.  # Reference latitude for searching in nav db
@@ -1294,208 +1756,233 @@ class Argparser:
             self.argstep = 1
             return True
 
-        if argtype == "acid":  # aircraft id => parse index
-            idx = bs.traf.id2idx(args[argidx])
-            if idx < 0:
-                self.error = args[argidx] + " not found"
-                return False
-            else:
-                # Update ref position for navdb lookup
-                Argparser.reflat = bs.traf.lat[idx]
-                Argparser.reflon = bs.traf.lon[idx]
-                self.refac   = idx
-                self.result  = [idx]
-                self.argstep = 1
-                return True
-
-        elif argtype == "wpinroute":  # return text in upper case
-            wpname = args[argidx].upper()
-            if self.refac >= 0 and wpname not in bs.traf.ap.route[self.refac].wpname:
-                self.error = 'There is no waypoint ' + wpname + ' in route of ' + bs.traf.id[self.refac]
-                return False
-            self.result  = [wpname]
+        # Parse function of this argument type
+        parsefun = Argparser.parsefuns.get(argtype)
+        if parsefun is None:
+            # Argument not found: return False
+            self.error = 'Unknown argument type: ' + argtype
+            return False
+
+        return parsefun(self, argidx, args)
+
+    def parse_acid(self, argidx, args):
+        """ aircraft id => parse index """
+        idx = bs.traf.id2idx(args[argidx])
+        if idx < 0:
+            self.error = args[argidx] + " not found"
+            return False
+        else:
+            # Update ref position for navdb lookup
+            Argparser.reflat = bs.traf.lat[idx]
+            Argparser.reflon = bs.traf.lon[idx]
+            self.refac   = idx
+            self.result  = [idx]
             self.argstep = 1
             return True
 
-        elif argtype == "float":  # float number
-            try:
-                self.result  = [float(args[argidx])]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Argument "' + args[argidx] + '" is not a float'
-                return False
-
-        elif argtype == "int":   # integer
-            try:
-                self.result  = [int(args[argidx])]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Argument "' + args[argidx] + '" is not an int'
-                return False
-
-        elif argtype == "onoff" or argtype == "bool":
-            if args[argidx] in ["ON", "TRUE", "YES", "1"]:
-                self.result  = [True]
-                self.argstep = 1
-                return True
-            elif args[argidx] in ["OFF", "FALSE", "NO", "0"]:
-                self.result  = [False]
-                self.argstep = 1
-                return True
-            else:
-                self.error = 'Argument "' + args[argidx] + '" is not a bool'
-                return False
+    def parse_wpinroute(self, argidx, args):
+        """ return text in upper case """
+        wpname = args[argidx].upper()
+        if self.refac >= 0 and wpname not in bs.traf.ap.route[self.refac].wpname:
+            self.error = 'There is no waypoint ' + wpname + ' in route of ' + bs.traf.id[self.refac]
+            return False
+        self.result  = [wpname]
+        self.argstep = 1
+        return True
+
+    def parse_float(self, argidx, args):
+        """ float number """
+        try:
+            self.result  = [float(args[argidx])]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Argument "' + args[argidx] + '" is not a float'
+            return False
 
-        elif argtype == "wpt" or argtype == "latlon":
+    def parse_int(self, argidx, args):
+        """ integer """
+        try:
+            self.result  = [int(args[argidx])]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Argument "' + args[argidx] + '" is not an int'
+            return False
+
+    def parse_onoff(self, argidx, args):
+        """ on/off, bool """
+        if args[argidx] in ["ON", "TRUE", "YES", "1"]:
+            self.result  = [True]
+            self.argstep = 1
+            return True
+        elif args[argidx] in ["OFF", "FALSE", "NO", "0"]:
+            self.result  = [False]
+            self.argstep = 1
+            return True
+        else:
+            self.error = 'Argument "' + args[argidx] + '" is not a bool'
+            return False
+
+    def posname(self, argidx, args):
+        """ Make 1 or 2 argument(s) into 1 position text
+
+            Examples valid position texts:
+            lat/lon : "N52.12,E004.23","N52'14'12',E004'23'10"
+            navaid/fix: "SPY","OA","SUGOL"
+            airport:   "EHAM"
+            runway:    "EHAM/RW06" "LFPG/RWY23" """
+        # Default values
+        self.argstep = 1
+        name         = args[argidx]
+
+        # Try aircraft first: translate a/c id into a valid position text with a lat,lon
+        idx = bs.traf.id2idx(name)
+        if idx >= 0:
+            name     = str(bs.traf.lat[idx]) + "," + str(bs.traf.lon[idx])
+
+        # Check next arg if available
+        elif argidx < len(args) - 1:
+            # lat,lon ? Combine into one string with a comma
+            if islat(args[argidx]):
+                name = args[argidx] + "," + args[argidx + 1]
+                self.argstep = 2   # we used two arguments
+
+            # apt,runway ? Combine into one string with a slash as separator
+            elif args[argidx + 1][:2].upper() == "RW" and args[argidx] in bs.navdb.aptid:
+                name = args[argidx] + "/" + args[argidx + 1].upper()
+                self.argstep = 2   # we used two arguments
+
+        return name
+
+    def parse_wpt(self, argidx, args):
+        """ wpt: return position text to be used as waypoint, no need to look it up """
+        self.result = [self.posname(argidx, args)]
+        return True
+
+    def parse_latlon(self, argidx, args):
+        """ latlon: return lat,lon to be used as a position only """
+        name = self.posname(argidx, args)
+
+        # Set default reference lat,lon for duplicate name in navdb to screen
+        if Argparser.reflat < -180.:  # No reference avaiable yet: use screen center
+            Argparser.reflat = bs.scr.ctrlat
+            Argparser.reflon = bs.scr.ctrlon
+
+        success, posobj = txt2pos(name, Argparser.reflat, Argparser.reflon)
+
+        if success:
+            # for runway type, get heading as default optional argument for command line
+            if posobj.type == "rwy":
+                aptname, rwyname = name.split('/RW')
+                rwyname = rwyname.lstrip('Y')
+                try:
+                    self.additional['hdg'] = bs.navdb.rwythresholds[aptname][rwyname][2]
+                except:
+                    pass
 
-            # wpt: Make 1 or 2 argument(s) into 1 position text to be used as waypoint
-            # latlon: return lat,lon to be used as a position only
+            # Update reference lat/lon
+            Argparser.reflat = posobj.lat
+            Argparser.reflon = posobj.lon
 
-            # Examples valid position texts:
-            # lat/lon : "N52.12,E004.23","N52'14'12',E004'23'10"
-            # navaid/fix: "SPY","OA","SUGOL"
-            # airport:   "EHAM"
-            # runway:    "EHAM/RW06" "LFPG/RWY23"
-            # Default values
+            self.result = [posobj.lat, posobj.lon]
+            return True
+        else:
+            self.error = posobj  # contains error message if txt2pos was no success
+            return False
+
+    def parse_pandir(self, argidx, args):
+        """ Pan direction: check for valid string value """
+        pandir = args[argidx].upper().strip()
+        if pandir in ["LEFT", "RIGHT", "UP", "ABOVE", "RIGHT", "DOWN"]:
+            self.result  = pandir
             self.argstep = 1
-            name         = args[argidx]
-
-            # Try aircraft first: translate a/c id into a valid position text with a lat,lon
-            idx = bs.traf.id2idx(name)
-            if idx >= 0:
-                name     = str(bs.traf.lat[idx]) + "," + str(bs.traf.lon[idx])
-
-            # Check next arg if available
-            elif argidx < len(args) - 1:
-                # lat,lon ? Combine into one string with a comma
-                if islat(args[argidx]):
-                    name = args[argidx] + "," + args[argidx + 1]
-                    self.argstep = 2   # we used two arguments
-
-                # apt,runway ? Combine into one string with a slash as separator
-                elif args[argidx + 1][:2].upper() == "RW" and args[argidx] in bs.navdb.aptid:
-                    name = args[argidx] + "/" + args[argidx + 1].upper()
-                    self.argstep = 2   # we used two arguments
-
-            # Return something different for the two argtypes:
-
-            # wpt argument type: simply return positiontext, no need it look up nw
-            if argtype == "wpt":
-                self.result = [name]
-                return True
+            return True
+        else:
+            self.error = pandir + ' is not a valid pan argument'
+            return False
 
-            # lat/lon argument type we also need to it up:
-            elif argtype == "latlon":
-                # Set default reference lat,lon for duplicate name in navdb to screen
-                if Argparser.reflat < -180.:  # No reference avaiable yet: use screen center
-                    Argparser.reflat = bs.scr.ctrlat
-                    Argparser.reflon = bs.scr.ctrlon
-
-                success, posobj = txt2pos(name, Argparser.reflat, Argparser.reflon)
-
-                if success:
-                    # for runway type, get heading as default optional argument for command line
-                    if posobj.type == "rwy":
-                        aptname, rwyname = name.split('/RW')
-                        rwyname = rwyname.lstrip('Y')
-                        try:
-                            self.additional['hdg'] = bs.navdb.rwythresholds[aptname][rwyname][2]
-                        except:
-                            pass
-
-                    # Update reference lat/lon
-                    Argparser.reflat = posobj.lat
-                    Argparser.reflon = posobj.lon
-
-                    self.result = [posobj.lat, posobj.lon]
-                    return True
-                else:
-                    self.error = posobj  # contains error message if txt2pos was no success
-                    return False
-
-        # Pan direction: check for valid string value
-        elif argtype == "pandir":
-            pandir = args[argidx].upper().strip()
-            if pandir in ["LEFT", "RIGHT", "UP", "ABOVE", "RIGHT", "DOWN"]:
-                self.result  = pandir
-                self.argstep = 1
-                return True
-            else:
-                self.error = pandir + ' is not a valid pan argument'
-                return False
+    def parse_spd(self, argidx, args):
+        """ CAS[kts] Mach: convert kts to m/s for values=>1.0 (meaning CAS) """
+        try:
+            spd = float(args[argidx].upper()
+                   .replace("M0.", ".").replace("M", ".").replace("..", "."))
 
-        # CAS[kts] Mach: convert kts to m/s for values=>1.0 (meaning CAS)
-        elif argtype == "spd":
+            if not (0.1 < spd < 1.0 or args[argidx].count("M") > 0):
+                spd = spd * kts
+            self.result  = [spd]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Could not parse "' + args[argidx] + '" as speed'
+            return False
 
-            try:
-                spd = float(args[argidx].upper()
-                       .replace("M0.", ".").replace("M", ".").replace("..", "."))
+    def parse_vspd(self, argidx, args):
+        """ Vertical speed: convert fpm to in m/s """
+        try:
+            self.result  = [fpm * float(args[argidx])]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Could not parse "' + args[argidx] + '" as vertical speed'
+            return False
 
-                if not (0.1 < spd < 1.0 or args[argidx].count("M") > 0):
-                    spd = spd * kts
-                self.result  = [spd]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Could not parse "' + args[argidx] + '" as speed'
-                return False
+    def parse_alt(self, argidx, args):
+        """ Altitude convert ft or FL to m: FL250 or 25000 [ft] """
+        alt = txt2alt(args[argidx])
 
-        # Vertical speed: convert fpm to in m/s
-        elif argtype == "vspd":
-            try:
-                self.result  = [fpm * float(args[argidx])]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Could not parse "' + args[argidx] + '" as vertical speed'
-                return False
+        if alt > -1e8:
+            self.result  = [alt * ft]
+            self.argstep = 1
+            return True
+        else:
+            self.error = 'Could not parse "' + args[argidx] + '" as altitude'
+            return False
 
-        # Altutide convert ft or FL to m
-        elif argtype == "alt":  # alt: FL250 or 25000 [ft]
-            alt = txt2alt(args[argidx])
+    def parse_hdg(self, argidx, args):
+        """ Heading: return float in degrees """
+        try:
+            # TODO: take care of difference between magnetic/true heading
+            hdg = float(args[argidx].upper().replace('T', '').replace('M', ''))
+            self.result  = [hdg]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Could not parse "' + args[argidx] + '" as heading'
+            return False
 
-            if alt > -1e8:
-                self.result  = [alt * ft]
-                self.argstep = 1
-                return True
+    def parse_time(self, argidx, args):
+        """ Time: convert time MM:SS.hh or HH:MM:SS.hh to a float in seconds """
+        try:
+            ttxt = args[argidx].strip().split(':')
+            if len(ttxt) >= 3:
+                ihr  = int(ttxt[0]) * 3600.0
+                imin = int(ttxt[1]) * 60.0
+                xsec = float(ttxt[2])
+                self.result = [ihr + imin + xsec]
             else:
-                self.error = 'Could not parse "' + args[argidx] + '" as altitude'
-                return False
-
-        # Heading: return float in degrees
-        elif argtype == "hdg":
-            try:
-                # TODO: take care of difference between magnetic/true heading
-                hdg = float(args[argidx].upper().replace('T', '').replace('M', ''))
-                self.result  = [hdg]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Could not parse "' + args[argidx] + '" as heading'
-                return False
-
-        # Time: convert time MM:SS.hh or HH:MM:SS.hh to a float in seconds
-        elif argtype == "time":
-            try:
-                ttxt = args[argidx].strip().split(':')
-                if len(ttxt) >= 3:
-                    ihr  = int(ttxt[0]) * 3600.0
-                    imin = int(ttxt[1]) * 60.0
-                    xsec = float(ttxt[2])
-                    self.result = [ihr + imin + xsec]
-                else:
-                    self.result = [float(args[argidx])]
-                self.argstep = 1
-                return True
-            except ValueError:
-                self.error = 'Could not parse "' + args[argidx] + '" as time'
-                return False
-
-        # Argument not found: return False
-        self.error = 'Unknown argument type: ' + argtype
-        return False
+                self.result = [float(args[argidx])]
+            self.argstep = 1
+            return True
+        except ValueError:
+            self.error = 'Could not parse "' + args[argidx] + '" as time'
+            return False
+
+    # Parse functions per argument type
+    parsefuns = {"acid": parse_acid,
+                 "wpinroute": parse_wpinroute,
+                 "float": parse_float,
+                 "int": parse_int,
+                 "onoff": parse_onoff,
+                 "bool": parse_onoff,
+                 "wpt": parse_wpt,
+                 "latlon": parse_latlon,
+                 "pandir": parse_pandir,
+                 "spd": parse_spd,
+                 "vspd": parse_vspd,
+                 "alt": parse_alt,
+                 "hdg": parse_hdg,
+                 "time": parse_time}
 
 
 def distcalc(lat0, lon0, lat1, lon1):
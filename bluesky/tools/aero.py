@@ -41,6 +41,12 @@ a0  = np.sqrt(gamma*R*T0)   # sea level speed of sound ISA
 #   T = vtemperature(h)    # calculates temperature [K] (saves time rel to atmos)
 #   rho = vdensity(h)      # calls atmos but retruns only pressure [Pa]
 #
+#   p,rho,T,a = vatmosstate(h,dtemp,dpres) # full atmospheric state incl.
+#                          # speed of sound, optionally for non-ISA conditions
+#                          # and/or from a lookup table (setatmostable)
+#   hp = vpalt(p)          # ISA pressure altitude [m] for pressure p [Pa]
+#   hp = vdtempalt(h,dtemp) # pressure altitude [m] for a temperature deviation
+#
 #  Speed conversion at altitude h[m] in ISA:
 #
 # M   = vtas2mach(tas,h)  # true airspeed (tas) to mach number conversion
@@ -51,6 +57,10 @@ a0  = np.sqrt(gamma*R*T0)   # sea level speed of sound ISA
 # cas = vtas2cas(tas,h)   # tas to cas conversion both m/s, h in [m]
 # cas = vmach2cas(M,h)    # Mach to cas conversion cas in m/s, h in [m]
 # M   = vcas2mach(cas,h)   # cas to mach copnversion cas in m/s, h in [m]
+#
+#  All vectorised speed conversions accept an optional atm argument with a
+#  precomputed atmospheric state (p,rho,T,a) from vatmosstate(h), to avoid
+#  re-evaluating the atmosphere for every conversion at the same altitudes.
 
 # Atmosphere up to 22 km (72178 ft)
 
@@ -75,6 +85,106 @@ def vatmos(h):  # h in m
     return p, rho, T
 
 
+def vatmosstate(h, dtemp=None, dpres=None):  # h in m
+    """ Atmospheric state at altitude h [m]: pressure [Pa], density [kg/m3],
+        temperature [K] and speed of sound [m/s]. When a lookup table is
+        active (see setatmostable) the state is interpolated from the table.
+        The result can be passed as atm argument to the speed conversions.
+
+        Non-ISA conditions are given by a temperature deviation dtemp [K] and
+        a sea level pressure deviation dpres [Pa], which scales the pressure
+        at all altitudes. With a temperature deviation the ISA state is taken
+        at the pressure altitude of h (see vdtempalt), so the pressure, and
+        with it the pressure altitude and the crossover altitude, follow the
+        warmer or colder air column. """
+    if dtemp is not None:
+        h = vdtempalt(h, dtemp)
+
+    if atmostable is not None:
+        p, rho, T, a = atmostable.lookup(h)
+    else:
+        p, rho, T = vatmos(h)
+        a = None
+
+    # Apply deviations from ISA, density follows from the gas law
+    if dtemp is not None or dpres is not None:
+        if dpres is not None:
+            p = p * (1. + dpres / p0)
+        if dtemp is not None:
+            T = T + dtemp
+        rho = p / (R * T)
+        a   = None
+
+    if a is None:
+        a = np.sqrt(gamma * R * T)
+
+    return p, rho, T, a
+
+
+class AtmosTable(object):
+    """ Lookup table of the vectorised atmosphere on a fixed altitude axis,
+        interpolated linearly in single precision. """
+    def __init__(self, dh=5.0, hmax=22000., dtype=np.float32):
+        self.dtype = dtype
+        self.invdh = dtype(1.0 / dh)
+        h          = np.arange(0., hmax + dh, dh)
+        p, rho, T  = vatmos(h)
+        self.nseg  = len(h) - 1
+
+        # Per quantity (p, rho, T, a): value at start of segment and increment
+        self.base  = []
+        self.slope = []
+        for col in (p, rho, T, np.sqrt(gamma * R * T)):
+            col = col.astype(dtype)
+            self.base.append(col[:-1])
+            self.slope.append(np.diff(col))
+
+    def lookup(self, h):
+        x = np.clip(np.asarray(h, dtype=self.dtype) * self.invdh, 0., self.nseg)
+        i = np.minimum(x.astype(np.int32), self.nseg - 1)
+        f = x - i
+        return tuple(b.take(i) + s.take(i) * f for b, s in zip(self.base, self.slope))
+
+
+# Active atmosphere lookup table, None = exact evaluation (default)
+atmostable = None
+
+# ISA pressure at the tropopause (11 km)
+p11 = vatmos(11000.)[0]
+
+
+def setatmostable(flag=True, dh=5.0, dtype=np.float32):
+    """ Switch the lookup table mode of vatmosstate on or off. """
+    global atmostable
+    atmostable = AtmosTable(dh, dtype=dtype) if flag else None
+
+
+def vpalt(p):   # p [Pa]
+    """ ISA pressure altitude [m] for a static pressure p [Pa] (up to 22 km) """
+    p = np.array(p)
+
+    # Troposphere and isothermal stratosphere (p11 = pressure at 11 km),
+    # exponent consistent with vatmos
+    htrop  = T0 / beta * ((p / p0)**(1. / 5.256848030018761) - 1.)
+    hstrat = 11000. - 6341.552161 * np.log(p / p11)
+
+    return np.where(p > p11, htrop, hstrat)
+
+
+def vdtempalt(h, dtemp):  # h [m], dtemp [K]
+    """ ISA pressure altitude [m] at altitude h [m] for a temperature
+        deviation dtemp [K] from ISA, from the hydrostatic equation:
+            h = hp + dtemp * integral(dhp / Tisa(hp)) from 0 to hp
+        solved by fixed-point iteration (dtemp / T is small) """
+    h  = np.asarray(h, dtype=float)
+    hp = h
+    for i in range(4):
+        ftrop  = np.log(np.maximum(T0 + beta * hp, 216.65) / T0) / beta
+        fstrat = np.log(216.65 / T0) / beta + (hp - 11000.) / 216.65
+        hp     = h - dtemp * np.where(hp < 11000., ftrop, fstrat)
+    return hp
+
+
 def vtemp(h):         # h [m]
     h = np.array(h)
 
@@ -103,85 +213,89 @@ def vvsound(h):  # Speed of sound for given altitude h [m]
 
 
 # ---------Speed conversions---h in [m]------------------
-def vtas2mach(tas, h):
+# Optional argument atm: precomputed (p,rho,T,a) at h, see vatmosstate
+def vtas2mach(tas, h, atm=None):
     """ True airspeed (tas) to mach number conversion """
     tas = np.array(tas)
 
-    a = vvsound(h)
+    a = vvsound(h) if atm is None else atm[3]
     M = tas / a
     return M
 
 
-def vmach2tas(M, h):
+def vmach2tas(M, h, atm=None):
     """ True airspeed (tas) to mach number conversion """
     M = np.array(M)
 
-    a = vvsound(h)
+    a = vvsound(h) if atm is None else atm[3]
     tas = M * a
     return tas
 
 
-def veas2tas(eas, h):
+def veas2tas(eas, h, atm=None):
     """ Equivalent airspeed to true airspeed """
     eas = np.array(eas)
 
-    rho = vdensity(h)
+    rho = vdensity(h) if atm is None else atm[1]
     tas = eas * np.sqrt(rho0 / rho)
     return tas
 
 
-def vtas2eas(tas, h):
+def vtas2eas(tas, h, atm=None):
     """ True airspeed to equivent airspeed """
     tas = np.array(tas)
 
-    rho = vdensity(h)
+    rho = vdensity(h) if atm is None else atm[1]
     eas = tas*np.sqrt(rho / rho0)
     return eas
 
 
-def vcas2tas(cas, h):
+def vcas2tas(cas, h, atm=None):
     """ cas2tas conversion both m/s """
     cas = np.array(cas)
 
-    p, rho, T = vatmos(h)
+    p, rho    = vatmos(h)[:2] if atm is None else atm[:2]
     qdyn      = p0*((1.+rho0*cas*cas/(7.*p0))**3.5-1.)
     tas       = np.sqrt(7.*p/rho*((1.+qdyn/p)**(2./7.)-1.))
     return tas
 
 
-def vtas2cas(tas, h):
+def vtas2cas(tas, h, atm=None):
     """ tas2cas conversion both m/s """
     tas = np.array(tas)
 
-    p, rho, T = vatmos(h)
+    p, rho    = vatmos(h)[:2] if atm is None else atm[:2]
     qdyn      = p*((1.+rho*tas*tas/(7.*p))**3.5-1.)
     cas       = np.sqrt(7.*p0/rho0*((qdyn/p0+1.)**(2./7.)-1.))
     return cas
 
 
-def vmach2cas(M, h):
+def vmach2cas(M, h, atm=None):
     """ Mach to CAS conversion """
     M = np.array(M)
 
-    tas = vmach2tas(M, h)
-    cas = vtas2cas(tas, h)
+    atm = vatmosstate(h) if atm is None else atm
+    tas = vmach2tas(M, h, atm)
+    cas = vtas2cas(tas, h, atm)
     return cas
 
 
-def vcas2mach(cas, h):
+def vcas2mach(cas, h, atm=None):
     """ CAS to Mach conversion """
     cas = np.array(cas)
 
-    tas = vcas2tas(cas, h)
-    M   = vtas2mach(tas, h)
+    atm = vatmosstate(h) if atm is None else atm
+    tas = vcas2tas(cas, h, atm)
+    M   = vtas2mach(tas, h, atm)
     return M
 
-def vcasormach(spd, h):
+def vcasormach(spd, h, atm=None):
     spd = np.array(spd)
 
-    tas = np.where(np.abs(spd) < 2.0, vmach2tas(spd, h), vcas2tas(spd, h))
-    cas = np.where(np.abs(spd) < 2.0, vmach2cas(spd, h), spd)
-    m = np.where(np.abs(spd) < 2.0, spd, vcas2mach(spd, h))
+    atm = vatmosstate(h) if atm is None else atm
+    tas = np.where(np.abs(spd) < 2.0, vmach2tas(spd, h, atm), vcas2tas(spd, h, atm))
+    cas = np.where(np.abs(spd) < 2.0, vmach2cas(spd, h, atm), spd)
+    m = np.where(np.abs(spd) < 2.0, spd, vcas2mach(spd, h, atm))
 
     return tas, cas, m
 
@@ -3,16 +3,29 @@
 # ToDo: Add description in comments
 
 import os
+import time
 import numbers
 from datetime import datetime
+from functools import partial
+from threading import Thread
+from Queue import Queue, Full
 import numpy as np
+import bluesky as bs
 from bluesky import settings, stack
 
 # Register settings defaults
-settings.set_variable_defaults(log_path='output')
+# log_async: write the log files in a background thread per logger
+# log_queue_size: maximum number of log chunks waiting to be written
+# log_queue_policy: when the queue is full, BLOCK the simulation until there
+#                   is room, DROP the chunk, or GROW the queue
+settings.set_variable_defaults(log_path='output', log_async=False, log_queue_size=100,
+                               log_queue_policy='BLOCK')
 
 logprecision = '%.8f'
 
+# First header line of binary log files (see CSVLogger.writebinary)
+binlogmarker = 'BlueSky binary log, version 1'
+
 # Dict to contain the definitions of periodic loggers
 periodicloggers = dict()
 
@@ -28,11 +41,13 @@ def registerLogParameters(name, dataparent):
     return allloggers[name]
 
 
-def defineLogger(name, header):
+def defineLogger(name, header, columns=None):
+    """ Define a logger with a header text. columns is the list of names of
+        the columns passed to log(), for loggers without log parameters """
     if name not in allloggers:
         allloggers[name] = CSVLogger(name)
 
-    allloggers[name].setheader(header)
+    allloggers[name].setheader(header, columns)
     return allloggers[name]
 
 
@@ -64,22 +79,12 @@ def reset():
         log.reset()
 
 
-def makeLogfileName(logname):
+def makeLogfileName(logname, ext='log'):
     timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
-    fname     = "%s_%s_%s.log" % (logname, stack.get_scenname(), timestamp)
+    fname     = "%s_%s_%s.%s" % (logname, stack.get_scenname(), timestamp, ext)
     return settings.log_path + '/' + fname
 
 
-def col2txt(col):
-    if isinstance(col[0], numbers.Integral):
-        return np.char.mod('%d', col)
-    elif isinstance(col[0], numbers.Number):
-        return np.char.mod(logprecision, col)
-
-    # The input is not a number
-    return col
-
-
 def num2txt(num):
     if isinstance(num, numbers.Integral):
         return '%d' % num
@@ -90,6 +95,87 @@ def num2txt(num):
     return num
 
 
+def colformat(col):
+    """ Text format of a log column: '%d' or logprecision for numeric columns,
+        '%s' for other columns, and None for an empty column, of which the
+        type is not known yet """
+    col = np.asarray(col)
+    if col.ndim > 0 and len(col) == 0:
+        return None
+    if col.dtype.kind in 'iu':
+        return '%d'
+    elif col.dtype.kind == 'f':
+        return logprecision
+    return '%s'
+
+
+def snapshot(col):
+    """ Copy of a log column that is not changed by the simulation """
+    if isinstance(col, np.ndarray):
+        return col.copy()
+    elif isinstance(col, list):
+        return list(col)
+
+    # Numbers and text are immutable
+    return col
+
+
+class LogWriter(Thread):
+    """ Background thread writing the log data of a logger to its file,
+        so that the simulation does not wait for the disk """
+    def __init__(self, logger, maxsize, policy):
+        super(LogWriter, self).__init__(name=logger.name + ' writer')
+        self.daemon   = True
+        self.logger   = logger
+        self.policy   = policy.upper()
+        self.queue    = Queue(0 if self.policy == 'GROW' else maxsize)
+        self.nwritten = 0    # number of chunks written
+        self.ndropped = 0    # number of chunks dropped because the queue was full
+        self.nbytes   = 0    # number of bytes written
+        self.twrite   = 0.0  # time spent writing [s]
+        self.error    = None # write error, handled by the simulation thread
+
+    def put(self, *item):
+        if self.policy == 'DROP':
+            try:
+                self.queue.put_nowait(item)
+            except Full:
+                self.ndropped += 1
+        else:
+            # Blocks when the queue is full (never with GROW)
+            self.queue.put(item)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            # After an error the remaining chunks are discarded: the
+            # simulation thread closes the logger (see CSVLogger.log)
+            if self.error is not None:
+                continue
+            t0   = time.time()
+            try:
+                pos0 = self.logger.file.tell()
+                self.logger.write(*item)
+                self.nbytes += self.logger.file.tell() - pos0
+            except Exception as e:
+                self.error = e
+                continue
+            self.twrite   += time.time() - t0
+            self.nwritten += 1
+
+    def stop(self):
+        """ Write the remaining chunks, and stop the thread """
+        self.queue.put(None)
+        self.join()
+
+    def info(self):
+        return 'Background writer: %d chunks queued, %d written, %d dropped (%s), %.1f MB/s' % \
+            (self.queue.qsize(), self.nwritten, self.ndropped, self.policy,
+             1e-6 * self.nbytes / max(1e-6, self.twrite))
+
+
 class CSVLogger:
     # Simulation time is static, shared between all loggers
     simt = 0.0
@@ -99,9 +185,16 @@ class CSVLogger:
         self.file        = None
         self.dataparents = []
         self.header      = ''
+        self.columns     = []
         self.tlog        = 0.0
         self.allvars     = []
         self.selvars     = []
+        self.binary      = False
+        self.writer      = None
+
+        # Column plan of the selected variables (see makeplan)
+        self.getters     = []
+        self.formats     = []
 
         # In case this is a periodic logger: log timestep
         self.dt          = 0.0
@@ -109,7 +202,7 @@ class CSVLogger:
 
         # Register a command for this logger in the stack
         stackcmd = {name : [
-            name + ' ON/OFF,[dt] or LISTVARS or SELECTVARS var1,...,varn',
+            name + ' ON/OFF,[dt],[TEXT/BINARY] or LISTVARS or SELECTVARS var1,...,varn',
             '[txt,float/txt,...]', self.stackio, name+" data logging on"]
         }
         stack.append_commands(stackcmd)
@@ -143,8 +236,9 @@ class CSVLogger:
         del obj.log_attrs
         self.dataparents.pop()
 
-    def setheader(self, header):
+    def setheader(self, header, columns=None):
         self.header     = header.split('\n')
+        self.columns    = columns or []
 
     def setdt(self, dt):
         self.dt         = dt
@@ -158,20 +252,48 @@ class CSVLogger:
             if len(cursel) > 0:
                 # Add non-empty result with parent object to selected log variables
                 self.selvars.append((logset[0], list(cursel)))
+        self.makeplan()
+
+    def makeplan(self):
+        """ Make the list of selected columns, with per column a function
+            returning its current value, and its text format. The format of
+            an empty column is determined when it has data (see log). """
+        self.getters = [partial(obj.__dict__.get, vname)
+                        for obj, vnames in self.selvars for vname in vnames]
+        self.formats = [colformat(getter()) for getter in self.getters]
 
     def open(self, fname):
-        if self.file:
-            self.file.close()
-        self.file       = open(fname, 'w')
+        self.close()
+        self.file       = open(fname, 'wb' if self.binary else 'w')
         # Write the header
+        if self.binary:
+            self.file.write('# ' + binlogmarker + '\n')
         for line in self.header:
             self.file.write('# ' + line + '\n')
         # Write the column contents
         columns = ['simt']
         for logset in self.selvars:
             columns += logset[1]
+        columns += self.columns
         self.file.write('# ' + str.join(', ', columns) + '\n')
 
+        self.makeplan()
+        if settings.log_async:
+            self.writer = LogWriter(self, settings.log_queue_size, settings.log_queue_policy)
+            self.writer.start()
+
+    def close(self):
+        if self.writer:
+            # Write the remaining chunks, and report an error of the writer
+            self.writer.stop()
+            if self.writer.error is not None:
+                bs.scr.echo('Error writing ' + self.name + ': ' + str(self.writer.error) +
+                            '\n' + self.name + ' is switched off')
+            self.writer = None
+        if self.file:
+            self.file.close()
+            self.file   = None
+
     def isopen(self):
         return self.file is not None
 
@@ -181,28 +303,65 @@ class CSVLogger:
             self.tlog += self.dt
 
             # Make the variable reference list
-            varlist = [v[0].__dict__.get(vname) for v in self.selvars for vname in v[1]]
+            varlist = [getter() for getter in self.getters]
             varlist += additional_vars
 
-            # Convert (numeric) arrays to text, leave text arrays untouched
-            if isinstance(varlist[0], str):
-                txtdata = [str(self.simt)] + [num2txt(col) for col in varlist]
-            else:
-                nrows = len(varlist[0])
-                if nrows == 0:
-                    return
-                txtdata = [nrows * [str(self.simt)]] + [col2txt(col) for col in varlist]
+            # Formats of the columns that were empty when the plan was made
+            if None in self.formats:
+                self.formats = [fmt or colformat(col) for fmt, col in zip(self.formats, varlist)]
 
-            # log the data to file
-            np.savetxt(self.file, np.vstack(txtdata).T, delimiter=',', newline='\n', fmt='%s')
+            if self.writer:
+                # After a write error the logger is closed
+                if self.writer.error is not None:
+                    self.close()
+                    return
+                # The writer thread writes a copy of the data
+                self.writer.put(self.simt, [snapshot(col) for col in varlist], self.formats)
+            else:
+                self.write(self.simt, varlist, self.formats)
+
+    def write(self, simt, varlist, formats):
+        if self.binary:
+            self.writebinary(simt, varlist)
+            return
+
+        # Single row of values
+        if isinstance(varlist[0], str):
+            self.file.write(str.join(',', [str(simt)] + [str(num2txt(col)) for col in varlist]) + '\n')
+            return
+
+        if len(varlist[0]) == 0:
+            return
+
+        # Format of a row: simt, followed by the column formats of the plan
+        # and of the additional columns
+        formats = formats + [colformat(col) for col in varlist[len(formats):]]
+        rowfmt  = str(simt) + ',' + str.join(',', [fmt or '%s' for fmt in formats])
+        columns = [col.tolist() if isinstance(col, np.ndarray) else col for col in varlist]
+
+        # log the data to file
+        self.file.write(str.join('\n', [rowfmt % row for row in zip(*columns)]) + '\n')
+
+    def writebinary(self, simt, varlist):
+        """ Append the columns to a binary log file as one chunk: the
+            simulation time and the number of columns, followed by the columns
+            in .npy format, each with its own dtype """
+        columns = [np.atleast_1d(np.asarray(col)) for col in varlist]
+        if len(columns[0]) == 0:
+            return
+
+        np.save(self.file, np.array([simt, len(columns)]))
+        for col in columns:
+            # Columns of python objects are stored as text
+            np.save(self.file, col.astype(str) if col.dtype == object else col,
+                    allow_pickle=False)
 
     def reset(self):
         self.dt         = self.default_dt
         self.tlog       = 0.0
         self.selvars    = self.allvars
-        if self.file:
-            self.file.close()
-            self.file   = None
+        self.binary     = False
+        self.close()
 
     def listallvarnames(self):
         ret = []
@@ -218,18 +377,26 @@ class CSVLogger:
             else:
                 text += 'a non-periodic logger.\n'
             text += self.name + ' is ' + ('ON' if self.isopen() else 'OFF') + \
-                '\nUsage: ' + self.name + ' ON/OFF,[dt] or LISTVARS or SELECTVARS var1,...,varn'
+                ('\n' + self.writer.info() if self.writer else '') + \
+                '\nUsage: ' + self.name + ' ON/OFF,[dt],[TEXT/BINARY] or LISTVARS or SELECTVARS var1,...,varn'
             return True, text
         elif args[0] == 'ON':
             self.tlog = self.simt
-            # Set log dt if passed
-            if len(args) > 1:
-                if type(args[1]) is float:
-                    self.dt = args[1]
+            # Set log dt and file format if passed
+            binary = self.binary
+            for arg in args[1:]:
+                if type(arg) is float:
+                    self.dt = arg
+                elif arg in ('TEXT', 'BINARY'):
+                    binary = (arg == 'BINARY')
                 else:
-                    return False, 'Turn ' + self.name + ' on with optional dt'
+                    return False, 'Turn ' + self.name + ' on with optional dt and TEXT/BINARY format'
 
-            self.open(makeLogfileName(self.name))
+            # Write the queued rows of an open file in its own format, before
+            # switching the format
+            self.close()
+            self.binary = binary
+            self.open(makeLogfileName(self.name, 'blog' if self.binary else 'log'))
 
         elif args[0] == 'OFF':
             self.reset()
@@ -21,6 +21,37 @@ class RegisterElementParameters():
         self.parent.MakeParameterLists(set(self.parent.__dict__.keys()) - self.keys0)
 
 
+class ElementSubset():
+    """ Class to use in 'with'-syntax. Within the with-block, the registered
+        arrays of the DynamicArrays parents only contain the elements idx.
+        At the end of the block, the (updated) elements are written back into
+        the complete arrays. """
+
+    def __init__(self, idx, *parents):
+        self.idx     = idx
+        self.parents = parents
+
+    def __enter__(self):
+        self.arrays = [[(v, parent.Vars[v]) for v in parent.ArrVars] for parent in self.parents]
+        for parent, arrays in zip(self.parents, self.arrays):
+            for v, arr in arrays:
+                parent.Vars[v] = arr[self.idx]
+
+    def __exit__(self, type, value, tb):
+        written = set()
+        for parent, arrays in zip(self.parents, self.arrays):
+            for v, arr in arrays:
+                sub = parent.Vars[v]
+                # Write into a copy when the array is shared with an array
+                # that is already written back (e.g. gs and tas without wind),
+                # or when the block changed its type
+                if id(arr) in written or (isinstance(sub, np.ndarray) and sub.dtype != arr.dtype):
+                    arr = arr.astype(sub.dtype if isinstance(sub, np.ndarray) else arr.dtype)
+                written.add(id(arr))
+                arr[self.idx] = sub
+                parent.Vars[v] = arr
+
+
 class DynamicArrays(object):
     """ Parent class to use separate arrays and lists to allow
         vectorizing but still maintain and object like benefits
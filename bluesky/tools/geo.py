@@ -125,7 +125,7 @@ def qdrdist_matrix(lat1, lon1, lat2, lon2):
     r = np.where(np.invert(condition), r, (np.divide(np.multiply
       (0.5, ((np.multiply(abs(lat1), (rwgs84_matrix(lat1)+a))).T +
          np.multiply(abs(lat2), (rwgs84_matrix(lat2)+a)))),
-            (abs(lat1)).T+(abs(lat2)+(lat1 == 0.)*0.000001))))  # different hemisphere
+            (abs(lat1)).T+(abs(lat2)+(lat2 == 0.)*0.000001))))  # different hemisphere
 
     diff_lat = lat2-lat1.T
     diff_lon = lon2-lon1.T
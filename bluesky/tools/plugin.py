@@ -6,6 +6,7 @@ from glob import glob
 import imp
 import bluesky as bs
 from bluesky import settings
+from bluesky.tools import scheduler
 
 # Register settings defaults
 settings.set_variable_defaults(plugin_path='plugins', enabled_plugins=['datafeed'])
@@ -112,6 +113,10 @@ if settings.node_only or settings.gui == 'pygame':
     update_funs    = dict()
 
     def load(name, descr):
+        # The update functions are scheduled under the plugin name,
+        # which should not replace a task of the simulation itself
+        if name in scheduler.tasks or name + '.PRE' in scheduler.tasks:
+            return False, 'Failed to load %s: name is already used by task %s' % (name, name)
         try:
             # Load the plugin
             mod    = imp.find_module(descr.module_name, [descr.module_path])
@@ -122,10 +127,13 @@ if settings.node_only or settings.gui == 'pygame':
             dt     = max(config.get('update_interval', 0.0), bs.sim.simdt)
             prefun = config.get('preupdate', None)
             updfun = config.get('update', None)
+            # The update functions are scheduled as tasks on a grid of
+            # update times, with the first update one interval from now
+            tstart = bs.sim.simt + dt
             if prefun:
-                preupdate_funs[name] = [bs.sim.simt + dt, dt, prefun]
+                preupdate_funs[name] = [scheduler.register(name + '.PRE', dt, phase=0.0, tstart=tstart), prefun]
             if updfun:
-                update_funs[name]    = [bs.sim.simt + dt, dt, updfun]
+                update_funs[name]    = [scheduler.register(name, dt, phase=0.0, tstart=tstart), updfun]
             # Add the plugin's stack functions to the stack
             bs.stack.append_commands(stackfuns)
             return True, 'Successfully loaded %s' % name
@@ -137,33 +145,29 @@ if settings.node_only or settings.gui == 'pygame':
         cmds, docs = zip(*descr.plugin_stack)
         bs.stack.remove_commands(cmds)
         active_plugins.pop(name)
-        preupdate_funs.pop(name)
-        update_funs.pop(name)
+        preupdate_funs.pop(name, None)
+        update_funs.pop(name, None)
+        scheduler.remove(name + '.PRE')
+        scheduler.remove(name)
 
     def preupdate(simt):
-        for fun in preupdate_funs.values():
+        for task, fun in preupdate_funs.values():
             # Call function if its update interval has passed
-            if simt >= fun[0]:
-                # Set the next triggering time for this function
-                fun[0] += fun[1]
-                # Call the function
-                fun[2]()
+            if task.due(simt):
+                fun()
 
     def update(simt):
-        for fun in update_funs.values():
+        for task, fun in update_funs.values():
             # Call function if its update interval has passed
-            if simt >= fun[0]:
-                # Set the next triggering time for this function
-                fun[0] += fun[1]
-                # Call the function
-                fun[2]()
+            if task.due(simt):
+                fun()
 
     def reset():
-        for fun in preupdate_funs.values():
-            fun[0] = 0.0
+        for task, fun in preupdate_funs.values():
+            task.reset()
 
-        for fun in update_funs:
-            fun[0] = 0.0
+        for task, fun in update_funs.values():
+            task.reset()
 
 else:
     def load(name, descr):
@@ -1,14 +1,49 @@
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+from math import floor
 import bluesky as bs
+from bluesky import settings
 from misc import txt2lat, txt2lon
 
+# Register settings defaults
+settings.set_variable_defaults(poscache_size=5000, poscache_bucket=1.0)
+
+# Cache of the positions found in the navdb, least recently used first.
+# Names that occur more than once in the waypoint database are stored per
+# reference position bucket of poscache_bucket degrees.
+poscache   = OrderedDict()
+cachetypes = ("apt", "rwy", "nav")
+
 def txt2pos(name, reflat, reflon):
-    pos = Position(name.upper().strip(), reflat, reflon)
-    if not pos.error:
-        return True,pos
+    txt = name.upper().strip()
+    if txt in poscache:
+        key = txt
     else:
-        return False,name+" not found in database"
+        key = (txt, int(floor(reflat / settings.poscache_bucket)),
+                    int(floor(reflon / settings.poscache_bucket)))
+
+    # Move a cached position to the end (most recently used)
+    pos = poscache.pop(key, None)
+    if pos is None:
+        pos = Position(txt, reflat, reflon)
+        if pos.error:
+            return False,name+" not found in database"
+        if pos.type not in cachetypes:
+            return True,pos
+
+        # Only the closest of duplicate waypoints depends on the reference
+        if pos.type != "nav" or bs.navdb.wpid.count(txt) == 1:
+            key = txt
+        if len(poscache) >= settings.poscache_size:
+            poscache.popitem(last=False)
+
+    poscache[key] = pos
+    return True,pos
+
+def clearcache():
+    # Cached positions are invalid when waypoints are added or the navdb is reloaded
+    poscache.clear()
 
 def islat(txt):
     # Is it a latitude-like format or not?
@@ -0,0 +1,39 @@
+""" Independent, reproducible random number streams per simulation subsystem.
+
+    Each subsystem (e.g. turbulence, ADS-B noise) draws from its own stream,
+    so its random sequence only depends on the seed and on its own calls,
+    and not on the order in which other subsystems use random numbers.
+
+    Methods:
+        getstream(name) : get (or create) the RandomState stream of a subsystem
+        seed(value)     : (re)seed all streams, derived from one global seed
+"""
+from zlib import crc32
+import numpy as np
+
+# Global seed (None = seeded from OS entropy) and streams by subsystem name
+globalseed = None
+streams    = dict()
+
+
+def streamseed(name):
+    """ Seed of a stream: combination of global seed and stream name """
+    return [int(globalseed) & 0xffffffff, crc32(name.encode()) & 0xffffffff]
+
+
+def getstream(name):
+    """ Get the random number stream of subsystem name """
+    name = name.upper()
+    if name not in streams:
+        streams[name] = np.random.RandomState(None if globalseed is None
+                                              else streamseed(name))
+    return streams[name]
+
+
+def seed(value):
+    """ Reseed all streams from a new global seed value. Streams keep their
+        identity, so objects holding a stream continue with the new sequence. """
+    global globalseed
+    globalseed = value
+    for name, stream in streams.items():
+        stream.seed(None if value is None else streamseed(name))
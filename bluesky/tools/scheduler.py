@@ -0,0 +1,143 @@
+""" Central scheduling of the periodic tasks in the simulation.
+
+    Modules register a task with an update interval (period). A task either
+    runs on a fixed grid of update times (phase, phase + dt, ...), or, when
+    it has no phase, whenever dt has passed since its last update. These are
+    the two timing rules the modules used before the scheduler existed, so
+    the simulation output does not change by registering a task.
+
+    A task that supports it can be split in nsplit parts: it then fires
+    nsplit times per interval, each time for one part of the aircraft, which
+    flattens the computational cost per step. Splitting (and setting a phase)
+    puts the task on a grid of update times.
+
+    A task is polled by its owner at the place in the simulation step where
+    its update belongs, so the order of the updates within a step is kept:
+
+        if self.task.due(simt):
+            ...update aircraft bs.traf.lat[self.task.part()] etc...
+
+    Methods:
+        register(name, dt, phase, ...): register a task, or get the existing one
+        remove(name)   : remove a task
+        reset()        : restart all tasks at simulation time zero
+        setcmd(...)    : TASK stack command
+"""
+# Registered tasks by name
+tasks = dict()
+
+
+class Task(object):
+    """ Periodic task.
+
+        Members:
+            dt        = update interval [s], each part is updated once per dt
+            phase     = first update time of the grid of update times [s],
+                        None: update when dt has passed since the last update
+            strict    = without phase: update only when more than dt has passed
+            nsplit    = number of parts in which the task is split
+            ipart     = part to be processed in the current update
+    """
+    def __init__(self, name, dt, phase=None, nsplit=1, splittable=False,
+                 strict=False, tstart=None):
+        self.name       = name
+        self.splittable = splittable
+        self.strict     = strict
+        self.dt         = dt
+        self.phase      = phase
+        self.nsplit     = 1
+        self.setdt(nsplit=nsplit, simt=0.0)
+        # Optional first update time other than the phase
+        if tstart is not None and self.phase is not None:
+            self.tnext = tstart
+
+    def reset(self, simt=0.0):
+        self.tprev = simt
+        self.tlast = None   # time of last update (without phase)
+        self.ipart = self.nsplit - 1
+        if self.phase is not None:
+            # First grid time at or after simt
+            step       = self.dt / self.nsplit
+            self.tnext = simt + (self.phase - simt) % step if step > 0. else simt
+
+    def setdt(self, dt=None, phase=None, nsplit=None, simt=None):
+        if dt is not None:
+            self.dt = dt
+        if phase is not None:
+            self.phase = phase
+        if nsplit is not None and self.splittable:
+            self.nsplit = max(1, int(nsplit))
+            # The parts are updated in turn on a grid of update times
+            if self.nsplit > 1 and self.phase is None:
+                self.phase = 0.0
+        self.reset(self.tprev if simt is None else simt)
+
+    def due(self, simt):
+        """ True when the task should be updated at simt """
+        # Restart when the simulation time was set back (reset, IC)
+        if simt < self.tprev:
+            self.reset(simt)
+        self.tprev = simt
+
+        # Without phase: update when dt has passed since the last update
+        if self.phase is None:
+            if self.tlast is not None:
+                if self.strict and simt - self.tlast <= self.dt:
+                    return False
+                if not self.strict and simt - self.tlast < self.dt:
+                    return False
+            self.tlast = simt
+            return True
+
+        # On the grid of update times: update at the first step at or after
+        # the next update time (catching up when the step is larger than dt)
+        if simt < self.tnext:
+            return False
+        self.tnext += self.dt / self.nsplit
+        self.ipart  = (self.ipart + 1) % self.nsplit
+        return True
+
+    def part(self):
+        """ Slice of the aircraft to process in the current update """
+        return slice(self.ipart, None, self.nsplit)
+
+
+def register(name, dt, phase=None, nsplit=1, splittable=False, strict=False,
+             tstart=None):
+    """ Register a periodic task. When the task already exists (a module is
+        recreated at a reset or a switch of performance model), the existing
+        task is returned, so its settings (e.g. from the TASK command) are kept. """
+    name = name.upper()
+    if name not in tasks:
+        tasks[name] = Task(name, dt, phase, nsplit, splittable, strict, tstart)
+    return tasks[name]
+
+
+def remove(name):
+    tasks.pop(name.upper(), None)
+
+
+def reset():
+    for task in tasks.values():
+        task.reset()
+
+
+def setcmd(name=None, dt=None, phase=None, nsplit=None):
+    """ TASK command: list the tasks, or set interval, phase offset and
+        number of parts of a task """
+    if name is None:
+        lines = ["%-12s dt = %6.2f s, phase = %s, parts = %d%s" %
+                 (task.name, task.dt,
+                  "-" if task.phase is None else "%.2f s" % task.phase, task.nsplit,
+                  "" if task.splittable else " (not splittable)")
+                 for task in sorted(tasks.values(), key=lambda task: task.name)]
+        return True, "Scheduled tasks:\n" + "\n".join(lines)
+
+    task = tasks.get(name.upper())
+    if task is None:
+        return False, "TASK: unknown task " + name
+    if nsplit is not None and nsplit > 1 and not task.splittable:
+        return False, "TASK: task " + task.name + " can not be split"
+
+    task.setdt(dt, phase, nsplit)
+    return True
@@ -3,6 +3,7 @@ import numpy as np
 import bluesky as bs
 from bluesky.tools.aero import ft
 from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools.randomstreams import getstream
 
 
 class ADSB(DynamicArrays):
@@ -22,6 +23,9 @@ class ADSB(DynamicArrays):
             self.gs         = np.array([])
             self.vs         = np.array([])
 
+        # Random stream for transmission noise and update phases
+        self.rng = getstream('ADSB')
+
         self.SetNoise(False)
 
     def SetNoise(self, n):
@@ -33,7 +37,7 @@ class ADSB(DynamicArrays):
     def create(self, n=1):
         super(ADSB, self).create(n)
 
-        self.lastupdate[-n:] = -self.trunctime * np.random.rand(n)
+        self.lastupdate[-n:] = -self.trunctime * self.rng.rand(n)
         self.lat[-n:] = bs.traf.lat[-n:]
         self.lon[-n:] = bs.traf.lon[-n:]
         self.alt[-n:] = bs.traf.alt[-n:]
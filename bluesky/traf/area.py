@@ -1,7 +1,7 @@
 """ Traffic area: delete traffic when it leaves this area (so not when outside)"""
 import numpy as np
 import bluesky as bs
-from bluesky.tools import areafilter
+from bluesky.tools import areafilter, scheduler
 
 class Area:
     def __init__(self):
@@ -9,8 +9,7 @@ class Area:
 
         # Parameters of area
         self.active = False
-        self.dt     = 5.0     # [s] frequency of area check (simtime)
-        self.t0     = -100.   # last time checked
+        self.task   = scheduler.register('AREA', 5.0, splittable=True, strict=True)  # [s] frequency of area check (simtime)
         self.name   = None
 
         # Boolean array whether aircraft are in circle or not
@@ -20,7 +19,7 @@ class Area:
         self.swtaxi = False  # Default OFF: Doesn't do anything. See comments of setTaxi fucntion below.
 
     def create(self, n=1):
-        self.inside = np.append(self.inside,False)
+        self.inside = np.append(self.inside, np.zeros(n, dtype=np.bool))
 
     def delete(self,idx):
         self.inside = np.delete(self.inside,idx)
@@ -31,17 +30,19 @@ class Area:
             pass # To be added!!!
 
         # Update area once per areadt seconds:
-        if self.active and abs(t - self.t0) > self.dt:
-            self.t0 = t
+        # (when the check is split in parts, each part of the aircraft is
+        # checked once per areadt seconds)
+        if self.active and self.task.due(t) and areafilter.hasArea(self.name):
+            sel = self.task.part()
 
             # Find out which aircraft are inside the experiment area
-            inside = areafilter.checkInside(self.name, bs.traf.lat, bs.traf.lon, bs.traf.alt)
+            inside = areafilter.checkInside(self.name, bs.traf.lat[sel], bs.traf.lon[sel], bs.traf.alt[sel])
 
             # Determine the aircraft indexes that should be deleted
-            delAircraftidx = np.intersect1d(np.where(np.array(self.inside)==True), np.where(np.array(inside)==False))
+            delAircraftidx = np.arange(bs.traf.ntraf)[sel][self.inside[sel] & ~inside]
 
             # Update self.inside with the new inside
-            self.inside = inside
+            self.inside[sel] = inside
 
             # delete all aicraft in delAircraftidx and log their flight statistics
             for acid in [bs.traf.id[idx] for idx in delAircraftidx]:
@@ -7,11 +7,23 @@ import numpy as np
 from bluesky.tools import geo
 from bluesky.tools.aero import nm
 
+# detect can update the conflict matrices for a part of the ownship aircraft
+splittable = True
 
-def detect(dbconf, traf, simt):
+
+def detect(dbconf, traf, simt, part=None):
+    """ Conflict detection. With part (a slice of the ownship aircraft), only
+        the rows of these ownships in the conflict matrices are updated; the
+        conflict lists are then made from all rows, of which the others were
+        updated in the previous parts. """
     if not dbconf.swasas:
         return
 
+    # A full detection when the aircraft have changed since the last one
+    full = part is None or dbconf.cdids != traf.id
+    rows = slice(None) if full else part
+    dbconf.cdids = list(traf.id)
+
     # Reset lists before new CD
     dbconf.iconf        = [[] for ac in range(traf.ntraf)]
     dbconf.nconf        = 0
@@ -26,27 +38,27 @@ def detect(dbconf, traf, simt):
     # Horizontal conflict ---------------------------------------------------------
 
     # qdlst is for [i,j] qdr from i to j, from perception of ADSB and own coordinates
-    qdlst = geo.qdrdist_matrix(np.mat(traf.lat), np.mat(traf.lon),
+    qdlst = geo.qdrdist_matrix(np.mat(traf.lat[rows]), np.mat(traf.lon[rows]),
                                np.mat(traf.adsb.lat), np.mat(traf.adsb.lon))
 
     # Convert results from mat-> array
-    dbconf.qdr  = np.array(qdlst[0])  # degrees
-    I           = np.eye(traf.ntraf)  # Identity matric of order ntraf
-    dbconf.dist = np.array(qdlst[1]) * nm + 1e9 * I  # meters i to j
+    qdr  = np.array(qdlst[0])  # degrees
+    I    = np.eye(traf.ntraf)[rows]  # Identity matric of order ntraf
+    dist = np.array(qdlst[1]) * nm + 1e9 * I  # meters i to j
 
     # Transmission noise
     if traf.adsb.transnoise:
         # error in the determined bearing between two a/c
-        bearingerror = np.random.normal(0, traf.adsb.transerror[0], dbconf.qdr.shape)  # degrees
-        dbconf.qdr += bearingerror
+        bearingerror = traf.adsb.rng.normal(0, traf.adsb.transerror[0], qdr.shape)  # degrees
+        qdr += bearingerror
         # error in the perceived distance between two a/c
-        disterror = np.random.normal(0, traf.adsb.transerror[1], dbconf.dist.shape)  # meters
-        dbconf.dist += disterror
+        disterror = traf.adsb.rng.normal(0, traf.adsb.transerror[1], dist.shape)  # meters
+        dist += disterror
 
     # Calculate horizontal closest point of approach (CPA)
-    qdrrad    = np.radians(dbconf.qdr)
-    dbconf.dx = dbconf.dist * np.sin(qdrrad)  # is pos j rel to i
-    dbconf.dy = dbconf.dist * np.cos(qdrrad)  # is pos j rel to i
+    qdrrad = np.radians(qdr)
+    dx     = dist * np.sin(qdrrad)  # is pos j rel to i
+    dy     = dist * np.cos(qdrrad)  # is pos j rel to i
 
     trkrad   = np.radians(traf.trk)
     dbconf.u = traf.gs * np.sin(trkrad).reshape((1, len(trkrad)))  # m/s
@@ -57,22 +69,23 @@ def detect(dbconf, traf, simt):
     adsbu = traf.adsb.gs * np.sin(adsbtrkrad).reshape((1, len(adsbtrkrad)))  # m/s
     adsbv = traf.adsb.gs * np.cos(adsbtrkrad).reshape((1, len(adsbtrkrad)))  # m/s
 
-    du = dbconf.u - adsbu.T  # Speed du[i,j] is perceived eastern speed of i to j
-    dv = dbconf.v - adsbv.T  # Speed dv[i,j] is perceived northern speed of i to j
+    du = dbconf.u - adsbu[:, rows].T  # Speed du[i,j] is perceived eastern speed of i to j
+    dv = dbconf.v - adsbv[:, rows].T  # Speed dv[i,j] is perceived northern speed of i to j
 
     dv2 = du * du + dv * dv
     dv2 = np.where(np.abs(dv2) < 1e-6, 1e-6, dv2)  # limit lower absolute value
 
     vrel = np.sqrt(dv2)
 
-    dbconf.tcpa = -(du * dbconf.dx + dv * dbconf.dy) / dv2 + 1e9 * I
+    tcpa = -(du * dx + dv * dy) / dv2 + 1e9 * I
 
     # Calculate CPA positions
     # xcpa = dbconf.tcpa * du
     # ycpa = dbconf.tcpa * dv
 
     # Calculate distance^2 at CPA (minimum distance^2)
-    dcpa2 = dbconf.dist * dbconf.dist - dbconf.tcpa * dbconf.tcpa * dv2
+    dcpa2 = dist * dist - tcpa * tcpa * dv2
+    dcpa  = np.sqrt(np.maximum(0., dcpa2))
 
     # Check for horizontal conflict
     R2 = dbconf.R * dbconf.R
@@ -82,9 +95,9 @@ def detect(dbconf, traf, simt):
     dxinhor = np.sqrt(np.maximum(0., R2 - dcpa2))  # half the distance travelled inzide zone
     dtinhor = dxinhor / vrel
 
-    tinhor = np.where(swhorconf, dbconf.tcpa - dtinhor, 1e8)  # Set very large if no conf
+    tinhor = np.where(swhorconf, tcpa - dtinhor, 1e8)  # Set very large if no conf
 
-    touthor = np.where(swhorconf, dbconf.tcpa + dtinhor, -1e8)  # set very large if no conf
+    touthor = np.where(swhorconf, tcpa + dtinhor, -1e8)  # set very large if no conf
     # swhorconf = swhorconf*(touthor>0)*(tinhor<dbconf.dtlook)
 
     # Vertical conflict -----------------------------------------------------------
@@ -94,10 +107,10 @@ def detect(dbconf, traf, simt):
     adsbalt = traf.adsb.alt.reshape((1, traf.ntraf))
     if traf.adsb.transnoise:
         # error in the determined altitude of other a/c
-        alterror = np.random.normal(0, traf.adsb.transerror[2], traf.alt.shape)  # degrees
+        alterror = traf.adsb.rng.normal(0, traf.adsb.transerror[2], traf.alt.shape)  # degrees
         adsbalt += alterror
 
-    dbconf.dalt = alt - adsbalt.T
+    dalt = alt - adsbalt[:, rows].T
 
 
     vs = traf.vs.reshape(1, len(traf.vs))
@@ -105,25 +118,36 @@ def detect(dbconf, traf, simt):
 
     avs = traf.adsb.vs.reshape(1, len(traf.adsb.vs))
 
-    dvs = vs - avs.T
+    dvs = vs - avs[:, rows].T
 
     # Check for passing through each others zone
     dvs = np.where(np.abs(dvs) < 1e-6, 1e-6, dvs)  # prevent division by zero
-    tcrosshi = (dbconf.dalt + dbconf.dh) / -dvs
-    tcrosslo = (dbconf.dalt - dbconf.dh) / -dvs
+    tcrosshi = (dalt + dbconf.dh) / -dvs
+    tcrosslo = (dalt - dbconf.dh) / -dvs
 
     tinver = np.minimum(tcrosshi, tcrosslo)
     toutver = np.maximum(tcrosshi, tcrosslo)
 
     # Combine vertical and horizontal conflict-------------------------------------
-    dbconf.tinconf = np.maximum(tinver, tinhor)
+    tinconf = np.maximum(tinver, tinhor)
 
-    dbconf.toutconf = np.minimum(toutver, touthor)
+    toutconf = np.minimum(toutver, touthor)
 
-    swconfl = swhorconf * (dbconf.tinconf <= dbconf.toutconf) * \
-        (dbconf.toutconf > 0.) * (dbconf.tinconf < dbconf.dtlookahead) \
+    swconfl = swhorconf * (tinconf <= toutconf) * \
+        (toutconf > 0.) * (tinconf < dbconf.dtlookahead) \
         * (1. - I)
 
+    # Store the results, or update the rows of this part of the ownships
+    if full:
+        dbconf.qdr, dbconf.dist, dbconf.dx, dbconf.dy = qdr, dist, dx, dy
+        dbconf.tcpa, dbconf.dcpa, dbconf.dalt = tcpa, dcpa, dalt
+        dbconf.tinconf, dbconf.toutconf, dbconf.swconfl = tinconf, toutconf, swconfl
+    else:
+        dbconf.qdr[rows], dbconf.dist[rows], dbconf.dx[rows], dbconf.dy[rows] = qdr, dist, dx, dy
+        dbconf.tcpa[rows], dbconf.dcpa[rows], dbconf.dalt[rows] = tcpa, dcpa, dalt
+        dbconf.tinconf[rows], dbconf.toutconf[rows], dbconf.swconfl[rows] = tinconf, toutconf, swconfl
+        swconfl = dbconf.swconfl
+
     # ----------------------------------------------------------------------
     # Update conflict lists
     # ----------------------------------------------------------------------
@@ -171,8 +195,8 @@ def detect(dbconf, traf, simt):
         combi = str(traf.id[i]) + " " + str(traf.id[j])
         combi2 = str(traf.id[j]) + " " + str(traf.id[i])
 
-        experimenttime = simt > 2100 and simt < 5700  # These parameters may be
-        # changed to count only conflicts within a given expirement time window
+        # Count only conflicts within the experiment time window (EXPTIME)
+        experimenttime = dbconf.texp[0] < simt < dbconf.texp[1]
 
         if combi not in dbconf.conflist_all and combi2 not in dbconf.conflist_all:
             dbconf.conflist_all.append(combi)
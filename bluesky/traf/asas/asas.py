@@ -3,11 +3,17 @@
 import numpy as np
 import bluesky as bs
 from bluesky import settings
+from bluesky.tools import scheduler, datalog, geo
 from bluesky.tools.aero import ft, nm
 from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
 
 # Register settings defaults
-settings.set_variable_defaults(prefer_compiled=False, asas_dt=1.0, asas_dtlookahead=300.0, asas_mar=1.2, asas_pzr=5.0, asas_pzh=1000.0)
+settings.set_variable_defaults(prefer_compiled=False, asas_dt=1.0, asas_dtlookahead=300.0, asas_mar=1.2, asas_pzr=5.0, asas_pzh=1000.0,
+                               asas_exptstart=2100.0, asas_exptend=5700.0)
+
+# Conflict and LOS events in CONFLOG and LOSLOG
+CONFSTART, CONFEND = 0, 1
+LOSSTART, LOSEND, LOSMAXSEV = 0, 1, 2
 
 # Import default CD methods
 StateBasedCD = False
@@ -57,6 +63,17 @@ class ASAS(DynamicArrays):
             self.spd      = np.array([])  # speed provided by the ASAS (eas) [m/s]
             self.alt      = np.array([])  # speed alt by the ASAS [m]
             self.vs       = np.array([])  # speed vspeed by the ASAS [m/s]
+            self.inconf   = np.array([], dtype=bool)  # whether the aircraft is in conflict
+
+        # Event logs of conflicts and losses of separation per aircraft pair
+        self.conflog = datalog.defineLogger('CONFLOG',
+            'CONFLOG logfile.\nEvent: 0 = conflict start, 1 = conflict end\n' +
+            'Units: simt, tstart, tcpa [s], dist, dalt, dcpa [m]',
+            ['event', 'acid1', 'acid2', 'tstart', 'dist', 'dalt', 'tcpa', 'dcpa'])
+        self.loslog  = datalog.defineLogger('LOSLOG',
+            'LOSLOG logfile.\nEvent: 0 = LOS start, 1 = LOS end, 2 = maximum severity of the LOS\n' +
+            'Units: simt, tstart, t [s], lat1, lon1 [deg], alt1 [m]',
+            ['event', 'acid1', 'acid2', 'tstart', 't', 'severity', 'Ih', 'Iv', 'lat1', 'lon1', 'alt1'])
 
         # All ASAS variables are initialized in the reset function
         self.reset()
@@ -70,7 +87,6 @@ class ASAS(DynamicArrays):
         self.cd           = ASAS.CDmethods[self.cd_name]
         self.cr           = ASAS.CRmethods[self.cr_name]
 
-        self.dtasas       = settings.asas_dt           # interval for ASAS
         self.dtlookahead  = settings.asas_dtlookahead  # [s] lookahead time
         self.mar          = settings.asas_mar          # [-] Safety margin for evasion
         self.R            = settings.asas_pzr * nm     # [m] Horizontal separation minimum for detection
@@ -78,7 +94,9 @@ class ASAS(DynamicArrays):
         self.Rm           = self.R * self.mar          # [m] Horizontal separation minimum for resolution
         self.dhm          = self.dh * self.mar         # [m] Vertical separation minimum for resolution
         self.swasas       = True                       # [-] whether to perform CD&R
-        self.tasas        = 0.0                        # Next time ASAS should be called
+        self.task         = scheduler.register('ASAS', settings.asas_dt, phase=0.0,
+                                               splittable=True)  # interval for ASAS
+        self.cdids        = None                       # aircraft ids at the last conflict detection
 
         self.vmin         = 51.4                       # [m/s] Minimum ASAS velocity (100 kts)
         self.vmax         = 308.6                      # [m/s] Maximum ASAS velocity (600 kts)
@@ -109,6 +127,7 @@ class ASAS(DynamicArrays):
         self.lonowncpa    = np.array([])
         self.altowncpa    = np.array([])
         self.tcpa         = np.array([])
+        self.dcpa         = np.array([])
         self.tinconf      = np.array([])
         self.toutconf     = np.array([])
         self.qdr          = np.array([])
@@ -131,10 +150,21 @@ class ASAS(DynamicArrays):
         self.LOShmaxsev   = []
         self.LOSvmaxsev   = []
 
+        # Experiment time window for conflist_exp and LOSlist_exp [s]
+        self.texp         = [settings.asas_exptstart, settings.asas_exptend]
+
+        # Active conflicts and LOSs per aircraft pair (acid1, acid2), acid1 < acid2
+        self.confactive   = dict()  # start time
+        self.losactive    = dict()  # start time, and time and state at maximum severity
+
     def toggle(self, flag=None):
         if flag is None:
             return True, "ASAS is currently " + ("ON" if self.swasas else "OFF")
         self.swasas = flag
+        # Without conflict detection, the time in conflict of the flight
+        # statistics should not increase
+        if not flag:
+            self.inconf.fill(False)
         return True
 
     def SetCDmethod(self, method=""):
@@ -146,6 +176,7 @@ class ASAS(DynamicArrays):
 
         self.cd_name = method
         self.cd = ASAS.CDmethods[method]
+        self.cdids = None
 
     def SetCRmethod(self, method=""):
         if method is "":
@@ -198,9 +229,19 @@ class ASAS(DynamicArrays):
 
     def SetDtNoLook(self, value=None):
         if value is None:
-            return True, ("DTNOLOOK [time]\nCurrent value: %.1f sec" % self.dtasas)
+            return True, ("DTNOLOOK [time]\nCurrent value: %.1f sec" % self.task.dt)
+
+        self.task.setdt(value)
 
-        self.dtasas = value
+    def SetExpTime(self, tstart=None, tend=None):
+        if tstart is None:
+            return True, ("EXPTIME [tstart,tend]\nCurrent experiment time window: %.0f - %.0f sec" %
+                          tuple(self.texp))
+        if tend is not None and tend <= tstart:
+            return False, "End of the experiment time window should be after its start"
+
+        self.texp = [tstart, self.texp[1] if tend is None else tend]
+        return True
 
     def SetResoHoriz(self, value=None):
         """ Processes the RMETHH command. Sets swresovert = False"""
@@ -349,16 +390,120 @@ class ASAS(DynamicArrays):
         self.spd[-n:] = bs.traf.tas[-n:]
         self.alt[-n:] = bs.traf.alt[-n:]
 
+    def pairstate(self, i1, i2):
+        """ Distance [m], altitude difference [m], time to CPA [s] and distance
+            at CPA [m] of the aircraft pairs with indices i1, i2, as seen by the
+            conflict detection. The values of pairs with a deleted aircraft
+            (index -1) are nan. """
+        traf  = bs.traf
+        valid = (i1 >= 0) & (i2 >= 0)
+        j1, j2 = i1[valid], i2[valid]
+        state = np.nan * np.ones((4, len(i1)))
+
+        # The matrices of the last detection, when the CD method stores them
+        # for the current aircraft (see StateBasedCD.detect)
+        if self.cdids == traf.id:
+            state[0, valid] = self.dist[j1, j2]
+            state[1, valid] = self.dalt[j1, j2]
+            state[2, valid] = self.tcpa[j1, j2]
+            state[3, valid] = self.dcpa[j1, j2]
+            return state
+
+        # Otherwise the WGS'84 geometry of the detection, for aircraft 2 w.r.t. 1
+        qdr, dist = geo.qdrdist(traf.lat[j1], traf.lon[j1], traf.lat[j2], traf.lon[j2])
+        dist   = dist * nm
+        dx     = dist * np.sin(np.radians(qdr))
+        dy     = dist * np.cos(np.radians(qdr))
+        du     = traf.gseast[j2] - traf.gseast[j1]
+        dv     = traf.gsnorth[j2] - traf.gsnorth[j1]
+        dv2    = np.maximum(1e-6, du * du + dv * dv)
+        tcpa   = -(dx * du + dy * dv) / dv2
+
+        state[0, valid] = dist
+        state[1, valid] = traf.alt[j2] - traf.alt[j1]
+        state[2, valid] = tcpa
+        state[3, valid] = np.sqrt(np.maximum(0., dist * dist - tcpa * tcpa * dv2))
+        return state
+
+    def updateevents(self, simt):
+        """ Keep track of the conflicts and losses of separation per aircraft
+            pair, and log their start, end and maximum severity in CONFLOG and
+            LOSLOG """
+        acidx = dict(zip(bs.traf.id, range(bs.traf.ntraf)))
+
+        # Current conflicts, and the conflicts that ended since the last update
+        pairs = set((ac1, ac2) if ac1 < ac2 else (ac2, ac1) for ac1, ac2 in self.confpairs)
+        start = list(pairs.difference(self.confactive))
+        end   = list(set(self.confactive).difference(pairs))
+        self.confactive.update(dict.fromkeys(start, simt))
+
+        events = start + end
+        if events:
+            acids1, acids2 = zip(*events)
+            i1 = np.array([acidx.get(acid, -1) for acid in acids1], dtype=int)
+            i2 = np.array([acidx.get(acid, -1) for acid in acids2], dtype=int)
+            dist, dalt, tcpa, dcpa = self.pairstate(i1, i2)
+            self.conflog.log(np.array(len(start) * [CONFSTART] + len(end) * [CONFEND]),
+                             list(acids1), list(acids2),
+                             np.array(map(self.confactive.get, events)),
+                             dist, dalt, tcpa, dcpa)
+            for ended in end:
+                del self.confactive[ended]
+
+        # Losses of separation among the current conflicts
+        pairs = list(pairs)
+        i1    = np.array([acidx[acid] for acid, _ in pairs], dtype=int)
+        i2    = np.array([acidx[acid] for _, acid in pairs], dtype=int)
+        self.inconf.fill(False)
+        self.inconf[i1] = True
+        self.inconf[i2] = True
+        dist, dalt, tcpa, dcpa = self.pairstate(i1, i2)
+        Ih    = 1.0 - dist / self.R
+        Iv    = 1.0 - np.abs(dalt) / self.dh
+        sev   = np.minimum(Ih, Iv)
+        ilos  = np.where((Ih > 0.) & (Iv > 0.))[0]
+
+        # LOS state: tstart, then t, severity, Ih, Iv, lat, lon, alt at maximum severity
+        states = np.column_stack((np.repeat(simt, len(ilos)), sev[ilos], Ih[ilos], Iv[ilos],
+                                  bs.traf.lat[i1[ilos]], bs.traf.lon[i1[ilos]],
+                                  bs.traf.alt[i1[ilos]])).tolist()
+        inlos  = [pairs[k] for k in ilos]
+        rows   = []
+        for pair, state in zip(inlos, states):
+            if pair not in self.losactive:
+                self.losactive[pair] = [simt] + state
+                rows.append([LOSSTART, pair[0], pair[1], simt] + state)
+            elif state[1] > self.losactive[pair][2]:
+                self.losactive[pair][1:] = state
+
+        for pair in set(self.losactive).difference(inlos):
+            losstate = self.losactive.pop(pair)
+            i = acidx.get(pair[0], -1)
+            state = [simt, np.nan, np.nan, np.nan] + \
+                ([bs.traf.lat[i], bs.traf.lon[i], bs.traf.alt[i]] if i >= 0 else 3 * [np.nan])
+            rows.append([LOSEND, pair[0], pair[1], losstate[0]] + state)
+            rows.append([LOSMAXSEV, pair[0], pair[1]] + losstate)
+
+        if rows:
+            cols = zip(*rows)
+            self.loslog.log(np.array(cols[0]), list(cols[1]), list(cols[2]),
+                            *[np.array(col) for col in cols[3:]])
+
     def update(self, simt):
         iconf0 = np.array(self.iconf)
 
         # Scheduling: update when dt has passed
-        if self.swasas and simt >= self.tasas:
-            self.tasas += self.dtasas
-
-            # Conflict detection and resolution
-            self.cd.detect(self, bs.traf, simt)
+        if self.swasas and self.task.due(simt):
+            # Conflict detection and resolution; when the ASAS task is split,
+            # the detection is updated for one part of the ownship aircraft.
+            # CD methods that can not do this (without a splittable
+            # attribute) do a full detection at every update of the task.
+            if self.task.nsplit > 1 and getattr(self.cd, 'splittable', False):
+                self.cd.detect(self, bs.traf, simt, part=self.task.part())
+            else:
+                self.cd.detect(self, bs.traf, simt)
             self.cr.resolve(self, bs.traf)
+            self.updateevents(simt)
 
         # Change labels in interface
         if settings.gui == "pygame":
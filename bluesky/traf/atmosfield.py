@@ -0,0 +1,101 @@
+""" Non-ISA atmosphere: field of deviations from the standard atmosphere."""
+import os
+import numpy as np
+from bluesky import settings
+from windfield import loadgridfile, savegridfile, interpgrid
+
+
+class AtmosField(object):
+    """ AtmosField class: deviations from ISA conditions, either uniform or
+        as a gridded (time-varying) field with the same layout as the wind
+        grid files of Windfield.
+
+        Methods:
+            clear()             = back to ISA conditions
+            setdev(dtemp,dpres) = set a uniform temperature deviation [K] and
+                                  sea level pressure deviation [Pa]
+            loadgrid(fname)     = load gridded deviations from a grid file
+            settime(t)          = set time [s] for interpolation of snapshots
+            getdata(lat,lon,alt)= get dtemp, dpres at the given positions
+
+        Members:
+            active   = False when conditions are ISA (no deviations defined)
+            dtemp    = uniform temperature deviation [K]
+            dpres    = uniform sea level pressure deviation [Pa]
+            grid     = gridded field with arrays "dtemp" and "dpres", or None
+    """
+    # Identification string at the start of an atmosphere grid file
+    gridmagic = b"BSATMGRID1"
+
+    def __init__(self):
+        self.gridt = 0.0
+        self.clear()
+
+    def clear(self):
+        self.active = False
+        self.dtemp  = 0.0
+        self.dpres  = 0.0
+        self.grid   = None
+
+    def setdev(self, dtemp, dpres=0.0):
+        self.clear()
+        self.dtemp  = dtemp
+        self.dpres  = dpres
+        self.active = dtemp != 0.0 or dpres != 0.0
+
+    def loadgrid(self, fname):
+        """ Load a gridded field of temperature deviation [K] and sea level
+            pressure deviation [Pa] (memory-mapped, see savegrid). """
+        grid = loadgridfile(fname, self.gridmagic, ("dtemp", "dpres"))
+        self.clear()
+        self.grid   = grid
+        self.active = True
+        return grid["dtemp"].shape
+
+    @staticmethod
+    def savegrid(fname, time, alt, lat, lon, dtemp, dpres):
+        """ Write a gridded deviation field to a binary atmosphere grid file,
+            see windfield.savegridfile for the layout. """
+        savegridfile(fname, AtmosField.gridmagic, time, alt, lat, lon,
+                     dtemp, dpres)
+
+    def settime(self, t):
+        self.gridt = t
+
+    def getdata(self, lat, lon, alt):
+        """ Temperature deviation [K] and sea level pressure deviation [Pa]
+            at the given positions (arrays). """
+        if self.grid is not None:
+            return interpgrid(self.grid, ("dtemp", "dpres"), self.gridt,
+                              lat, lon, alt)
+
+        return np.ones(len(lat)) * self.dtemp, np.ones(len(lat)) * self.dpres
+
+    # Stack commands
+    def setcmd(self, dtemp=None, dpres=0.0):
+        """ ISADEV command: show or set a uniform deviation from ISA """
+        if dtemp is None:
+            if self.grid is not None:
+                return True, "ISA deviations from grid file"
+            return True, "ISA deviation: dT = %.1f K, dp = %.0f Pa" % \
+                (self.dtemp, self.dpres)
+
+        self.setdev(dtemp, dpres)
+        return True
+
+    def load(self, fname):
+        """ ISADEVFILE command: load a gridded deviation field """
+        # Without a path, look for the file in the scenario folder
+        if not os.path.exists(fname) and len(os.path.dirname(fname)) == 0:
+            fname = os.path.join(settings.scenario_path, fname)
+
+        if not os.path.exists(fname):
+            return False, "Error: cannot find file: " + fname
+
+        try:
+            ntime, nalt, nlat, nlon = self.loadgrid(fname)
+        except (IOError, ValueError) as err:
+            return False, str(err)
+
+        return True, "Loaded ISA deviation grid with %d snapshot(s) of " \
+                     "%dx%dx%d (alt x lat x lon) points" % (ntime, nalt, nlat, nlon)
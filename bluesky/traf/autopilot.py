@@ -2,7 +2,7 @@
 from math import sin, cos, radians
 import numpy as np
 import bluesky as bs
-from bluesky.tools import geo
+from bluesky.tools import geo, scheduler
 from bluesky.tools.position import txt2pos
 from bluesky.tools.aero import ft, nm, vcas2tas, vtas2cas, vmach2tas, cas2mach,mach2cas
 from route import Route
@@ -11,9 +11,8 @@ from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
 
 class Autopilot(DynamicArrays):
     def __init__(self):
-        # Scheduling of FMS and ASAS
-        self.t0 = -999.  # last time fms was called
-        self.dt = 1.01   # interval for fms
+        # Scheduling of FMS
+        self.task = scheduler.register('FMS', 1.01, strict=True)  # interval for fms
 
         # Standard self.steepness for descent
         self.steepness = 3000. * ft / (10. * nm)
@@ -53,7 +52,7 @@ class Autopilot(DynamicArrays):
         self.dist2vs[-n:] = -999.
 
         # Route objects
-        self.route.extend([Route()] * n)
+        self.route.extend([Route() for i in range(n)])
 
     def delete(self, idx):
         super(Autopilot, self).delete(idx)
@@ -62,8 +61,7 @@ class Autopilot(DynamicArrays):
 
     def update(self, simt):
         # Scheduling: when dt has passed or restart
-        if self.t0 + self.dt < simt or simt < self.t0:
-            self.t0 = simt
+        if self.task.due(simt):
 
             # FMS LNAV mode:
             qdr, dist = geo.qdrdist(bs.traf.lat, bs.traf.lon,
@@ -150,7 +148,8 @@ class Autopilot(DynamicArrays):
             self.trk = np.where(bs.traf.swlnav, qdr, self.trk)
 
         # Below crossover altitude: CAS=const, above crossover altitude: MA = const
-        self.tas = vcas2tas(bs.traf.aspd, bs.traf.alt) * bs.traf.belco + vmach2tas(bs.traf.ama, bs.traf.alt) * bs.traf.abco
+        self.tas = vcas2tas(bs.traf.aspd, bs.traf.alt, bs.traf.atm) * bs.traf.belco + \
+                   vmach2tas(bs.traf.ama, bs.traf.alt, bs.traf.atm) * bs.traf.abco
 
     def ComputeVNAV(self, idx, toalt, xtoalt):
         if not (toalt >= 0 and bs.traf.swvnav[idx]):
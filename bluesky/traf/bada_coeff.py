@@ -10,7 +10,17 @@
 from glob import glob
 from os import path
 import re
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import numpy as np
+from bluesky import settings
 from bluesky.tools.fwparser import FixedWidthParser
+from bluesky.navdb.loadnavdata import check_cache
+
+# Default settings
+settings.set_variable_defaults(cache_path='data/cache')
 
 # File formats of BADA data files. Uses fortran-like notation
 # Adapted from the BADA manual format lines. (page 61-81 in the BADA manual)
@@ -66,6 +76,25 @@ accoeffs     = dict()
 release_date = 'Unknown'
 bada_version = 'Unknown'
 
+# For vectorised access, all coefficient sets are also stored as rows of the
+# structured array coefftable. typeids gives the row for each aircraft type.
+coefftable   = None
+typeids      = dict()
+
+# Columns of coefftable: ACData attributes. Of the APF speed schedules
+# only the first (low mass) value is stored.
+tablefields  = ['m_ref', 'm_min', 'm_max', 'mass_grad',
+                'VMO', 'MMO', 'h_MO', 'h_max', 'temp_grad',
+                'S', 'Clbo', 'k', 'CM16',
+                'Vstall_to', 'Vstall_ic', 'Vstall_cr', 'Vstall_ap', 'Vstall_ld',
+                'CD0_to', 'CD0_ic', 'CD0_cr', 'CD0_ap', 'CD0_ld', 'CD0_gear',
+                'CD2_to', 'CD2_ic', 'CD2_cr', 'CD2_ap', 'CD2_ld',
+                'CTdes_low', 'CTdes_high', 'Hp_des', 'CTdes_app', 'CTdes_land',
+                'Vdes_ref', 'Mdes_ref',
+                'Cf1', 'Cf2', 'Cf3', 'Cf4', 'Cf_cruise',
+                'TOL', 'LDL', 'wingspan', 'length', 'gr_acc']
+apffields    = ['CAScl1', 'CAScr1', 'CASdes1', 'Mcl', 'Mcr', 'Mdes']
+
 
 def getCoefficients(actype):
     ''' Get a set of BADA coefficients for the given aircraft type.
@@ -86,46 +115,131 @@ def getCoefficients(actype):
     return syn, coeff
 
 
+def getTypeIds(actypes, default=-1):
+    ''' Get the rows in coefftable for a list of aircraft types.
+
+        Aircraft types that are not in the BADA database get row default.'''
+    types, inv = np.unique(actypes, return_inverse=True)
+    return np.array([typeids.get(t, default) for t in types], dtype=int)[inv]
+
+
+def makeTable():
+    ''' Store the loaded coefficient sets as rows of the structured array
+        coefftable, and assign each aircraft type its row in typeids.'''
+    global coefftable
+    dtype = [(name, float) for name in ['jet', 'turbo', 'piston', 'Cred'] +
+             tablefields + apffields] + [('CTC', float, 5)]
+    coefftable = np.zeros(len(accoeffs), dtype=dtype)
+
+    rows = dict()
+    for row, (fname, ac) in enumerate(accoeffs.items()):
+        rows[fname] = row
+        coefftable['jet'][row]    = ac.engtype == 'Jet'
+        coefftable['turbo'][row]  = ac.engtype == 'Turboprop'
+        coefftable['piston'][row] = ac.engtype == 'Piston'
+        coefftable['Cred'][row]   = ac.Cred_jet if ac.engtype == 'Jet' else \
+            ac.Cred_turboprop if ac.engtype == 'Turboprop' else ac.Cred_piston
+        for name in tablefields:
+            coefftable[name][row] = getattr(ac, name)
+        for name in apffields:
+            coefftable[name][row] = getattr(ac, name, [0.0])[0]
+        coefftable['CTC'][row]    = ac.CTC
+
+    typeids.clear()
+    for accode, syn in synonyms.items():
+        if syn.file in rows:
+            typeids[accode] = rows[syn.file]
+
+
 def init(bada_path=''):
-    ''' init() loads the available BADA datafiles in the provided directory.'''
-    releasefile = path.join(path.normpath(bada_path), 'ReleaseSummary')
+    ''' init() loads the available BADA datafiles in the provided directory.
+
+        The parsed data is cached (in the settings.cache_path folder), and
+        reread from the cache as long as the BADA files are not modified.'''
+    global release_date, bada_version
+    bada_path   = path.normpath(bada_path)
+    releasefile = path.join(bada_path, 'ReleaseSummary')
+    synonymfile = path.join(bada_path, 'SYNONYM.NEW')
+    opffiles    = sorted(glob(path.join(bada_path, '*.OPF')))
+    apffiles    = [f[:-4] + '.APF' for f in opffiles if path.isfile(f[:-4] + '.APF')]
+
+    if not path.isfile(synonymfile):
+        print 'SYNONYM.NEW not found in BADA path, could not load BADA.'
+        return False
+
+    # Check whether anything changed which requires rewriting the cache: the
+    # BADA files, or this module, which parses them and makes the coefficient table
+    cachefile = path.join(settings.cache_path, 'bada.p')
+    cache_ok  = check_cache(cachefile, path.splitext(__file__)[0] + '.py',
+                            releasefile, synonymfile, *(opffiles + apffiles))
+
+    # If cache up to date, use it
+    if cache_ok:
+        with open(cachefile, 'rb') as f:
+            cache = pickle.load(f)
+        # The cache is only valid for the same set of files
+        cache_ok = cache['path'] == bada_path and cache['files'] == opffiles + apffiles
+        if cache_ok:
+            print "Reading cache: bada.p"
+
+    # else read original files, and write new cache file
+    if not cache_ok:
+        cache = dict(path=bada_path, files=opffiles + apffiles,
+                     release_date='Unknown', bada_version='Unknown')
+        if path.isfile(releasefile):
+            re_reldate = re.compile('Summary Date:\s+(.+(?<!\s))\s*', re.IGNORECASE)
+            re_badaver = re.compile('\s*BADA Release:\s+([\d.]+)\s*', re.IGNORECASE)
+            with open(releasefile) as f:
+                for line in f:
+                    if re_reldate.match(line):
+                        cache['release_date'] = re_reldate.findall(line)[0]
+                    elif re_badaver.match(line):
+                        cache['bada_version'] = re_badaver.findall(line)[0]
+
+                    if 'Unknown' not in (cache['release_date'], cache['bada_version']):
+                        break
+
+        cache['synonyms'] = syn_parser.parse(synonymfile)
+        cache['opf'] = [opf_parser.parse(fname) for fname in opffiles]
+        cache['apf'] = dict((fname[:-4], apf_parser.parse(fname)) for fname in apffiles)
+
+    release_date = cache['release_date']
+    bada_version = cache['bada_version']
     if path.isfile(releasefile):
-        global release_date, bada_version
-        re_reldate = re.compile('Summary Date:\s+(.+(?<!\s))\s*', re.IGNORECASE)
-        re_badaver = re.compile('\s*BADA Release:\s+([\d.]+)\s*', re.IGNORECASE)
-        with open(releasefile) as f:
-            for line in f:
-                if re_reldate.match(line):
-                    release_date = re_reldate.findall(line)[0]
-                elif re_badaver.match(line):
-                    bada_version = re_badaver.findall(line)[0]
-
-                if 'Unknown' not in (release_date, bada_version):
-                    break
         print 'Found BADA version %s (release date %s)' % (bada_version, release_date)
     else:
         print 'No BADA release summary found: can not determine version.'
 
-    synonymfile = path.join(path.normpath(bada_path), 'SYNONYM.NEW')
-    if not path.isfile(synonymfile):
-        print 'SYNONYM.NEW not found in BADA path, could not load BADA.'
-        return False
-    data = syn_parser.parse(synonymfile)
-    for line in data:
+    for line in cache['synonyms']:
         syn = Synonym(line)
         synonyms[syn.accode] = syn
     print '%d aircraft entries loaded' % len(synonyms)
 
     # Load aircraft coefficient data
-    for file in glob(path.join(path.normpath(bada_path), '*.OPF')):
+    for fname, data in zip(opffiles, cache['opf']):
         ac = ACData()
-        ac.setOPFData(opf_parser.parse(file))
+        ac.setOPFData(data)
 
-        if path.isfile(file[:-4] + '.APF'):
-            ac.setAPFData(apf_parser.parse(file[:-4] + '.APF'))
+        if fname[:-4] in cache['apf']:
+            ac.setAPFData(cache['apf'][fname[:-4]])
 
         accoeffs[ac.actype] = ac
     print '%d unique aircraft coefficient sets loaded' % len(accoeffs)
+
+    # The coefficient table is stored in the cache as well
+    if cache_ok:
+        global coefftable
+        coefftable = cache['coefftable']
+        typeids.clear()
+        typeids.update(cache['typeids'])
+    else:
+        makeTable()
+        cache['coefftable'] = coefftable
+        cache['typeids']    = typeids
+        with open(cachefile, 'wb') as f:
+            print "Writing cache: bada.p"
+            pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+
     return (len(synonyms) > 0 and len(accoeffs) > 0)
 
 
@@ -0,0 +1,56 @@
+""" Flight statistics per aircraft, logged in FLSTLOG when an aircraft is deleted."""
+import numpy as np
+import bluesky as bs
+from bluesky.tools import datalog
+from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+
+
+class FlightStats(DynamicArrays):
+    """
+    Flight statistics: accumulated per aircraft during the flight, and written
+    to FLSTLOG as one row per flight when the aircraft is deleted.
+
+    Methods:
+        create(n)       : start the statistics of new aircraft
+        update(simdt)   : add the current time step to the statistics
+        log(idx)        : log the statistics of aircraft idx
+    """
+
+    def __init__(self):
+        self.logger = datalog.defineLogger('FLSTLOG', 'FLSTLOG logfile.\n' +
+            'Units: simt, tcreate, tflight, tconf [s], dist, alt [m], fuel [kg], ' +
+            'work [J], lat, lon [deg]',
+            ['acid', 'actype', 'tcreate', 'tflight', 'dist', 'fuel', 'work', 'tconf',
+             'lat', 'lon', 'alt'])
+
+        with RegisterElementParameters(self):
+            self.tcreate = np.array([])  # [s] time of creation
+            self.dist    = np.array([])  # [m] distance flown over ground
+            self.fuel    = np.array([])  # [kg] fuel burnt
+            self.work    = np.array([])  # [J] work done by the thrust
+            self.tconf   = np.array([])  # [s] time in conflict
+
+    def create(self, n=1):
+        super(FlightStats, self).create(n)
+        self.tcreate[-n:] = bs.sim.simt
+
+    def update(self, simdt, idx=slice(None)):
+        """ Add a time step simdt to the statistics of aircraft idx (default
+            all aircraft); the aircraft in steady flight of the multi-rate
+            integration are added once per interval (see Traffic.PropagateSteady) """
+        self.dist[idx]  += bs.traf.gs[idx] * simdt
+        self.tconf[idx] += bs.traf.asas.inconf[idx] * simdt
+
+        # Not all performance models have a fuel flow and thrust
+        ff = getattr(bs.traf.perf, 'ff', None)
+        if ff is not None:
+            self.fuel[idx] += ff[idx] * simdt
+        thr = getattr(bs.traf.perf, 'Thr', None)
+        if thr is not None:
+            self.work[idx] += thr[idx] * bs.traf.tas[idx] * simdt
+
+    def log(self, idx):
+        self.logger.log(bs.traf.id[idx], bs.traf.type[idx], self.tcreate[idx],
+                        bs.sim.simt - self.tcreate[idx], self.dist[idx], self.fuel[idx],
+                        self.work[idx], self.tconf[idx],
+                        bs.traf.lat[idx], bs.traf.lon[idx], bs.traf.alt[idx])
@@ -1,8 +1,6 @@
 from time import time, gmtime, strftime
 import numpy as np
 import matplotlib.pyplot as plt
-from math import degrees
-import collections
 from collections import defaultdict
 import itertools as IT
 
@@ -80,18 +78,13 @@ class metric_Area():
                 if i == 1:
 
                     lat,lon = geo.qdrpos(lat,lon,self.bearingE,self.distance)
-                    lat = degrees(lat)
-                    lon = degrees(lon)
                     londiviser = (lon - lon_0) / self.ncells
                 else:
                     lat,lon = geo.qdrpos(lat,lon,self.bearingE,self.distance)
-                    lat = degrees(lat)
                     lon = lon_0 + londiviser * j
 
             lat_0 = lat_00
             lat,lon = geo.qdrpos(lat_0,lon_0,self.bearingS,self.distance*i)
-            lat = degrees(lat)
-            lon = degrees(lon)
             lat_0 = lat
 
         return
@@ -160,183 +153,55 @@ class metric_Area():
 class metric_CoCa():
 
     def __init__(self,regions):
-
-
         self.region = regions
-        self.oldaircraft = np.zeros((1000,1), dtype = [('callsign','|S10'),('cellnumber',int), ('time',int),('totaltime',int)])
-        self.newaircraft = np.zeros((1000,1), dtype = [('callsign','|S10'),('cellnumber',int), ('time',int),('totaltime',int)])
-        # self.cells = np.zeros((self.region.nlevels*self.region.ncells*self.region.ncells,1), dtype = [('cellnumber',int),('interactions',int),('ntraf',int)])
-        # for i in range(0,len(self.cells)):
-        #    self.cells['cellnumber'][i] = i + 1
-        #        plt.close()
-
         self.numberofcells = self.region.ncells*self.region.ncells*self.region.nlevels
 
-        names = []
-        for i in range(0,self.numberofcells):
-            names.append("cell"+str(i))
-
-        formats = []
-        for i in range(0,self.numberofcells):
-            formats.append("|S10")
-
-        ndtype = {'names':names, 'formats':formats}
-        self.cells = np.zeros((500,6), dtype = ndtype)
         self.resettime = 5 #seconds
         self.deltaresettime = self.resettime
         self.iteration = 0
-
-        formats = []
-        for i in range(0,self.numberofcells):
-            formats.append(float)
-
-        ndtype = {'names':names, 'formats':formats}
-        oneday = 86400 # second in one day
-        numberofrows = oneday / self.resettime
-        numberofrows = 3
-        self.precocametric = np.zeros((numberofrows,5), dtype = ndtype)
-        self.cocametric = np.zeros((numberofrows,6), dtype = ndtype)
+        self.reset()
+
+        # Metric per interval (rows) per cell: precocametric contains the sum of
+        # the times in the cell and the sums of the aircraft, speed, heading and
+        # vertical speed interactions, cocametric the total metric followed by
+        # the interactions per unit of time in the cell
+        self.precocametric = np.zeros((0,5,self.numberofcells))
+        self.cocametric = np.zeros((0,5,self.numberofcells))
         plt.ion()
         self.ntraf = 0
-
-        # plt.colorbar()
-        # self.plotntraf,= plt.plot([], [])
-        # self.plotbar, = plt.bar([],[])
         return
 
     def findCell(self,cells,lat,lon,fl):
-        i = 0
-        j = 0
-        k = 0
-
-        for i in range(0,len(cells),self.region.ncells*self.region.nlevels):
-            if (cells[0,0]) <= lat < (cells[0,0]+0.6):
-                break
-            if (cells[i,0] < lat < cells[0,0] and cells[i,0] > cells[-1,0]) :
-                break
-            else:
-                i = -10000
-
-        if i > -1 :
-
-            for j in range(0,self.region.ncells*self.region.nlevels,self.region.nlevels):
-
-                if cells[i+j,1] > lon and lon < (cells[-1,1]+0.6) and lon > cells[0,1]:
-                    j = j - self.region.nlevels
-                    break
-                if cells[i+j,1]+0.6 > lon and lon < (cells[-1,1]+0.6) and lon > cells[0,1]:
-                    break
-                else:
-                    j = -10000
-
-            if j > - 1:
-                for k in range(0,self.region.nlevels,1):
-                    if cells[i+j+k,2] > fl and fl < (cells[-1,2]+self.region.deltaFL) and fl > cells[0,2]:
-                        k = k -1
-                        break
-                    else:
-                        k = -10000
-
-        if (i+j+k) < 0:
-            i=-1
-            j=0
-            k=0
-
-        return i+j+k
-
-
-    # def update_line(self,ntraf,t):
-    #     if t < 0.1:
-
-    #        self.__init__()
-
-    #     t = int(t)
-    #     self.plotntraf.set_xdata(np.append(self.plotntraf.get_xdata(), t))
-    #     self.plotntraf.set_ydata(np.append(self.plotntraf.get_ydata(), ntraf))
-    #     plt.plot(t,ntraf,'b--o')
-    #     ax = plt.gca()
-    #     ax.relim()
-    #     ax.autoscale_view()
-    #     return
-
-    # def update_bar(self,trafcell,t):
-    #    if t < 0.1:
-    #        self.__init__
-    #    t = int(t)
-    #    self.plotbar.set_xdata(np.append(self.plotbar.get_xdata(), t))
-    #    self.plotbar.set_ydata(np.append(self.plotbar.get_ydata(), trafcell))
-    #    plt.plot(t,ntraf,'b--o')
-    #    ax = plt.gca()
-    #    ax.relim()
-    #    ax.autoscale_view()
-    #    return
-
-    # def plot_interactions(self):
-    #      plotcells = np.sort(self.cells, axis = 0, order='interactions')[-3:]
-    #      label = np.vstack(plotcells['cellnumber'])
-    #      x = np.arange(len(label))
-    #      y1 = np.vstack(plotcells['interactions'])
-    #      colLabels=("Interactions","")
-    #      nrows, ncols = len(x)+1, len(colLabels)
-    #      hcell, wcell = 0.3, 0.5
-    #      hpad, wpad = 0, 0.5
-    #      fig1=plt.figure(num = 1, figsize=(ncols*wcell+wpad, nrows*hcell+hpad))
-    #      ax = fig1.add_subplot(111)
-    #      ax.axis('off')
-    #      ax.table(cellText=y1,colLabels=colLabels, rowLabels = label ,loc='center')
-    #      plt.bar(x,y)
-    #      plt.xticks(x,str(label))
-    #      plt.show()
-    #     return
-
-    # def cell_interactions(self,cellN):
-    #    # Interactions
-    #    itemscount = np.array(collections.Counter(cellN).items())
-    #    if len(itemscount) > 0:
-    #        for number in range(0,self.region.ncells*self.region.ncells*self.region.nlevels):
-    #            j = np.where(itemscount[:,0] == number)
-    #            if np.size(j) == 0:
-    #                self.cells['interactions'][number] = 0
-    #            else:
-    #                self.cells['interactions'][number] = itemscount[j,1]*(itemscount[j,1]-1)
-    #        self.plot_interactions()
-    #    return
-
-
-    # def celltime(self,time):
-    #     for i in range(0,len(self.newaircraft)):
-    #         j = np.where(self.oldaircraft['callsign'] == self.newaircraft['callsign'][i])[0]
-    #         if np.size(j) == 1:
-    #             if self.oldaircraft['cellnumber'][j] == self.newaircraft['cellnumber'][i]:
-    #                 self.newaircraft['time'][i] = time - self.oldaircraft['totaltime'][i]
-    #             else:
-    #                 self.newaircraft['totaltime'][i] = time - self.oldaircraft['totaltime'][i]
-    #                 self.cells['ntraf'][i] = self.cells['ntraf'][i] + 1
-    #     self.oldaircraft = self.newaircraft
-    #     return self.newaircraft
-
+        """ Cell numbers of the positions lat,lon [deg], fl [ft] (arrays) in the
+            cell grid of metric_Area.makeRegions, -1 outside the grid.
+            A cell extends one grid step north and east of its region point,
+            and one level up. """
+        ncells = self.region.ncells
+        nlevels = self.region.nlevels
+        grid = cells.reshape(ncells,ncells,nlevels,3)
+
+        # Rows go south, digitize needs increasing bin edges
+        rowlat = grid[:,0,0,0]
+        latedges = np.append(rowlat[::-1],2*rowlat[0]-rowlat[1])
+        row = ncells - np.digitize(lat,latedges)
+        inrow = (row >= 0) * (row < ncells)
+        row = np.where(inrow,row,0)
+
+        # Columns are evenly spaced in longitude within a row
+        rowlon = grid[:,:,0,1]
+        dlon = (rowlon[:,-1]-rowlon[:,0])/(ncells-1)
+        col = np.floor((lon-rowlon[row,0])/dlon[row]).astype(int)
+
+        level = np.floor((fl-grid[0,0,0,2])/self.region.deltaFL).astype(int)
+
+        inside = inrow * (col >= 0) * (col < ncells) * (level >= 0) * (level < nlevels)
+        return np.where(inside,(row*ncells+col)*nlevels+level,-1)
 
     def cellPlot(self):
-        cell = [floor(x/12) for x in bs.traf.cell]
-        count = collections.Counter(cell)
-        count = np.array(count.items())
-
-        flcells = count
-        if np.size(count)>0:
-            flcells = count[:,0]
-
-        z = np.array([0])
-        for number in range(0,self.region.ncells*self.region.ncells):
-            i = np.where(flcells == (number))
-
-            if np.size(i) == 0:
-                z = np.append(z,0)
-            else:
-                i = i[0]
-                z = np.append(z,count[i,1])
-
-        z = np.delete(z, (0), axis=0)
-        zdata = np.reshape(z,(-1,self.region.ncells))
+        # Number of aircraft per horizontal cell
+        count = np.bincount(np.array(bs.traf.cell,dtype=int)//self.region.nlevels,
+                            minlength=self.region.ncells*self.region.ncells)
+        zdata = np.reshape(count,(-1,self.region.ncells))
         fig = plt.figure(1)
         ax = fig.add_subplot(1, 1, 1)
         ax.imshow(zdata, interpolation='nearest')
@@ -344,102 +209,55 @@ class metric_CoCa():
         return
 
     def applyMetric(self):
-        for i in range(0,self.numberofcells):
-            name = 'cell'+str(i)
-
-            l = self.iteration
-
-            times = []
-            headings = []
-            speeds = []
-            vspeeds = []
-            actimes = []
-
-            for j in range(0,len(self.cells[name])):
-                if self.cells[name][j][1] != "":
-                    times.append(float(self.cells[name][j][1]))
-                    headings.append(float(self.cells[name][j][2]))
-                    speeds.append(float(self.cells[name][j][3]))
-                    vspeeds.append(float(self.cells[name][j][4]))
-                    actimes.append(float(self.cells[name][j][1]))
-
-            indices = np.argsort(times)
-            times.sort()
-
-            headings = [headings[z] for z in indices]
-            speeds = [speeds[y] for y in indices]
-            vspeeds = [vspeeds[x] for x in indices]
-            actimes = [actimes[w] for w in indices]
-
-
-            for w in range(0,len(vspeeds)):
-                if vspeeds[w] <= 500 and vspeeds[w] >= (-500):
-                    vspeeds[w] = 0
-                elif vspeeds[w] > 500:
-                    vspeeds[w] = 1
-                elif vspeeds[w] < (-500):
-                    vspeeds[w] = -1
-
-
-
-            self.precocametric[name][l][0] = (sum(times)/self.deltaresettime)
-
-            acinteractions = []
-            spdinteractions = []
-            hdginteractions = []
-            vspdinteractions = []
-
-            if len(times) > 1:
-                for k in range(0,len(times)):
-                    aircraft = len(times)
-
-                    time = times[0]/self.deltaresettime
-                    actime = actimes[0]/self.deltaresettime
-                    acinteractions.append(aircraft*(aircraft-1)*(actime**aircraft))
-
-
-                    counter = 0
-                    for t in range(0,1):
-                        for u in range(t+1,len(speeds)):
-                            if abs(speeds[t]-speeds[u]) > 35:
-                                counter = counter + 1
-                    spdinteractions.append(2*counter*(time**(counter+1)))
-
-
-                    counter = 0
-                    for t in range(0,1):
-                        for u in range(t+1,len(headings)):
-                            if abs(headings[t]-headings[u]) > 20:
-                                counter = counter + 1
-                    hdginteractions.append(2*counter*(time**(counter+1)))
-
-
-                    counter = 0
-                    for t in range(0,1):
-                        for u in range(t+1,len(vspeeds)):
-                            if vspeeds[t] != vspeeds[u]:
-                                counter = counter + 1
-                    vspdinteractions.append(2*counter*(time**(counter+1)))
-
-                    for x in range(1,len(actimes)):
-                        actimes[x] = actimes[x] - actimes[0]
-
-                    del actimes[0]
-                    del times[0]
-                    del vspeeds[0]
-                    del speeds[0]
-                    del headings[0]
-
-                self.precocametric[name][l][1] = sum(acinteractions)
-                self.precocametric[name][l][2] = sum(spdinteractions)
-                self.precocametric[name][l][3] = sum(hdginteractions)
-                self.precocametric[name][l][4] = sum(vspdinteractions)
-
-                self.cocametric[name][l][1] = self.precocametric[name][l][1] / self.precocametric[name][l][0]
-                self.cocametric[name][l][2] = self.precocametric[name][l][2] / self.precocametric[name][l][0]
-                self.cocametric[name][l][3] = self.precocametric[name][l][3] / self.precocametric[name][l][0]
-                self.cocametric[name][l][4] = self.precocametric[name][l][4] / self.precocametric[name][l][0]
-                self.cocametric[name][l][0] = self.cocametric[name][l][1] * (self.cocametric[name][l][2] + self.cocametric[name][l][3] + self.cocametric[name][l][4])
+        l = self.iteration
+        if l >= len(self.cocametric):
+            newrows = np.zeros((l+1-len(self.cocametric),5,self.numberofcells))
+            self.precocametric = np.vstack([self.precocametric,newrows])
+            self.cocametric = np.vstack([self.cocametric,newrows])
+
+        # Visits sorted per cell on the time in the cell
+        order = np.lexsort((self.tincell,self.cellnr))
+        cell = self.cellnr[order]
+        times = self.tincell[order]/self.deltaresettime
+        headings = self.hdg[order]
+        speeds = self.spd[order]
+        vspeeds = self.vs[order]
+        vspeeds = np.where(np.abs(vspeeds) > 500,np.sign(vspeeds),0)
+
+        # Rank of each visit within its cell, and the number of visits from
+        # this one to the last one in the cell
+        nvisits = np.bincount(cell,minlength=self.numberofcells)
+        first = np.cumsum(nvisits) - nvisits
+        rank = np.arange(len(cell)) - first[cell]
+        remaining = nvisits[cell] - rank
+
+        # Aircraft interactions use the time between successive visits
+        prevtimes = np.append(0.,times[:-1])
+        actimes = times - np.where(rank > 0,prevtimes,0.)
+        acinteractions = remaining*(remaining-1)*actimes**remaining
+
+        # Pairs of each visit with the later visits in the same cell
+        nlater = remaining - 1
+        idx1 = np.repeat(np.arange(len(cell)),nlater)
+        idx2 = idx1 + 1 + np.arange(len(idx1)) - np.repeat(np.cumsum(nlater)-nlater,nlater)
+
+        def interactions(differs):
+            counter = np.bincount(idx1,weights=differs,minlength=len(cell))
+            return 2*counter*(times**(counter+1))
+
+        spdinteractions = interactions(np.abs(speeds[idx1]-speeds[idx2]) > 35)
+        hdginteractions = interactions(np.abs(headings[idx1]-headings[idx2]) > 20)
+        vspdinteractions = interactions(vspeeds[idx1] != vspeeds[idx2])
+
+        pre = self.precocametric[l]
+        pre[0] = np.bincount(cell,weights=times,minlength=self.numberofcells)
+        for i,terms in enumerate((acinteractions,spdinteractions,hdginteractions,vspdinteractions)):
+            pre[i+1] = np.bincount(cell,weights=terms,minlength=self.numberofcells)
+
+        coca = self.cocametric[l]
+        busy = (nvisits > 1) * (pre[0] > 0)
+        coca[1:] = np.where(busy,pre[1:]/np.where(busy,pre[0],1.),0.)
+        coca[0] = coca[1]*(coca[2]+coca[3]+coca[4])
 
         print "Iteration number: "+str(self.iteration+1)
         print "Reset time = "+str(self.resettime)
@@ -447,22 +265,20 @@ class metric_CoCa():
 
 
     def reset(self):
-        names = []
-        for i in range(0,self.numberofcells):
-            names.append("cell"+str(i))
-
-        formats = []
-        for i in range(0,self.numberofcells):
-            formats.append("|S10")
-
-        ndtype = {'names':names, 'formats':formats}
-        self.cells = np.zeros((500,6), dtype = ndtype)
-
+        # Visits of aircraft to cells, one entry per aircraft per cell visited
+        self.visitidx = dict()
+        self.cellnr = np.array([],dtype=int)
+        self.tenter = np.array([])
+        self.tincell = np.array([])
+        self.hdg = np.array([])
+        self.spd = np.array([])
+        self.vs = np.array([])
         return
 
     def AircraftCell(self,cells,time):
         if floor(time) >= self.resettime:
             bs.sim.pause()
+            self.applyMetric()
             self.reset()
             self.resettime = self.resettime + self.deltaresettime
             self.iteration = self.iteration + 1
@@ -471,37 +287,29 @@ class metric_CoCa():
             # np.save(filedata,self.cocametric)
             bs.sim.start()
 
-        bs.traf.cell = []
-
-        for i in range(bs.traf.ntraf):
-            lat = bs.traf.lat[i]
-            lon = bs.traf.lon[i]
-            fl = bs.traf.alt[i]/ft
-            cellN = self.findCell(cells,lat,lon,fl)
-
-            if cellN > 0:
-                bs.traf.cell = np.append(bs.traf.cell, cellN)
-                name = 'cell'+str(cellN)
-
-                index = np.where(bs.traf.id[i] == self.cells[name][:,[0]])[0]
-                if len(index) != 1:
-
-                    j = 0
-                    for j in range(0,len(self.cells[name])):
-                        if self.cells[name][j][0] == "":
-                            break
-                    self.cells[name][j][0] = bs.traf.id[i]
-                    self.cells[name][j][1] = time
-                    self.cells[name][j][2] = bs.traf.ahdg[i]
-                    self.cells[name][j][3] = eas2tas(bs.traf.aspd[i],bs.traf.aalt[i])/kts
-                    self.cells[name][j][4] = bs.traf.avs[i]/fpm
-                    self.cells[name][j][5] = time
-                if len(index) == 1:
-                    createtime = float(self.cells[name][index[0]][5])
-                    self.cells[name][index[0]][1] = str(time - createtime)
-
-                # self.newaircraft['callsign'][i] = bs.traf.id[i]
-                # self.newaircraft['cellnumber'][i] =
+        cellN = self.findCell(cells,bs.traf.lat,bs.traf.lon,bs.traf.alt/ft)
+        inside = np.where(cellN >= 0)[0]
+        bs.traf.cell = cellN[inside]
+        self.ntraf = len(inside)
+
+        # Update the time in the cell of aircraft that were already in their cell
+        keys = zip(np.array(bs.traf.id)[inside],cellN[inside])
+        index = np.array([self.visitidx.get(key,-1) for key in keys],dtype=int)
+        known = index[index >= 0]
+        self.tincell[known] = time - self.tenter[known]
+
+        # Aircraft entering a cell start a new visit
+        new = inside[index < 0]
+        if len(new) > 0:
+            n = len(self.cellnr)
+            self.visitidx.update(zip([keys[i] for i in np.where(index < 0)[0]],
+                                     range(n,n+len(new))))
+            self.cellnr = np.append(self.cellnr,cellN[new])
+            self.tenter = np.append(self.tenter,np.ones(len(new))*time)
+            self.tincell = np.append(self.tincell,np.zeros(len(new)))
+            self.hdg = np.append(self.hdg,bs.traf.hdg[new])
+            self.spd = np.append(self.spd,bs.traf.tas[new]/kts)
+            self.vs = np.append(self.vs,bs.traf.vs[new]/fpm)
         return
 
 
@@ -513,27 +321,17 @@ class metric_HB():
         self.dist_range = 5.0 #nm
 
         self.alt_range = 1000.0 #ft
-        self.t_cpa = 0
-        self.dist_cpa = 0
         self.spd = np.array([])
         self.lat = np.array([])
         self.lon = np.array([])
-        self.pos = np.array([])
-        self.trk = 0
-
-        self.alt_dif = 0
-        self.alt = 0
+        self.trk = np.array([])
+        self.alt = np.array([])
         self.id = []
 
         self.complexity = defaultdict(lambda:defaultdict(int))
-        self.rel_trk = np.array([])
         self.step = -1
-        self.id_previous = []
-        self.headings = []
-        self.headings_previous = np.array([])
-        self.doubleconflict = 0
         self.ntraf = 0
-        self.compl_ac = 0
+        self.compl_ac = np.array([])
         self.time_lookahead = 1800 #seconds
 
         self.selected_area = ([area[0][0],area[0][1]],[area[1][0],area[1][1]],[area[2][0],area[2][1]],[area[3][0],area[3][1]])
@@ -541,81 +339,27 @@ class metric_HB():
         return
 
     def selectTraffic(self):
-
-        traf_selected_lat = np.array([])
-        traf_selected_lon = np.array([])
-        traf_selected_alt = np.array([])
-        traf_selected_tas = np.array([])
-        traf_selected_trk = np.array([])
-        traf_selected_ntraf = 0
-        # RECTANGLE AREA
-        # for i in range(0,bs.traf.ntraf):
-        #     if nx.pnpoly(bs.traf.lat[i],bs.traf.lon[i],self.selected_area) == 1:
-        #         traf_selected_lat = np.append(traf_selected_lat,bs.traf.lat[i])
-        #         traf_selected_lon = np.append(traf_selected_lon,bs.traf.lon[i])
-        #         traf_selected_alt = np.append(traf_selected_alt,bs.traf.alt[i])
-        #         traf_selected_tas = np.append(traf_selected_tas,bs.traf.tas[i])
-        #         traf_selected_trk = np.append( traf_selected_trk,bs.traf.trk[i])
-        #         traf_selected_ntraf = traf_selected_ntraf + 1
-
+        """ Indices of the aircraft in the research area """
         # CIRCLE AREA (FIR Circle)
-        for i in range(0,bs.traf.ntraf):
-
-            dist = latlondist(bs.sim.metric.fir_circle_point[0],\
-                              bs.sim.metric.fir_circle_point[1],\
-                              bs.traf.lat[i],bs.traf.lon[i])
-
-            if  dist/nm < bs.sim.metric.fir_circle_radius:
-                traf_selected_lat = np.append(traf_selected_lat,bs.traf.lat[i])
-                traf_selected_lon = np.append(traf_selected_lon,bs.traf.lon[i])
-                traf_selected_alt = np.append(traf_selected_alt,bs.traf.alt[i])
-                traf_selected_tas = np.append(traf_selected_tas,bs.traf.tas[i])
-                traf_selected_trk = np.append( traf_selected_trk,bs.traf.trk[i])
-                traf_selected_ntraf = traf_selected_ntraf + 1
-
-
-        return traf_selected_lat,traf_selected_lon,traf_selected_alt,traf_selected_tas,traf_selected_trk,traf_selected_ntraf
-
+        dist = geo.latlondist(bs.sim.metric.fir_circle_point[0],
+                              bs.sim.metric.fir_circle_point[1],
+                              bs.traf.lat,bs.traf.lon)
+        return np.where(dist/nm < bs.sim.metric.fir_circle_radius)[0]
 
     def applymetric(self):
         time1 = time()
         bs.sim.pause()
-        self.doubleconflict = 0
-        # relative pos x and pos y
         self.step = self.step + 1
-        self.pos = np.array([])
-        self.lat = np.array([])
-        self.lon = np.array([])
-
-        self.id = []
-        self.alt_dif = 0
-
-        traf_selected_lat,traf_selected_lon,traf_selected_alt,traf_selected_tas,traf_selected_trk,traf_selected_ntraf = self.selectTraffic()
-
-
-        [self.rel_trk, self.pos] = geo.qdrdist_matrix(self.initiallat,self.initiallon,np.mat(traf_selected_lat),np.mat(traf_selected_lon))
-        # self.lat = np.append(self.lat,traf.lat)
-        # self.lon = np.append(self.lon,traf.lon)
-        self.id = bs.traf.id
-
-        # Position x and y wrt to initial position
-        self.pos = np.mat(self.pos)
-        anglex = np.cos(np.radians(90-self.rel_trk))
-        angley = np.sin(np.radians(90-self.rel_trk))
-
-        self.posx = np.mat(np.array(self.pos) * np.array(anglex)) #nm
-        self.posy = np.mat(np.array(self.pos) * np.array(angley)) #nm
 
-        self.lat = traf_selected_lat
-        self.lon = traf_selected_lon
+        idx = self.selectTraffic()
+        self.id = [bs.traf.id[i] for i in idx]
+        self.lat = bs.traf.lat[idx]
+        self.lon = bs.traf.lon[idx]
+        self.alt = bs.traf.alt[idx]/ft
+        self.spd = bs.traf.tas[idx]/nm #nm/s
+        self.trk = bs.traf.trk[idx]
+        self.ntraf = len(idx)
 
-        self.alt = np.mat(traf_selected_alt/ft)
-        self.spd = traf_selected_tas/nm #nm/s
-        self.trk = traf_selected_trk
-        self.ntraf = traf_selected_ntraf
-
-        self.alt_dif = self.alt-self.alt.T
-        # Vectors CPA_dist and CPA_time
         self.apply_twoCircleMethod()
         time2 = time()
         print "Time to Complete Calculation: " + str(time2-time1)
@@ -623,187 +367,119 @@ class metric_HB():
         bs.sim.start()
         return
 
+    def candidates(self):
+        """ Candidate pairs for the two-circle method: own aircraft and
+            intruder within the altitude range, that can meet within the
+            lookahead time. Returns the indices of own aircraft and intruder,
+            and the bearing [deg] and distance [nm] to the intruder. """
+        # Aircraft sorted on altitude: the pairs within the altitude range
+        # are the following aircraft up to the first one above the range
+        order = np.argsort(self.alt)
+        alt = self.alt[order]
+        nabove = np.searchsorted(alt,alt+self.alt_range) - np.arange(self.ntraf) - 1
+        i = np.repeat(np.arange(self.ntraf),nabove)
+        j = i + 1 + np.arange(len(i)) - np.repeat(np.cumsum(nabove)-nabove,nabove)
+
+        # Both aircraft of a pair are own aircraft once
+        own = np.append(order[i],order[j])
+        intr = np.append(order[j],order[i])
+
+        H0,S0 = geo.qdrdist(self.lat[own],self.lon[own],self.lat[intr],self.lon[intr])
+        Va_Vb = np.abs(self.spd[own]) + np.abs(self.spd[intr])
+        near = (S0 > 0) * (S0 <= self.time_lookahead*Va_Vb)
+
+        return own[near],intr[near],H0[near],S0[near]
+
+    def merge(self,ac,st,en):
+        """ Merge the overlapping heading ranges st-en [deg] per aircraft ac.
+            Returns the aircraft, start and end of the merged ranges. """
+        order = np.lexsort((en,st,ac))
+        ac = ac[order]
+        st = st[order]
+        en = en[order]
+
+        # A range starts a new merged range when it starts after the ends of
+        # all preceding ranges of its aircraft. The offset per aircraft allows
+        # a running maximum over all aircraft at once.
+        offset = 1000.0*ac
+        endmax = np.maximum.accumulate(en+offset)
+        new = st+offset > np.append(-np.inf,endmax[:-1])
+        starts = np.where(new)[0]
+        ends = np.maximum.reduceat(en,starts) if len(starts) > 0 else en
+
+        # A first range of an aircraft that ends before it starts also
+        # remains as a range of its own
+        first = np.append(True,ac[1:] != ac[:-1]) if len(ac) > 0 else new
+        single = np.where(first*(en < st))[0]
+
+        return np.append(ac[starts],ac[single]),np.append(st[starts],st[single]), \
+            np.append(ends,en[single])
 
-    def rel_matrixs(self):
-        self.alt_dif = self.alt-self.alt.T
-        # speeds
-        hdgx = np.cos(np.radians(90-self.trk))
-        hdgy = np.sin(np.radians(90-self.trk))
-
-        spdu = np.mat(self.spd * hdgx.T).T #nm/s
-        spdv = np.mat(self.spd * hdgy.T).T #nm/s
-
-        # distances pos and spd
-        distx = np.array(self.posx.T - self.posx) #nm
-        disty = np.array(self.posy.T - self.posy) #nm
-        distu = (np.array(spdu.T - spdu)) #nm/s
-        distv = (np.array(spdv.T - spdv)) #nm/s
-
-        # predicted time to CPA
-        self.t_cpa = -(distu*distx+distv*disty)/      \
-         (distu*distu+distv*distv+np.array(np.eye(distu[:,0].size)))
-
-        # predicted distance to CPA
-        relcpax = self.t_cpa*np.array(spdu.T)
-        relcpay = self.t_cpa*np.array(spdv.T)
-        cpax = self.posx.T + relcpax
-        cpay = self.posy.T + relcpay
-        distcpax = np.array(cpax-cpax.T)
-        distcpay = np.array(cpay-cpay.T)
-        self.dist_cpa = (distcpax**2+distcpay**2)**0.5
-
-        return
+    def apply_twoCircleMethod(self):
+        own,intr,H0,S0 = self.candidates()
 
-    def apply_altfilter(self,S0):
-        condition = abs(self.alt_dif)<self.alt_range
-        # self.t_cpa = np.where(condition,self.t_cpa, np.nan)
-        # self.dist_cpa = np.where(condition,self.dist_cpa, np.nan)
-        S0 = np.where(condition,S0,np.nan)
-        return S0
-
-    def apply_distfilter(self,H0):
-        condition = self.dist_cpa<self.dist_range*3
-        self.dist_cpa = np.where(condition,self.dist_cpa,np.nan)
-        self.t_cpa = np.where(condition,self.t_cpa,np.nan)
-        H0 = np.where(condition,H0,np.nan)
-        return H0
-
-    def apply_timefilter(self):
-        condition = self.t_cpa>0#(self.t_cpa<(self.time_range+20) * (self.t_cpa>0))
-        self.t_cpa = np.where(condition,self.t_cpa,np.nan)
-        self.dist_cpa = np.where(condition,self.dist_cpa,np.nan)
-        return
+        Va = self.spd[own]
+        Ha = np.radians(self.trk[own])
+        Vb = self.spd + 0.0000001
+        Hb = np.radians(self.trk[intr])
+        VaVa = np.multiply(Va,Va)
 
-    def apply_before_filter(self,S0,Va):
-        Vb = Va.T
-        Va_Vb = np.add(np.abs(Va),np.abs(Vb))
-        condition1 = S0>0
-        condition2 = np.divide(S0,Va_Vb)>self.time_lookahead #seconds
-        condition = np.multiply(condition1,condition2)
-        condition = np.invert(condition)
-        S0 = np.where(condition,S0,np.nan)
-        return S0
-
-    def merge(self,times):
-            if len(times) > 0:
-                saved = list(times[0])
-
-                for st, en in sorted([(t) for t in times]):
-                    if st <= saved[1]:
-                        saved[1] = max(saved[1], en)
-                    else:
-                        yield list(saved)
-                        saved[0] = st
-                        saved[1] = en
-                yield list(saved)
-            else:
-                yield list(times)
+        H0 = np.radians(H0)
+        R_S0 = np.divide(self.dist_range,S0)
+        arcsin = np.arcsin(R_S0)
 
-    def apply_twoCircleMethod(self):
-        Va = np.mat(self.spd)
-        Ha = np.radians(self.trk)
+        ha_new11,ha_new21,ha_new12,ha_new22,t1d1,t1d2,t2d1,t2d2 = \
+            self.calc_angles(Vb[intr],Hb,VaVa,H0,arcsin,S0)
 
-        Vb = np.add(Va,0.0000001)
-        VaVa = np.multiply(Va,Va)
+        ha_1 = np.degrees(ha_new11)
+        ha_3 = np.degrees(ha_new21)
+        ha_2 = np.degrees(ha_new12)
+        ha_4 = np.degrees(ha_new22)
 
-        Hb = Ha
+        ha_1,ha_2,ha_3,ha_4,t1,t2,t3,t4 = self.conditions(ha_1,ha_2,ha_3,ha_4,t1d1,t1d2,t2d1,t2d2,Va,Vb[own],Ha,Hb)
 
-        [H0,S0] = geo.qdrdist_matrix(np.mat(self.lat),np.mat(self.lon),np.mat(self.lat),np.mat(self.lon))
-        S0 = np.where(S0 > 0, S0, np.nan)
+        # Heading ranges in conflict per own aircraft
+        range12 = np.invert(np.isnan(ha_1)+np.isnan(ha_2))
+        range34 = np.invert(np.isnan(ha_3)+np.isnan(ha_4))
+        ac,st,en = self.merge(np.append(own[range12],own[range34]),
+                              np.append(ha_1[range12],ha_3[range34]),
+                              np.append(ha_2[range12],ha_4[range34]))
 
-        S0 = self.apply_before_filter(S0,Va)
-        S0 = self.apply_altfilter(S0)
+        # Limit the ranges to 90 degrees left and right of the own track
+        trk = self.trk[ac]
+        ac_angle180min = ((trk+180-90)%360-180)
+        ac_angle180max = ((trk+180+90)%360-180)
+        ac_angles_st180 = ((st+180)%360-180)
+        ac_angles_en180 = ((en+180)%360-180)
 
-        H0 = np.radians(H0.T)
+        ac_angle360min = (trk+360-90)%360
+        ac_angle360max = (trk+360+90)%360
+        ac_angles_st360 = (ac_angles_st180+360)%360
+        ac_angles_en360 = (ac_angles_en180+360)%360
 
-        R_S0 = np.divide(self.dist_range,S0)
-        arcsin = np.arcsin(R_S0)
+        front = (ac_angle180min < 90)*(ac_angle180min > -90)
+        limit = np.where(front,ac_angles_st180 < ac_angle180min,ac_angles_st360 < ac_angle360min)
+        st = np.where(limit,ac_angle180min,st)
 
-        ha_new11,ha_new21,ha_new12,ha_new22,t1d1,t1d2,t2d1,t2d2 = self.calc_angles(Vb,Hb,VaVa,H0,arcsin,S0)
+        front = (ac_angle180max < 90)*(ac_angle180max > -90)
+        limit = np.where(front,ac_angles_en180 > ac_angle180max,ac_angles_en360 > ac_angle360max)
+        en = np.where(limit,ac_angle180max,en)
 
-        R_S0 = None
-        arcsin = None
+        behind = (ac_angles_st180 < ac_angle180min)*(ac_angles_en180 < ac_angle180min) + \
+                 (ac_angles_st360 < ac_angle360min)*(ac_angles_en360 < ac_angle360min)
+        st = np.where(behind,np.nan,st)
+        en = np.where(behind,np.nan,en)
 
-        ha_1 = np.degrees(ha_new11)
-        ha_3 = np.degrees(ha_new21)
+        # Complexity Score
+        score = np.where((en < 90)*(en > -90),(en-st)/180,(en+360-st)/180)
+        ac_score = np.bincount(ac,weights=score,minlength=self.ntraf).astype(float)
 
-        ha_2 = np.degrees(ha_new12)
-        ha_4 = np.degrees(ha_new22)
+        # Aircraft within the distance range score 1
+        ac_score[own[S0 < self.dist_range]] = 1
+        ac_score[np.isnan(ac_score)] = 0
 
-        t1 = t1d1
-        t2 = t1d2
-        t3 = t2d1
-        t4 = t2d2
-
-        ha_new11 = None
-        ha_new21 = None
-        ha_new12 = None
-        ha_new22 = None
-        t1d1 = None
-        t1d2 = None
-        t2d1 = None
-        t2d2 = None
-
-        ha_1,ha_2,ha_3,ha_4,t1,t2,t3,t4 = self.conditions(ha_1,ha_2,ha_3,ha_4,t1,t2,t3,t4,Va,Vb,Ha,Hb)
-
-        ## Condition where S0 < self.dist_range
-        condition = np.multiply(S0<self.dist_range,S0>0)
-
-        ac_angles = {}
-        ac_score = {}
-        for k in range(0,self.ntraf):
-            ac_angles[str(k)] = []
-            ac_score[str(k)] = 0
-            for l in range(0,self.ntraf):
-                if not np.isnan(ha_1[l,k]) and not np.isnan(ha_2[l,k]):
-                    ac_angles[str(k)].append((ha_1[l,k],ha_2[l,k]))
-                if not np.isnan(ha_3[l,k]) and not np.isnan(ha_4[l,k]):
-                    ac_angles[str(k)].append((ha_3[l,k],ha_4[l,k]))
-
-            ac_angles[str(k)] = sorted(ac_angles[str(k)])
-            ac_angles[str(k)] = list(self.merge(ac_angles[str(k)]))
-            if len(ac_angles[str(k)][0]) > 0:
-                for z in range(0,len(ac_angles[str(k)])):
-                    ac_angle180min = ((self.trk[k]+180-90)%360-180)
-                    ac_angle180max = ((self.trk[k]+180+90)%360-180)
-                    ac_angles_st180 = ((ac_angles[str(k)][z][0]+180)%360-180)
-                    ac_angles_en180 = ((ac_angles[str(k)][z][-1]+180)%360-180)
-
-                    ac_angle360min = (self.trk[k]+360-90)%360
-                    ac_angle360max = (self.trk[k]+360+90)%360
-                    ac_angles_st360 = (ac_angles_st180+360)%360
-                    ac_angles_en360 = (ac_angles_en180+360)%360
-
-                    if ac_angle180min<90 and ac_angle180min>-90:
-                        if ac_angles_st180 < ac_angle180min:
-                            ac_angles[str(k)][z][0] = ac_angle180min
-                    else:
-                        if ac_angles_st360 < ac_angle360min:
-                            ac_angles[str(k)][z][0] = ac_angle180min
-
-                    if ac_angle180max < 90 and ac_angle180max > -90:
-                        if ac_angles_en180 > ac_angle180max:
-                            ac_angles[str(k)][z][-1] = ac_angle180max
-                    else:
-                        if ac_angles_en360 > ac_angle360max:
-                            ac_angles[str(k)][z][-1] = ac_angle180max
-
-                    if (ac_angles_st180 < ac_angle180min and ac_angles_en180 < ac_angle180min) or (ac_angles_st360 < ac_angle360min and ac_angles_en360 < ac_angle360min):
-                        ac_angles[str(k)][z] = [np.nan,np.nan]
-
-                    # Complexity Score
-                    if ac_angles[str(k)][z][-1]<90 and ac_angles[str(k)][z][-1]>-90:
-                        ac_score[str(k)] = ac_score[str(k)] + (ac_angles[str(k)][z][-1]-ac_angles[str(k)][z][0])/180
-                    else:
-                        ac_score[str(k)] = ac_score[str(k)] + (ac_angles[str(k)][z][-1]+360-ac_angles[str(k)][z][0])/180
-
-            if True in condition[k]:
-                ac_score[str(k)] = 1
-
-            if np.isnan(ac_score[str(k)]):
-                ac_score[str(k)] = 0
-
-        ac_totalscore =  sum(ac_score.itervalues())
+        self.compl_ac = ac_score
+        ac_totalscore = np.sum(ac_score)
 
         self.complexity[self.step][0] = ac_totalscore #/ self.ntraf
         self.complexity[self.step][1] = ac_totalscore / max(1,self.ntraf)
@@ -811,7 +487,6 @@ class metric_HB():
         print "Complexity per Aircraft: " + str(self.complexity[self.step][1])
         return
 
-
     def calc_angles(self,Vb,Hb,VaVa,H0,arcsin,S0):
         wx = np.multiply(Vb,np.sin(Hb))
         wy = np.multiply(Vb,np.cos(Hb))
@@ -1041,273 +716,6 @@ class metric_HB():
         return
 
 
-        #    def heading_range(self,i,ac1_conflict,ac2_conflict,lat0_ac1,lon0_ac1,lat0_ac2,lon0_ac2):
-        #
-        #        h_range = np.arange(int(self.trk[ac1_conflict[i]])-90,int(self.trk[ac1_conflict[i]])+90,1)
-        #        h_range = np.append(h_range,self.trk[ac2_conflict[i]])
-        #
-        #
-        #        hdgx = np.cos(np.radians(90-h_range))
-        #        hdgy = np.sin(np.radians(90-h_range))
-        #
-        #        spd = np.array([])
-        #        posy = np.array([])
-        #        posx = np.array([])
-        #        for l in range(0,len(h_range)-1):
-        #            posy = np.append(posy,self.posy[ac1_conflict[i]])
-        #            posx = np.append(posx,self.posx[ac1_conflict[i]])
-        #            spd = np.append(spd,self.spd[ac1_conflict[i]])
-        #
-        #        spd = np.append(spd,self.spd[ac2_conflict[i]])
-        #
-        #        spdu = np.mat(spd * hdgx).T #nm/s
-        #        spdv = np.mat(spd * hdgy).T #nm/s
-        #        posy = np.append(posy,self.posy[ac2_conflict[i]])
-        #        posx = np.append(posx,self.posx[ac2_conflict[i]])
-        #        posx = np.mat(posx).T
-        #        posy = np.mat(posy).T
-        #
-        #        ## distances pos and spd
-        #        distx = np.array(posx - posx.T) #nm
-        #        disty = np.array(posy - posy.T) #nm
-        #        distu = (np.array(spdu - spdu.T)) #nm/s
-        #        distv = (np.array(spdv - spdv.T)) #nm/s
-        #
-        #        ## predicted time to CPA
-        #        t_heading = -(distu*distx+distv*disty)/      \
-        #         (distu*distu+distv*distv+np.array(np.eye(distu[:,0].size)))
-        #
-        #        t_heading = self.apply_timefilter(t_heading)
-        #
-        #        relcpax = t_heading*np.array(spdu.T)
-        #        relcpay = t_heading*np.array(spdv.T)
-        #        cpax = posx.T + relcpax
-        #        cpay = posy.T + relcpay
-        #        distcpax = np.array(cpax-cpax.T)
-        #        distcpay = np.array(cpay-cpay.T)
-        #        distcpa = (distcpax**2+distcpay**2)**0.5
-        #
-        #        n_headings = np.where(distcpa>self.dist_range)
-        #        headings = np.array([])
-        #
-        #        for z in range(0,len(n_headings[0])/2):
-        #            headings = np.append(headings,h_range[n_headings[0][z]])
-        #
-        #
-        #
-        #
-        #        #check if flightid is same, so multiple conflicts per id
-        #        if self.id[ac1_conflict[i]] == self.id_previous:
-        #            headings = np.intersect1d(self.headings_previous,headings)
-        #            n_fault_headings = len(h_range)-len(headings)
-        #            ratio = float(float(n_fault_headings)/float(len(h_range)))
-        #            add_complexity = [self.id[ac1_conflict[i]],ratio,headings]
-        #            self.complexity[self.step][i-self.doubleconflict-1] = add_complexity
-        #            self.doubleconflict = self.doubleconflict + 1
-        #        else:
-        #            n_fault_headings = len(h_range)-len(headings)
-        #            ratio = float(float(n_fault_headings)/float(len(h_range)))
-        #            add_complexity = [self.id[ac1_conflict[i]],ratio,headings]
-        #            self.complexity[self.step][i-self.doubleconflict] = add_complexity
-        #
-        #
-        #        self.id_previous = self.id[ac1_conflict[i]]
-        #        self.headings_previous = headings
-        #
-        #        return
-        #
-        #
-        #
-        #    def apply_precisetime(self,range_t,delta_t,heading_range):
-        #
-        #        ac_conflict = np.where(self.t_cpa>0)
-        #        conflicts = np.size(ac_conflict)/2
-        #
-        #        if conflicts > 0:
-        #            ac1_conflict = ac_conflict[0]
-        #            ac2_conflict = ac_conflict[1]
-        #
-        #
-        #            t_cpa_precise = np.array([])
-        #            plat_ac1 = np.array([])
-        #            plat_ac2 = np.array([])
-        #            plon_ac1 = np.array([])
-        #            plon_ac2 = np.array([])
-        #
-        #            for i in range(0,conflicts):
-        #                lat0_ac1 = self.lat[ac1_conflict[i]]
-        #                lat0_ac2 = self.lat[ac2_conflict[i]]
-        #                lon0_ac1 = self.lon[ac1_conflict[i]]
-        #                lon0_ac2 = self.lon[ac2_conflict[i]]
-        #
-        #                # DETAILED CPA
-        ##                t_cpa_ac1ac2 = self.t_cpa[ac1_conflict[i]][ac2_conflict[i]]
-        ##                t_cpa_range = np.arange(t_cpa_ac1ac2-range_t,t_cpa_ac1ac2+range_t,delta_t)
-        ##                dist_ac1 = t_cpa_precise*self.spd[ac1_conflict[i]]*nm
-        ##                dist_ac2 = t_cpa_precise*self.spd[ac2_conflict[i]]*nm
-        ##
-        ##
-        ##                plat_ac1 = np.append(plat_ac1,lat0_ac1 + \
-        ##                             np.degrees(dist_ac1*np.cos(np.radians(self.trk[ac1_conflict[i]]))/Rearth))
-        ##                plat_ac2 = np.append(plat_ac2,lat0_ac2 + \
-        ##                             np.degrees(dist_ac2*np.cos(np.radians(self.trk[ac2_conflict[i]]))/Rearth))
-        ##                plon_ac1 = np.append(plon_ac1,lon0_ac1 + \
-        ##                                   np.degrees(dist_ac1*np.sin(np.radians(self.trk[ac1_conflict[i]])) \
-        ##                                     /np.cos(np.radians(lat0_ac1))/Rearth))
-        ##                plon_ac2 = np.append(plon_ac2,lon0_ac2 + \
-        ##                                   np.degrees(dist_ac2*np.sin(np.radians(self.trk[ac2_conflict[i]])) \
-        ##                                       /np.cos(np.radians(lat0_ac2))/Rearth))
-        ##
-        ##                dist_ac1ac2 = np.array([])
-        ##                for j in range(0,np.size(t_cpa_range)):
-        ##                    dist_ac1ac2 = np.append(dist_ac1ac2,(latlondist(plat_ac1[j],plon_ac1[j],plat_ac2[j],plon_ac2[j]))/nm)
-        ##
-        ##                index_new_t_cpa = np.argmin(dist_ac1ac2)
-        ##                self.dist_cpa[ac1_conflict[i]][ac2_conflict[i]] = dist_ac1ac2[index_new_t_cpa]
-        ##
-        ##                self.t_cpa[ac1_conflict[i]][ac2_conflict[i]] = t_cpa_precise[index_new_t_cpa]
-        #
-        #                if heading_range == 1:
-        #                    self.heading_range(i,ac1_conflict,ac2_conflict,lat0_ac1,lon0_ac1,lat0_ac2,lon0_ac2)
-        #
-        #        return
-
-    def apply_heading_range(self):
-        Va = np.mat(self.spd)
-        Ha = np.radians(self.trk)
-        Ha_len = len(Ha)
-        Ha = np.repeat(Ha,Ha_len)
-
-        Ha = Ha.reshape(Ha_len,Ha_len)
-
-        Vb = Va
-        Hb = Ha
-
-        R = self.dist_range
-
-        [H0,S0] = geo.qdrdist_matrix(np.mat(self.lat),np.mat(self.lon),np.mat(self.lat),np.mat(self.lon))
-
-        S0 = self.apply_before_filter(S0,Va)
-
-        H0 = np.radians(H0.T)
-        R_S0 = np.divide(R,S0)
-        arcsin = np.arcsin(R_S0)
-        Hr_new1 = H0 - arcsin
-        Hr_new2 = H0 + arcsin
-        Vb_Va = np.divide(Vb.T,Va)
-        Hb_Hr_sin1 = np.sin(Hr_new1 - Hb)
-        mp1 = np.multiply(Vb_Va,Hb_Hr_sin1)
-        mp1 = (mp1 + 1)%2 - 1
-        Hb_Hr_sin2 = np.sin(Hr_new2 - Hb)
-        mp2 = np.multiply(Vb_Va,Hb_Hr_sin2)
-        mp2 = (mp2 + 1)%2 - 1
-
-        Ha_new11 = Hr_new1 - np.arcsin(mp1)
-        Ha_new12 = Hr_new1 - np.arcsin(np.pi-mp1)
-        Ha_new21 = Hr_new2 - np.arcsin(mp2)
-        Ha_new22 = Hr_new2 - np.arcsin(np.pi-mp2)
-
-        Ha_new11 = np.degrees(Ha_new11)
-        Ha_new12 = np.degrees(Ha_new12)
-        Ha_new21 = np.degrees(Ha_new21)
-        Ha_new22 = np.degrees(Ha_new22)
-
-        Ha_new11 = (Ha_new11+180)%360-180
-        Ha_new12 = (Ha_new12+180)%360-180
-        Ha_new21 = (Ha_new21+180)%360-180
-        Ha_new22 = (Ha_new22+180)%360-180
-
-        # Check for more than 90-degree headings, TBD
-        Hdeg = np.degrees(Ha.T)
-        Heading_1 = np.subtract(Hdeg,90)
-        Heading_2 = np.add(Hdeg,90)
-
-        # Heading_new11
-        condition11a = Ha_new11 < Heading_1
-        condition11b = S0>0
-        condition11 = np.multiply(condition11a,condition11b)
-        condition11 = np.invert(condition11)
-        Ha_new11 = np.where(condition11,Ha_new11,Heading_1)
-
-        # Heading_new21
-        condition21a = Ha_new21 > Heading_2
-        condition21 = np.multiply(condition21a,condition11b)
-        condition21 = np.invert(condition21)
-        Ha_new21 = np.where(condition21,Ha_new21,Heading_2)
-
-        # Condition where Va>Vb and angle_rel does not include in H0_limits
-        va_sxa = np.multiply(Va,np.sin(Ha))
-        vb_sxb = va_sxa
-        va_cxa = np.multiply(Va,np.cos(Ha))
-        vb_cxb = va_cxa
-        angle_rel = np.arctan2(np.subtract(va_sxa.T,vb_sxb),np.subtract(va_cxa.T,vb_cxb))
-        angle_rel = np.degrees(angle_rel)
-        angle_rel = (angle_rel+180)%360-180
-
-        condition1 = Va.T > Vb
-        H0_lim1 = np.degrees(H0) - 90
-        H0_lim2 = np.degrees(H0) + 90
-        H0_lim1 = (H0_lim1+180)%360-180
-        H0_lim2 = (H0_lim2+180)%360-180
-        condition2a = angle_rel < H0_lim1
-        condition2b = angle_rel > H0_lim2
-
-        condition2 = np.multiply(condition2a,condition2b)
-        condition = np.multiply(condition1,condition2)
-        condition = np.invert(condition)
-
-        Ha_new11 = np.where(condition,Ha_new11,np.nan)
-        Ha_new12 = np.where(condition,Ha_new12,np.nan)
-        Ha_new21 = np.where(condition,Ha_new21,np.nan)
-        Ha_new22 = np.where(condition,Ha_new22,np.nan)
-
-        # S0_S0 = np.multiply(S0,S0)
-        # d_sep = self.dist_range**2
-        # aaa = np.multiply(2,np.multiply(S0,self.dist_range))
-        # d_min = H0
-        # condition = np.abs(np.subtract(H0,x_rel)) < np.radians(90)
-        # d_min = np.where(condition,d_min,np.multiply(H0,np.sin(np.subtract(H0,x_rel))))
-        # cos_b = np.arcsin(np.divide(d_min,self.dist_range)) - np.abs(np.subtract(H0,x_rel))
-        # mp = np.multiply(aaa,cos_b)
-        # upper = np.sqrt(S0_S0 + d_sep - mp)
-        # Va_Va = np.multiply(Va,Va)
-        # Vb_Vb = np.multiply(Vb,Vb)
-        # va_vb = np.multiply(Va,Vb)
-        # a_va_vb = np.multiply(2,va_vb)
-        # mult = np.multiply(a_va_vb,np.cos(np.subtract(Ha.T,Hb)))
-        # Va_Va_Vb_Vb = np.add(Va_Va,Vb_Vb)
-
-        # v_rel = np.sqrt(np.subtract(Va_Va_Vb_Vb,mult))
-        # print v_rel
-        # t_fls = np.divide(upper,v_rel)
-        # print t_fls
-
-        diff_11_21 = np.subtract(Ha_new11,Ha_new21)
-        diff_11_21 = np.abs((diff_11_21 + 180) % 360 - 180)
-
-        diff_12_22 = np.subtract(Ha_new12,Ha_new22)
-        diff_12_22 = np.abs((diff_12_22 + 180)  % 360 - 180)
-
-        # now combine into 1 complexity score
-        Compl_1 = np.divide(diff_11_21,360)
-        Compl_2 = np.divide(diff_12_22,360)
-        Compl_12ac = np.vstack((Compl_1,Compl_2))
-        Compl_ac = np.nansum(Compl_12ac, axis = 0)
-
-        # Condition where S0 < self.dist_range
-        # condition = np.multiply(S0<self.dist_range,S0>0)
-        # condition = np.invert(condition)
-        # Compl_ac = np.where(condition,Compl_ac,0.5)
-
-        Compl_ac = np.nansum(Compl_ac)
-
-        self.complexity[self.step][0] = Compl_ac #/ self.ntraf
-        self.complexity[self.step][1] = Compl_ac / self.ntraf
-
-        self.complexity_plot()
-        return
-
-
 class Metric():
     """
     Metric class definition : traffic metrics
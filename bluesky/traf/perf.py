@@ -7,6 +7,8 @@ import numpy as np
 import bluesky as bs
 from bluesky.tools.aero import ft, g0, a0, T0, rho0, gamma1, gamma2,  beta, R, \
     kts, lbs, inch, sqft, fpm, vtas2cas
+from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools import scheduler
 
 from performance import esf, phases, calclimits, PHASE
 from bluesky import settings
@@ -101,6 +103,21 @@ class CoeffBS:
         self.d_CD0t    = [1.220, 1.0, 1.0, 1.279, 1.828, 0.496]
         self.d_kt      = [0.948, 1.0, 1.0, 0.94, 0.916, 1.0]
 
+        # lookup tables of the scaling factors, indexed by
+        # [flight phase, engine type, altitude band (0: alt>=450, 1: alt<450)]
+        # phases None and GD are not scaled (zero); the turboprop CD0 scaling
+        # factors for landing are not used (zero)
+        self.CD0f      = np.zeros((7, 3, 2))
+        self.CD0f[1:5, 1, :] = np.array(self.d_CD0j[:4])[:, np.newaxis]
+        self.CD0f[5, 1, :]   = self.d_CD0j[4:]
+        self.CD0f[1:5, 2, :] = np.array(self.d_CD0t[:4])[:, np.newaxis]
+
+        self.kf        = np.zeros((7, 3, 2))
+        self.kf[1:5, 1, :]   = np.array(self.d_kj[:4])[:, np.newaxis]
+        self.kf[5, 1, :]     = self.d_kj[4:]
+        self.kf[1:5, 2, :]   = np.array(self.d_kt[:4])[:, np.newaxis]
+        self.kf[5, 2, :]     = self.d_kt[4:]
+
         # bank angles per phase. Order: TO, IC, CR, AP, LD. Currently already in CTraffic
         # self.bank = np.deg2rad(np.array([15,35,35,35,15]))
 
@@ -333,295 +350,221 @@ class CoeffBS:
                 # according to Babikian (function based on PSFC in [mug/J]), input in [kg/J]
                 self.PSFC_CR.append(self.convert((0.7675*PSFC_TO*1000000.0 + 23.576), 'mug/J'))
                 # print PSFC_TO, self.PSFC_CR
+
+        self.maketable()
         return
 
+    def maketable(self):
+        """ Store the coefficients per aircraft type, including those of its
+            default (first) engine, as rows of the structured array actable,
+            with typeids giving the row of each aircraft type. """
+        names = ['etype', 'MTOW', 'Sref', 'cr_Ma', 'cr_spd', 'gr_acc', 'gr_dec',
+                 'vmto', 'vmld', 'max_Ma', 'max_spd', 'max_alt', 'CD0', 'k',
+                 'clmax_cr']
+        engnames = ['rThr', 'SFC', 'ffto', 'ffcl', 'ffcr', 'ffid', 'ffap',
+                    'P', 'PSFC_TO', 'PSFC_CR']
+        self.actable = np.zeros(len(self.atype), dtype=[(name, float) for name in
+                       names + engnames] + [('engfound', bool)])
+        for name in names:
+            self.actable[name] = getattr(self, name)
+
+        # engine coefficients: jet aircraft use neutral propeller
+        # characteristics and vice versa, for the numpy calculations
+        for name in engnames:
+            self.actable[name] = 1.0
+        for i, engine in enumerate(self.engines):
+            neng = self.n_eng[i]
+            if self.etype[i] == 2:
+                # turboprops
+                found = engine[0] in self.propenlist
+                j = self.propenlist.index(engine[0]) if found else 0
+                self.actable['P'][i]       = self.P[j] * neng
+                self.actable['PSFC_TO'][i] = self.PSFC_TO[j]
+                self.actable['PSFC_CR'][i] = self.PSFC_CR[j]
+            else:
+                # jet (also default)
+                found = engine[0] in self.jetenlist
+                j = self.jetenlist.index(engine[0]) if found else 0
+                self.actable['rThr'][i] = self.rThr[j] * neng
+                self.actable['SFC'][i]  = self.SFC[j]
+                for name in ['ffto', 'ffcl', 'ffcr', 'ffid', 'ffap']:
+                    self.actable[name][i] = getattr(self, name)[j] * neng
+            self.actable['engfound'][i] = found
+
+        self.typeids = dict((actype, i) for i, actype in enumerate(self.atype))
+
 
 coeffBS = CoeffBS()
 
 
-class Perf():
+class Perf(DynamicArrays):
     warned  = False        # Flag: Did we warn for default perf parameters yet?
     warned2 = False    # Flag: Use of piston engine aircraft?
 
     def __init__(self):
-        # create empty database
-        self.reset()
-
         # prepare for coefficient readin
         coeffBS.coeff()
 
         # Flight performance scheduling
-        self.dt  = 0.1           # [s] update interval of performance limits
-        self.t0  = -self.dt  # [s] last time checked (in terms of simt)
+        self.task = scheduler.register('PERF', 0.1)  # update interval of performance limits
         self.warned2 = False        # Flag: Did we warn for default engine parameters yet?
 
-        return
-
-    def reset(self):
-        """Reset database"""
-        # list of aircraft indices
-        self.coeffidxlist = np.array([])
-
-        # geometry and weight
-        self.mass         = np.array ([])
-        self.Sref         = np.array ([])
+        # Thrust settings per flight phase according to ICAO
+        self.Thr_s        = np.array([1., 0.85, 0.07, 0.3 ])
+        self.eta          = 0.8          # propeller efficiency according to Raymer
 
-        # speeds
+        # Register the per-aircraft parameter arrays
+        with RegisterElementParameters(self):
+            # list of aircraft indices
+            self.coeffidxlist = np.array([], dtype=int)
 
-        # reference velocities
-        self.refma        = np.array([]) # reference Mach
-        self.refcas       = np.array([]) # reference CAS
-        self.gr_acc       = np.array([]) # ground acceleration
-        self.gr_dec       = np.array([]) # ground deceleration
+            # geometry and weight
+            self.mass         = np.array ([])
+            self.Sref         = np.array ([])
 
-        # limits
-        self.vm_to        = np.array([]) # min takeoff spd (w/o mass, density)
-        self.vm_ld        = np.array([]) # min landing spd (w/o mass, density)
-        self.vmto         = np.array([]) # min TO spd
-        self.vmic         = np.array([]) # min. IC speed
-        self.vmcr         = np.array([]) # min cruise spd
-        self.vmap         = np.array([]) # min approach speed
-        self.vmld         = np.array([]) # min landing spd
-        self.vmin         = np.array([]) # min speed over all phases
-        self.vmo          = np.array([]) # max CAS
-        self.mmo          = np.array([]) # max Mach
-
-        self.hmaxact      = np.array([]) # max. altitude
-        self.maxthr       = np.array([]) # maximum thrust
+            # speeds
 
-        # aerodynamics
-        self.CD0          = np.array([]) # parasite drag coefficient
-        self.k            = np.array([]) # induced drag factor
-        self.clmaxcr      = np.array([]) # max. cruise lift coefficient
-        self.qS           = np.array([])
+            # reference velocities
+            self.refma        = np.array([]) # reference Mach
+            self.refcas       = np.array([]) # reference CAS
+            self.gr_acc       = np.array([]) # ground acceleration
+            self.gr_dec       = np.array([]) # ground deceleration
+            self.atrans       = np.array([]) # crossover altitude
 
-        # engines
-        self.engines      = [] # avaliable engine type per aircraft type
-        self.etype        = np.array([]) # jet /turboprop
-
-        # jet engines:
-        self.rThr         = np.array([]) # rated thrust (all engines)
-        self.Thr_s        = np.array([]) # chosen thrust setting
-        self.SFC          = np.array([]) # specific fuel consumption in cruise
-        self.ff           = np.array([]) # fuel flow
-        self.ffto         = np.array([]) # fuel flow takeoff
-        self.ffcl         = np.array([]) # fuel flow climb
-        self.ffcr         = np.array([]) # fuel flow cruise
-        self.ffid         = np.array([]) # fuel flow idle
-        self.ffap         = np.array([]) # fuel flow approach
-        self.Thr_s        = np.array([1., 0.85, 0.07, 0.3 ]) # Thrust settings per flight phase according to ICAO
-
-        # turboprop engines
-        self.P            = np.array([]) # avaliable power at takeoff conditions
-        self.PSFC_TO      = np.array([]) # specific fuel consumption takeoff
-        self.PSFC_CR      = np.array([]) # specific fuel consumption cruise
-        self.eta          = 0.8          # propeller efficiency according to Raymer
+            # limits
+            self.vm_to        = np.array([]) # min takeoff spd (w/o mass, density)
+            self.vm_ld        = np.array([]) # min landing spd (w/o mass, density)
+            self.vmto         = np.array([]) # min TO spd
+            self.vmic         = np.array([]) # min. IC speed
+            self.vmcr         = np.array([]) # min cruise spd
+            self.vmap         = np.array([]) # min approach speed
+            self.vmld         = np.array([]) # min landing spd
+            self.vmin         = np.array([]) # min speed over all phases
+            self.vmo          = np.array([]) # max CAS
+            self.mmo          = np.array([]) # max Mach
+
+            self.hmaxact      = np.array([]) # max. altitude
+            self.maxthr       = np.array([]) # maximum thrust
 
-        self.Thr          = np.array([]) # Thrust
-        self.D            = np.array([]) # Drag
-        self.ESF          = np.array([]) # Energy share factor according to EUROCONTROL
+            # aerodynamics
+            self.CD0          = np.array([]) # parasite drag coefficient
+            self.k            = np.array([]) # induced drag factor
+            self.clmaxcr      = np.array([]) # max. cruise lift coefficient
+            self.qS           = np.array([])
+
+            # engines
+            self.engines      = [] # avaliable engine type per aircraft type
+            self.etype        = np.array([]) # jet /turboprop
+
+            # jet engines:
+            self.rThr         = np.array([]) # rated thrust (all engines)
+            self.SFC          = np.array([]) # specific fuel consumption in cruise
+            self.ff           = np.array([]) # fuel flow
+            self.ffto         = np.array([]) # fuel flow takeoff
+            self.ffcl         = np.array([]) # fuel flow climb
+            self.ffcr         = np.array([]) # fuel flow cruise
+            self.ffid         = np.array([]) # fuel flow idle
+            self.ffap         = np.array([]) # fuel flow approach
+
+            # turboprop engines
+            self.P            = np.array([]) # avaliable power at takeoff conditions
+            self.PSFC_TO      = np.array([]) # specific fuel consumption takeoff
+            self.PSFC_CR      = np.array([]) # specific fuel consumption cruise
+
+            self.Thr          = np.array([]) # Thrust
+            self.D            = np.array([]) # Drag
+            self.ESF          = np.array([]) # Energy share factor according to EUROCONTROL
+
+            # flight phase
+            self.phase        = np.array([], dtype=int) # flight phase
+            self.bank         = np.array([]) # bank angle
+            self.post_flight  = np.array([], dtype=bool) # check for ground mode:
+                                                         #taxi prior of after flight
+            self.pf_flag      = np.array([], dtype=bool)
 
-        # flight phase
-        self.phase        = np.array([]) # flight phase
-        self.bank         = np.array([]) # bank angle
-        self.post_flight  = np.array([]) # check for ground mode:
-                                          #taxi prior of after flight
-        self.pf_flag      = np.array([])
         return
 
-
     def create(self, n=1):
-        actype = bs.traf.type[-1]
         """Create new aircraft"""
+        super(Perf, self).create(n)
+        actypes = bs.traf.type[-n:]
         # note: coefficients are initialized in SI units
-        if actype in coeffBS.atype:
-            # aircraft
-            self.coeffidx = coeffBS.atype.index(actype)
-            # engine
-        else:
-            self.coeffidx = 0
+        # look up the coefficient table rows of the aircraft types
+        types, inv = np.unique(actypes, return_inverse=True)
+        ids = np.array([coeffBS.typeids.get(actype, -1) for actype in types], dtype=int)[inv]
+        for i in np.where(ids < 0)[0]:
+            ids[i] = 0
             if not settings.verbose:
                 if not self.warned:
                     print "Aircraft is using default B747-400 performance."
                     self.warned = True
             else:
-                print "Flight " + bs.traf.id[-1] + " has an unknown aircraft type, " + actype + ", BlueSky then uses default B747-400 performance."
+                print "Flight " + bs.traf.id[i - n] + " has an unknown aircraft type, " + actypes[i] + ", BlueSky then uses default B747-400 performance."
 
-        self.coeffidxlist = np.append(self.coeffidxlist, self.coeffidx)
-        self.mass         = np.append(self.mass, coeffBS.MTOW[self.coeffidx]) # aircraft weight
-        self.Sref         = np.append(self.Sref, coeffBS.Sref[self.coeffidx]) # wing surface reference area
-        self.etype        = np.append(self.etype, coeffBS.etype[self.coeffidx]) # engine type of current aircraft
-        self.engines.append(coeffBS.engines[self.coeffidx]) # avaliable engine type per aircraft type
+        # gather the coefficients of all new aircraft at once
+        coeff = coeffBS.actable[ids]
+
+        self.coeffidxlist[-n:] = ids
+        self.mass[-n:]         = coeff['MTOW'] # aircraft weight
+        self.Sref[-n:]         = coeff['Sref'] # wing surface reference area
+        self.etype[-n:]        = coeff['etype'] # engine type of current aircraft
+        self.engines[-n:]      = [coeffBS.engines[i] for i in ids] # avaliable engine type per aircraft type
 
         # speeds
-        self.refma        = np.append(self.refma, coeffBS.cr_Ma[self.coeffidx]) # nominal cruise Mach at 35000 ft
-        self.refcas       = np.append(self.refcas, vtas2cas(coeffBS.cr_spd[self.coeffidx], 35000*ft)) # nominal cruise CAS
-        self.gr_acc       = np.append(self.gr_acc,coeffBS.gr_acc[self.coeffidx]) # ground acceleration
-        self.gr_dec       = np.append(self.gr_dec, coeffBS.gr_dec[self.coeffidx]) # ground acceleration
+        self.refma[-n:]        = coeff['cr_Ma'] # nominal cruise Mach at 35000 ft
+        self.refcas[-n:]       = vtas2cas(coeff['cr_spd'], 35000*ft) # nominal cruise CAS
+        self.gr_acc[-n:]       = coeff['gr_acc'] # ground acceleration
+        self.gr_dec[-n:]       = coeff['gr_dec'] # ground acceleration
 
         # calculate the crossover altitude according to the BADA 3.12 User Manual
-        self.atrans       = ((1000/6.5)*(T0*(1-((((1+gamma1*(self.refcas/a0)*(self.refcas/a0))** \
-                                (gamma2))-1) / (((1+gamma1*self.refma*self.refma)** \
-                                    (gamma2))-1))**((-(beta)*R)/g0))))
+        self.atrans[-n:]       = ((1000/6.5)*(T0*(1-((((1+gamma1*(self.refcas[-n:]/a0)*(self.refcas[-n:]/a0))** \
+                                    (gamma2))-1) / (((1+gamma1*self.refma[-n:]*self.refma[-n:])** \
+                                        (gamma2))-1))**((-(beta)*R)/g0))))
 
         # limits
-        self.vm_to        = np.append(self.vm_to, coeffBS.vmto[self.coeffidx])
-        self.vm_ld        = np.append(self.vm_ld, coeffBS.vmld[self.coeffidx])
-        self.vmto         = np.append(self.vmto, 0.0)
-        self.vmic         = np.append(self.vmic, 0.0)
-        self.vmcr         = np.append(self.vmcr, 0.0)
-        self.vmap         = np.append(self.vmap, 0.0)
-        self.vmld         = np.append(self.vmld, 0.0)
-        self.vmin         = np.append (self.vmin, 0.0)
-        self.mmo          = np.append(self.mmo, coeffBS.max_Ma[self.coeffidx]) # maximum Mach
-        self.vmo          = np.append(self.vmo, coeffBS.max_spd[self.coeffidx]) # maximum CAS
-        self.hmaxact      = np.append(self.hmaxact, coeffBS.max_alt[self.coeffidx]) # maximum altitude
+        self.vm_to[-n:]        = coeff['vmto']
+        self.vm_ld[-n:]        = coeff['vmld']
+        self.mmo[-n:]          = coeff['max_Ma'] # maximum Mach
+        self.vmo[-n:]          = coeff['max_spd'] # maximum CAS
+        self.hmaxact[-n:]      = coeff['max_alt'] # maximum altitude
 
         # aerodynamics
-        self.CD0          = np.append(self.CD0, coeffBS.CD0[self.coeffidx])  # parasite drag coefficient
-        self.k            = np.append(self.k, coeffBS.k[self.coeffidx])  # induced drag factor
-        self.clmaxcr      = np.append(self.clmaxcr, coeffBS.clmax_cr[self.coeffidx])   # max. cruise lift coefficient
-        self.qS           = np.append(self.qS, 0.0)
+        self.CD0[-n:]          = coeff['CD0']  # parasite drag coefficient
+        self.k[-n:]            = coeff['k']  # induced drag factor
+        self.clmaxcr[-n:]      = coeff['clmax_cr']   # max. cruise lift coefficient
         # performance - initialise neutrally
-        self.D            = np.append(self.D, 0.)
-        self.ESF          = np.append(self.ESF, 1.)
-
-        # flight phase
-        self.phase        = np.append(self.phase, 0.)
-        self.bank         = np.append(self.bank, 0.)
-        self.post_flight  = np.append(self.post_flight, False) # for initialisation,
-                                                              # we assume that ac has yet to take off
-        self.pf_flag      = np.append(self.pf_flag, True)
-        # engines
-
-        # turboprops
-        if coeffBS.etype[self.coeffidx] ==2:
-            if coeffBS.engines[self.coeffidx][0] in coeffBS.propenlist:
-                self.propengidx = coeffBS.propenlist.index(coeffBS.engines[self.coeffidx][0])
-            else:
-                self.propengidx = 0
-                if not Perf.warned2:
-                    print "prop aircraft is using standard engine. Please check valid engine types per aircraft type"
-                    Perf.warned2 = True
-
-            self.P       = np.append(self.P, coeffBS.P[self.propengidx]*coeffBS.n_eng[self.coeffidx])
-            self.PSFC_TO = np.append(self.PSFC_TO, coeffBS.PSFC_TO[self.propengidx])
-            self.PSFC_CR = np.append(self.PSFC_CR, coeffBS.PSFC_CR[self.propengidx])
-            self.ff      = np.append(self.ff, 0.) # neutral initialisation
-            # jet characteristics needed for numpy calculations
-            self.rThr    = np.append(self.rThr, 1.)
-            self.Thr     = np.append(self.Thr, 1.)
-            self.maxthr  = np.append (self.maxthr, 1.)
-            self.SFC     = np.append(self.SFC, 1.)
-            self.ffto    = np.append(self.ffto, 1.)
-            self.ffcl    = np.append(self.ffcl, 1.)
-            self.ffcr    = np.append(self.ffcr, 1.)
-            self.ffid    = np.append(self.ffid, 1.)
-            self.ffap    = np.append(self.ffap, 1.)
+        self.ESF[-n:]          = 1.
 
+        # flight phase: for initialisation, we assume that ac has yet to take off
+        self.post_flight[-n:]  = False
+        self.pf_flag[-n:]      = True
 
-        # jet (also default)
-
-        else:      # so coeffBS.etype[self.coeffidx] ==1:
-
-            if coeffBS.engines[self.coeffidx][0] in coeffBS.jetenlist:
-                self.jetengidx = coeffBS.jetenlist.index(coeffBS.engines[self.coeffidx][0])
-            else:
-                self.jetengidx = 0
-                if not self.warned2:
-                    print " jet aircraft is using standard engine. Please check valid engine types per aircraft type"
-                    self.warned2 = True
-
-            self.rThr    = np.append(self.rThr, coeffBS.rThr[self.jetengidx]*coeffBS.n_eng[self.coeffidx])  # rated thrust (all engines)
-            self.Thr     = np.append(self.Thr, coeffBS.rThr[self.jetengidx]*coeffBS.n_eng[self.coeffidx])  # initialize thrust with rated thrust
-            self.maxthr  = np.append (self.maxthr, coeffBS.rThr[self.jetengidx]*coeffBS.n_eng[self.coeffidx]*1.2)  # maximum thrust - initialize with 1.2*rThr
-            self.SFC     = np.append(self.SFC, coeffBS.SFC[self.jetengidx])
-            self.ff      = np.append(self.ff, 0.)  # neutral initialisation
-            self.ffto    = np.append(self.ffto, coeffBS.ffto[self.jetengidx]*coeffBS.n_eng[self.coeffidx])
-            self.ffcl    = np.append(self.ffcl, coeffBS.ffcl[self.jetengidx]*coeffBS.n_eng[self.coeffidx])
-            self.ffcr    = np.append(self.ffcr, coeffBS.ffcr[self.jetengidx]*coeffBS.n_eng[self.coeffidx])
-            self.ffid    = np.append(self.ffid, coeffBS.ffid[self.jetengidx]*coeffBS.n_eng[self.coeffidx])
-            self.ffap    = np.append(self.ffap, coeffBS.ffap[self.jetengidx]*coeffBS.n_eng[self.coeffidx])
-
-            # propeller characteristics needed for numpy calculations
-            self.P       = np.append(self.P, 1.)
-            self.PSFC_TO = np.append(self.PSFC_TO, 1.)
-            self.PSFC_CR = np.append(self.PSFC_CR, 1.)
-
-        return
+        # engines: the default engine of each type, for jets the propeller
+        # characteristics are neutral and vice versa
+        if not Perf.warned2 and not coeff['engfound'].all():
+            print "aircraft is using standard engine. Please check valid engine types per aircraft type"
+            Perf.warned2 = True
 
-    def delete(self, idx):
-        """Delete removed aircraft"""
-
-        del self.engines[idx]
-
-        self.coeffidxlist = np.delete(self.coeffidxlist, idx)
-        self.mass         = np.delete(self.mass, idx)    # aircraft weight
-        self.Sref         = np.delete(self.Sref, idx)    # wing surface reference area
-        self.etype        = np.delete(self.etype, idx)  # engine type of current aircraft
-
-        # limits
-        self.vmo          = np.delete(self.vmo, idx)  # maximum CAS
-        self.mmo          = np.delete(self.mmo, idx)  # maximum Mach
-
-        # vm_to excludes (squrt(m/rho) )
-        # vmto includes weight and altitude influence
-        self.vm_to        = np.delete(self.vm_to, idx)
-        self.vm_ld        = np.delete(self.vm_ld, idx)
-        self.vmto         = np.delete(self.vmto, idx)
-        self.vmic         = np.delete(self.vmic, idx)
-        self.vmcr         = np.delete(self.vmcr, idx)
-        self.vmap         = np.delete(self.vmap, idx)
-        self.vmld         = np.delete(self.vmld, idx)
-        self.vmin         = np.delete(self.vmin, idx)
-        self.maxthr       = np.delete(self.maxthr, idx)
-        self.hmaxact      = np.delete(self.hmaxact, idx)
-
-        # reference speeds
-        self.refma        = np.delete(self.refma, idx)   # nominal cruise Mach at 35000 ft
-        self.refcas       = np.delete(self.refcas, idx)  # nominal cruise CAS
-        self.gr_acc       = np.delete(self.gr_acc, idx)       # ground acceleration
-        self.gr_dec       = np.delete(self.gr_dec, idx)       # ground deceleration
-        self.atrans       = np.delete(self.atrans, idx)   # crossover altitude
-
-        # aerodynamics
-        self.CD0          = np.delete(self.CD0, idx)      # parasite drag coefficient
-        self.k            = np.delete(self.k, idx)        # induced drag factor
-        self.clmaxcr      = np.delete(self.clmaxcr, idx)  # max. cruise lift coefficient
-        self.qS           = np.delete(self.qS, idx)
+        # turboprops
+        self.P[-n:]       = coeff['P']
+        self.PSFC_TO[-n:] = coeff['PSFC_TO']
+        self.PSFC_CR[-n:] = coeff['PSFC_CR']
 
-        # engine
-        self.rThr         = np.delete(self.rThr, idx)     # rated thrust (all engines)
-        self.SFC          = np.delete(self.SFC, idx)
-        self.ffto         = np.delete(self.ffto, idx)
-        self.ffcl         = np.delete(self.ffcl, idx)
-        self.ffcr         = np.delete(self.ffcr, idx)
-        self.ffid         = np.delete(self.ffid, idx)
-        self.ffap         = np.delete(self.ffap, idx)
-        self.ff           = np.delete(self.ff, idx)
-
-        # turboprop engines
-        self.P            = np.delete(self.P, idx)        # avaliable power at takeoff conditions
-        self.PSFC_TO      = np.delete(self.PSFC_TO, idx)  # specific fuel consumption takeoff
-        self.PSFC_CR      = np.delete(self.PSFC_CR, idx)  # specific fuel consumption cruise
-
-        # performance
-        self.Thr          = np.delete(self.Thr, idx)
-        self.D            = np.delete(self.D, idx)
-        self.ESF          = np.delete(self.ESF, idx)
-
-        # flight phase
-        self.phase        = np.delete(self.phase, idx)
-        self.bank         = np.delete(self.bank, idx)
-        self.post_flight  = np.delete(self.post_flight, idx)
-        self.pf_flag      = np.delete(self.pf_flag, idx)
+        # jet (also default)
+        self.rThr[-n:]    = coeff['rThr']  # rated thrust (all engines)
+        self.Thr[-n:]     = coeff['rThr']  # initialize thrust with rated thrust
+        self.maxthr[-n:]  = coeff['rThr']*np.where(coeff['etype'] == 2, 1., 1.2)  # maximum thrust - initialize with 1.2*rThr
+        self.SFC[-n:]     = coeff['SFC']
+        self.ffto[-n:]    = coeff['ffto']
+        self.ffcl[-n:]    = coeff['ffcl']
+        self.ffcr[-n:]    = coeff['ffcr']
+        self.ffid[-n:]    = coeff['ffid']
+        self.ffap[-n:]    = coeff['ffap']
 
         return
 
     def perf(self,simt):
-        if abs(simt - self.t0) >= self.dt:
-            self.t0 = simt
-        else:
+        if not self.task.due(simt):
             return
         """Aircraft performance"""
         swbada = False # no-bada version
@@ -640,31 +583,12 @@ class Perf():
 
         # scaling factors for CD0 and CDi during flight phases according to FAA (2005): SAGE, V. 1.5, Technical Manual
 
-        CD0f = (self.phase==1)*(self.etype==1)*coeffBS.d_CD0j[0] + \
-               (self.phase==2)*(self.etype==1)*coeffBS.d_CD0j[1]  + \
-               (self.phase==3)*(self.etype==1)*coeffBS.d_CD0j[2] + \
-               (self.phase==4)*(self.etype==1)*coeffBS.d_CD0j[3] + \
-               (self.phase==5)*(self.etype==1)*(bs.traf.alt>=450)*coeffBS.d_CD0j[4] + \
-               (self.phase==5)*(self.etype==1)*(bs.traf.alt<450)*coeffBS.d_CD0j[5] + \
-               (self.phase==1)*(self.etype==2)*coeffBS.d_CD0t[0] + \
-               (self.phase==2)*(self.etype==2)*coeffBS.d_CD0t[1]  + \
-               (self.phase==3)*(self.etype==2)*coeffBS.d_CD0t[2] + \
-               (self.phase==4)*(self.etype==2)*coeffBS.d_CD0t[3]
-                   # (self.phase==5)*(self.etype==2)*(self.alt>=450)*coeffBS.d_CD0t[4] + \
-                   # (self.phase==5)*(self.etype==2)*(self.alt<450)*coeffBS.d_CD0t[5]
-
-        kf =   (self.phase==1)*(self.etype==1)*coeffBS.d_kj[0] + \
-               (self.phase==2)*(self.etype==1)*coeffBS.d_kj[1]  + \
-               (self.phase==3)*(self.etype==1)*coeffBS.d_kj[2] + \
-               (self.phase==4)*(self.etype==1)*coeffBS.d_kj[3] + \
-               (self.phase==5)*(self.etype==1)*(bs.traf.alt>=450)*coeffBS.d_kj[4] + \
-               (self.phase==5)*(self.etype==1)*(bs.traf.alt<450)*coeffBS.d_kj[5] + \
-               (self.phase==1)*(self.etype==2)*coeffBS.d_kt[0] + \
-               (self.phase==2)*(self.etype==2)*coeffBS.d_kt[1]  + \
-               (self.phase==3)*(self.etype==2)*coeffBS.d_kt[2] + \
-               (self.phase==4)*(self.etype==2)*coeffBS.d_kt[3] + \
-               (self.phase==5)*(self.etype==2)*(bs.traf.alt>=450)*coeffBS.d_kt[4] + \
-               (self.phase==5)*(self.etype==2)*(bs.traf.alt<450)*coeffBS.d_kt[5]
+        # lookup per aircraft: [phase, engine type, altitude band]
+        iphase = self.phase.astype(int)
+        ietype = self.etype.astype(int)
+        ialt   = (bs.traf.alt < 450).astype(int)
+        CD0f   = coeffBS.CD0f[iphase, ietype, ialt]
+        kf     = coeffBS.kf[iphase, ietype, ialt]
 
 
         # drag coefficient
@@ -680,8 +604,9 @@ class Perf():
 
 
         # crossover altitiude
-        bs.traf.abco = np.array(bs.traf.alt>self.atrans)
-        bs.traf.belco = np.array(bs.traf.alt<self.atrans)
+        # (compared in pressure altitude for non-ISA conditions)
+        bs.traf.abco = np.array(bs.traf.alt + bs.traf.dpalt > self.atrans)
+        bs.traf.belco = np.array(bs.traf.alt + bs.traf.dpalt < self.atrans)
 
         # energy share factor
         self.ESF = esf(bs.traf.abco, bs.traf.belco, bs.traf.alt, bs.traf.M,\
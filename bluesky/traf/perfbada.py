@@ -3,6 +3,7 @@ import numpy as np
 import bluesky as bs
 from bluesky.tools.aero import kts, ft, g0, a0, T0, gamma1, gamma2,  beta, R
 from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools import scheduler
 from performance import esf, phases, calclimits, PHASE
 from bluesky import settings
 
@@ -37,8 +38,7 @@ class PerfBADA(DynamicArrays):
         self.warned2 = False    # Flag: Use of piston engine aircraft?
 
         # Flight performance scheduling
-        self.dt  = 0.1           # [s] update interval of performance limits
-        self.t0  = -self.dt  # [s] last time checked (in terms of simt)
+        self.task = scheduler.register('PERF', 0.1)  # update interval of performance limits
         self.warned2 = False        # Flag: Did we warn for default engine parameters yet?
 
         # Register the per-aircraft parameter arrays
@@ -171,78 +171,78 @@ class PerfBADA(DynamicArrays):
         # note: coefficients are initialized in SI units
 
         # general
-        # designate aircraft to its aircraft type
-        for actype in actypes:
-            syn, coeff = bada_coeff.getCoefficients(actype)
-            if syn:
-                continue
-
-            syn, coeff = bada_coeff.getCoefficients('B744')
-            bs.traf.type[-n:] = syn.accode
-
+        # designate aircraft to its aircraft type: look up the rows of the
+        # coefficient table, unknown aircraft types get the B744 coefficients
+        ids = bada_coeff.getTypeIds(actypes)
+        for i in np.where(ids < 0)[0]:
+            ids[i] = bada_coeff.typeids['B744']
             if not settings.verbose:
                 if not self.warned:
                     print "Aircraft is using default B747-400 performance."
                     self.warned = True
             else:
-                print "Flight " + bs.traf.id[-n:] + " has an unknown aircraft type, " + actype + ", BlueSky then uses default B747-400 performance."
+                print "Flight " + bs.traf.id[i - n] + " has an unknown aircraft type, " + actypes[i] + ", BlueSky then uses default B747-400 performance."
+            bs.traf.type[i - n] = 'B744'
+
+        # gather the coefficients of all new aircraft at once
+        coeff = bada_coeff.coefftable[ids]
 
         # designate aicraft to its aircraft type
-        self.jet[-n:]       = 1 if coeff.engtype == 'Jet' else 0
-        self.turbo[-n:]     = 1 if coeff.engtype == 'Turboprop' else 0
-        self.piston[-n:]    = 1 if coeff.engtype == 'Piston' else 0
+        self.jet[-n:]       = coeff['jet']
+        self.turbo[-n:]     = coeff['turbo']
+        self.piston[-n:]    = coeff['piston']
 
         # Initial aircraft mass is currently reference mass.
         # BADA 3.12 also supports masses between 1.2*mmin and mmax
-        self.mass[-n:]      = coeff.m_ref * 1000.0
-        self.mmin[-n:]      = coeff.m_min * 1000.0
-        self.mmax[-n:]      = coeff.m_max * 1000.0
+        self.mass[-n:]      = coeff['m_ref'] * 1000.0
+        self.mmin[-n:]      = coeff['m_min'] * 1000.0
+        self.mmax[-n:]      = coeff['m_max'] * 1000.0
 
         # self.mpyld = np.append(self.mpyld, coeff.mpyld[coeffidx]*1000)
-        self.gw[-n:]        = coeff.mass_grad * ft
+        self.gw[-n:]        = coeff['mass_grad'] * ft
 
         # Surface Area [m^2]
-        self.Sref[-n:]      = coeff.S
+        self.Sref[-n:]      = coeff['S']
 
         # flight envelope
         # minimum speeds per phase
-        self.vmto[-n:]      = coeff.Vstall_to * coeff.CVmin_to * kts
-        self.vmic[-n:]      = coeff.Vstall_ic * coeff.CVmin * kts
-        self.vmcr[-n:]      = coeff.Vstall_cr * coeff.CVmin * kts
-        self.vmap[-n:]      = coeff.Vstall_ap * coeff.CVmin * kts
-        self.vmld[-n:]      = coeff.Vstall_ld * coeff.CVmin * kts
+        self.vmto[-n:]      = coeff['Vstall_to'] * bada_coeff.ACData.CVmin_to * kts
+        self.vmic[-n:]      = coeff['Vstall_ic'] * bada_coeff.ACData.CVmin * kts
+        self.vmcr[-n:]      = coeff['Vstall_cr'] * bada_coeff.ACData.CVmin * kts
+        self.vmap[-n:]      = coeff['Vstall_ap'] * bada_coeff.ACData.CVmin * kts
+        self.vmld[-n:]      = coeff['Vstall_ld'] * bada_coeff.ACData.CVmin * kts
         self.vmin[-n:]      = 0.0
-        self.vmo[-n:]       = coeff.VMO * kts
-        self.mmo[-n:]       = coeff.MMO
+        self.vmo[-n:]       = coeff['VMO'] * kts
+        self.mmo[-n:]       = coeff['MMO']
 
         # max. altitude parameters
-        self.hmo[-n:]       = coeff.h_MO * ft
-        self.hmax[-n:]      = coeff.h_max * ft
-        self.hmaxact[-n:]   = coeff.h_max * ft  # initialize with hmax
-        self.gt[-n:]        = coeff.temp_grad * ft
+        self.hmo[-n:]       = coeff['h_MO'] * ft
+        self.hmax[-n:]      = coeff['h_max'] * ft
+        self.hmaxact[-n:]   = coeff['h_max'] * ft  # initialize with hmax
+        self.gt[-n:]        = coeff['temp_grad'] * ft
 
         # max thrust setting
         self.maxthr[-n:]    = 1e6  # initialize with excessive setting to avoid unrealistic limit setting
 
         # Buffet Coefficients
-        self.clbo[-n:]      = coeff.Clbo
-        self.k[-n:]         = coeff.k
-        self.cm16[-n:]      = coeff.CM16
+        self.clbo[-n:]      = coeff['Clbo']
+        self.k[-n:]         = coeff['k']
+        self.cm16[-n:]      = coeff['CM16']
 
         # reference speeds
         # reference CAS speeds
-        self.cascl[-n:]     = coeff.CAScl1[0] * kts
-        self.cascr[-n:]     = coeff.CAScr1[0] * kts
-        self.casdes[-n:]    = coeff.CASdes1[0] * kts
+        self.cascl[-n:]     = coeff['CAScl1'] * kts
+        self.cascr[-n:]     = coeff['CAScr1'] * kts
+        self.casdes[-n:]    = coeff['CASdes1'] * kts
 
         # reference mach numbers
-        self.macl[-n:]      = coeff.Mcl[0]
-        self.macr[-n:]      = coeff.Mcr[0]
-        self.mades[-n:]     = coeff.Mdes[0]
+        self.macl[-n:]      = coeff['Mcl']
+        self.macr[-n:]      = coeff['Mcr']
+        self.mades[-n:]     = coeff['Mdes']
 
         # reference speed during descent
-        self.vdes[-n:]      = coeff.Vdes_ref * kts
-        self.mdes[-n:]      = coeff.Mdes_ref
+        self.vdes[-n:]      = coeff['Vdes_ref'] * kts
+        self.mdes[-n:]      = coeff['Mdes_ref']
 
         # crossover altitude for climbing and descending aircraft (BADA User Manual 3.12, p. 12)
         self.atranscl[-n:]  = (1e3 / 6.5) * (T0 * (1.0 - (((( 1.0 + gamma1 *
@@ -257,54 +257,50 @@ class PerfBADA(DynamicArrays):
 
         # aerodynamics
         # parasitic drag coefficients per phase
-        self.cd0to[-n:]     = coeff.CD0_to
-        self.cd0ic[-n:]     = coeff.CD0_ic
-        self.cd0cr[-n:]     = coeff.CD0_cr
-        self.cd0ap[-n:]     = coeff.CD0_ap
-        self.cd0ld[-n:]     = coeff.CD0_ld
-        self.gear[-n:]      = coeff.CD0_gear
+        self.cd0to[-n:]     = coeff['CD0_to']
+        self.cd0ic[-n:]     = coeff['CD0_ic']
+        self.cd0cr[-n:]     = coeff['CD0_cr']
+        self.cd0ap[-n:]     = coeff['CD0_ap']
+        self.cd0ld[-n:]     = coeff['CD0_ld']
+        self.gear[-n:]      = coeff['CD0_gear']
 
         # induced drag coefficients per phase
-        self.cd2to[-n:]     = coeff.CD2_to
-        self.cd2ic[-n:]     = coeff.CD2_ic
-        self.cd2cr[-n:]     = coeff.CD2_cr
-        self.cd2ap[-n:]     = coeff.CD2_ap
-        self.cd2ld[-n:]     = coeff.CD2_ld
+        self.cd2to[-n:]     = coeff['CD2_to']
+        self.cd2ic[-n:]     = coeff['CD2_ic']
+        self.cd2cr[-n:]     = coeff['CD2_cr']
+        self.cd2ap[-n:]     = coeff['CD2_ap']
+        self.cd2ld[-n:]     = coeff['CD2_ld']
 
         # reduced climb coefficient
-        self.cred[-n:] = np.where(
-            self.jet[-n:], coeff.Cred_jet,
-            np.where(self.turbo[-n:], coeff.Cred_turboprop, coeff.Cred_piston)
-        )
-
-        # commented due to vectrization
-        # # NOTE: model only validated for jet and turbo aircraft
-        # if self.piston[-n:] and not self.warned2:
-        #     print "Using piston aircraft performance.",
-        #     print "Not valid for real performance calculations."
-        #     self.warned2 = True
+        self.cred[-n:]      = coeff['Cred']
+
+        # NOTE: model only validated for jet and turbo aircraft
+        if not self.warned2 and self.piston[-n:].any():
+            print "Using piston aircraft performance.",
+            print "Not valid for real performance calculations."
+            self.warned2 = True
 
         # performance
 
         # max climb thrust coefficients
-        self.ctcth1[-n:]    = coeff.CTC[0]  # jet/piston [N], turboprop [ktN]
-        self.ctcth2[-n:]    = coeff.CTC[1]  # [ft]
-        self.ctcth3[-n:]    = coeff.CTC[2]  # jet [1/ft^2], turboprop [N], piston [ktN]
+        self.ctcth1[-n:]    = coeff['CTC'][:, 0]  # jet/piston [N], turboprop [ktN]
+        self.ctcth2[-n:]    = coeff['CTC'][:, 1]  # [ft]
+        self.ctcth3[-n:]    = coeff['CTC'][:, 2]  # jet [1/ft^2], turboprop [N], piston [ktN]
 
         # 1st and 2nd thrust temp coefficient
-        self.ctct1[-n:]     = coeff.CTC[3]  # [k]
-        self.ctct2[-n:]     = coeff.CTC[4]  # [1/k]
+        self.ctct1[-n:]     = coeff['CTC'][:, 3]  # [k]
+        self.ctct2[-n:]     = coeff['CTC'][:, 4]  # [1/k]
         self.dtemp[-n:]     = 0.0  # [k], difference from current to ISA temperature. At the moment: 0, as ISA environment
 
         # Descent Fuel Flow Coefficients
         # Note: Ctdes,app and Ctdes,lnd assume a 3 degree descent gradient during app and lnd
-        self.ctdesl[-n:]    = coeff.CTdes_low
-        self.ctdesh[-n:]    = coeff.CTdes_high
-        self.ctdesa[-n:]    = coeff.CTdes_app
-        self.ctdesld[-n:]   = coeff.CTdes_land
+        self.ctdesl[-n:]    = coeff['CTdes_low']
+        self.ctdesh[-n:]    = coeff['CTdes_high']
+        self.ctdesa[-n:]    = coeff['CTdes_app']
+        self.ctdesld[-n:]   = coeff['CTdes_land']
 
         # transition altitude for calculation of descent thrust
-        self.hpdes[-n:]     = coeff.Hp_des * ft
+        self.hpdes[-n:]     = coeff['Hp_des'] * ft
         self.ESF[-n:]       = 1.0  # neutral initialisation
 
         # flight phase
@@ -314,28 +310,26 @@ class PerfBADA(DynamicArrays):
 
         # Thrust specific fuel consumption coefficients
         # prevent from division per zero in fuelflow calculation
-        self.cf1[-n:]       = coeff.Cf1
-        self.cf2[-n:]       = 1.0 if coeff.Cf2 < 1e-9 else coeff.Cf2
-        self.cf3[-n:]       = coeff.Cf3
-        self.cf4[-n:]       = 1.0 if coeff.Cf4 < 1e-9 else coeff.Cf4
-        self.cf_cruise[-n:] = coeff.Cf_cruise
+        self.cf1[-n:]       = coeff['Cf1']
+        self.cf2[-n:]       = np.where(coeff['Cf2'] < 1e-9, 1.0, coeff['Cf2'])
+        self.cf3[-n:]       = coeff['Cf3']
+        self.cf4[-n:]       = np.where(coeff['Cf4'] < 1e-9, 1.0, coeff['Cf4'])
+        self.cf_cruise[-n:] = coeff['Cf_cruise']
 
         self.Thr[-n:]       = 0.0
         self.D[-n:]         = 0.0
         self.ff[-n:]        = 0.0
 
         # ground
-        self.tol[-n:]       = coeff.TOL
-        self.ldl[-n:]       = coeff.LDL
-        self.ws[-n:]        = coeff.wingspan
-        self.len[-n:]       = coeff.length
+        self.tol[-n:]       = coeff['TOL']
+        self.ldl[-n:]       = coeff['LDL']
+        self.ws[-n:]        = coeff['wingspan']
+        self.len[-n:]       = coeff['length']
         # for now, BADA aircraft have the same acceleration as deceleration
-        self.gr_acc[-n:]    = coeff.gr_acc
+        self.gr_acc[-n:]    = coeff['gr_acc']
 
     def perf(self, simt):
-        if abs(simt - self.t0) >= self.dt:
-            self.t0 = simt
-        else:
+        if not self.task.due(simt):
             return
         """AIRCRAFT PERFORMANCE"""
         # BADA version
@@ -387,8 +381,9 @@ class PerfBADA(DynamicArrays):
 
         # crossover altitiude
         atrans = self.atranscl*self.climb + self.atransdes*(1-self.climb)
-        bs.traf.abco = np.array(bs.traf.alt>atrans)
-        bs.traf.belco = np.array(bs.traf.alt<atrans)
+        # (compared in pressure altitude for non-ISA conditions)
+        bs.traf.abco = np.array(bs.traf.alt + bs.traf.dpalt > atrans)
+        bs.traf.belco = np.array(bs.traf.alt + bs.traf.dpalt < atrans)
 
         # energy share factor
         self.ESF = esf(bs.traf.abco, bs.traf.belco, bs.traf.alt, bs.traf.M,\
@@ -549,7 +544,7 @@ class PerfBADA(DynamicArrays):
         self.ff = np.maximum.reduce([ffto, ffic, ffcc, ffcrl, ffcd, ffap, ffld, ffgd])/60. # convert from kg/min to kg/sec
 
         # update mass
-        self.mass = self.mass - self.ff*self.dt # Use fuelflow in kg/min
+        self.mass = self.mass - self.ff*self.task.dt # Use fuelflow in kg/min
 
 
 
@@ -577,8 +572,8 @@ class PerfBADA(DynamicArrays):
 
         # maximum altitude: hmax/act = MIN[hmo, hmax+gt*(dtemp-ctc1)+gw*(mmax-mact)]
         #                   or hmo if hmx ==0 ()
-        # at the moment just ISA atmosphere, dtemp  = 0
-        c1 = self.dtemp - self.ctct1
+        # dtemp from the non-ISA atmosphere of traffic
+        c1 = bs.traf.dtemp - self.ctct1
 
         # if c1<0: c1 = 0
         # values above 0 remain, values below are replaced through 0
@@ -0,0 +1,66 @@
+""" BlueSky kinematic-only aircraft performance model."""
+import numpy as np
+import bluesky as bs
+from bluesky.tools.aero import kts, a0, T0, gamma1, gamma2, beta, R, g0
+from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools import scheduler
+
+
+class PerfKinematic(DynamicArrays):
+    """
+    Kinematic-only performance model: aircraft follow the selected speeds,
+    altitudes and vertical speeds with a constant acceleration, without a
+    flight envelope. Drag, thrust and fuel flow are not computed, which makes
+    this model suited for large scale traffic (capacity) simulations.
+
+    Methods:
+        create(n)         : initialize new aircraft
+        delete(idx)       : remove deleted aircraft
+        perf(simt)        : update crossover altitude flags
+        limits()          : no limits on speed, altitude and vertical speed
+        acceleration(dt)  : longitudinal acceleration
+    """
+    # Nominal reference speeds for the crossover altitude of all aircraft
+    refcas = 280. * kts
+    refma  = 0.78
+
+    def __init__(self):
+        # Flight performance scheduling
+        self.task = scheduler.register('PERF', 0.1)  # update interval of performance limits
+
+        # crossover altitude according to the BADA 3.12 User Manual
+        self.atrans = (1000. / 6.5) * (T0 * (1. - ((((1. + gamma1 * (self.refcas / a0) *
+                        (self.refcas / a0)) ** gamma2) - 1.) /
+                            (((1. + gamma1 * self.refma * self.refma) ** gamma2) - 1.)) **
+                                (-beta * R / g0)))
+
+        with RegisterElementParameters(self):
+            self.ESF = np.array([])  # energy share factor (always 1)
+
+    def create(self, n=1):
+        super(PerfKinematic, self).create(n)
+        self.ESF[-n:] = 1.0
+
+    def engchange(self, idx, engid=None):
+        return False, "Kinematic performance model doesn't use engine types"
+
+    def perf(self, simt):
+        if not self.task.due(simt):
+            return
+
+        # crossover altitude (compared in pressure altitude for non-ISA conditions)
+        bs.traf.abco  = bs.traf.alt + bs.traf.dpalt > self.atrans
+        bs.traf.belco = bs.traf.alt + bs.traf.dpalt < self.atrans
+
+    def limits(self):
+        """ No flight envelope: all limits are switched off """
+        n = bs.traf.ntraf
+        bs.traf.limspd      = np.ones(n) * -999.
+        bs.traf.limspd_flag = np.zeros(n, dtype=bool)
+        bs.traf.limalt      = np.ones(n) * -999.
+        bs.traf.limvs       = np.ones(n) * -9999.
+        bs.traf.limvs_flag  = np.ones(n, dtype=bool)
+
+    def acceleration(self, simdt):
+        # all aircraft use the standard acceleration
+        return np.minimum(np.abs(bs.traf.delspd / max(1e-8, simdt)), bs.traf.ax)
@@ -27,7 +27,7 @@ class Pilot(DynamicArrays):
         #--------- Input to Autopilot settings to follow: destination or ASAS ----------
         # Convert the ASAS commanded speed from ground speed to TAS
         if bs.traf.wind.winddim > 0:
-            vwn, vwe     = bs.traf.wind.getdata(bs.traf.lat, bs.traf.lon, bs.traf.alt)
+            vwn, vwe     = bs.traf.getwind()
             asastasnorth = bs.traf.asas.spd * np.cos(np.radians(bs.traf.asas.trk)) - vwn
             asastaseast  = bs.traf.asas.spd * np.sin(np.radians(bs.traf.asas.trk)) - vwe
             asastas      = np.sqrt(asastasnorth**2 + asastaseast**2)
@@ -49,7 +49,7 @@ class Pilot(DynamicArrays):
         if bs.traf.wind.winddim > 0:
 
             # Calculate wind correction
-            vwn, vwe = bs.traf.wind.getdata(bs.traf.lat, bs.traf.lon, bs.traf.alt)
+            vwn, vwe = bs.traf.getwind()
             Vw       = np.sqrt(vwn * vwn + vwe * vwe)
             winddir  = np.arctan2(vwe, vwn)
             drift    = np.radians(self.trk) - winddir  # [rad]
@@ -70,7 +70,7 @@ class Pilot(DynamicArrays):
         # Update desired sates with values within the flight envelope
         # To do: add const Mach const CAS mode
 
-        self.spd = np.where(bs.traf.limspd_flag, vcas2tas(bs.traf.limspd, bs.traf.alt), self.spd)
+        self.spd = np.where(bs.traf.limspd_flag, vcas2tas(bs.traf.limspd, bs.traf.alt, bs.traf.atm), self.spd)
 
         # Autopilot selected altitude [m]
         self.alt = np.where(bs.traf.limalt > -900., bs.traf.limalt, self.alt)
@@ -83,7 +83,7 @@ class Pilot(DynamicArrays):
         # climb/descend above crossover: Ma = const, else CAS = const
         # ama is fixed when above crossover
         bs.traf.ama = np.where(bs.traf.abco * (bs.traf.ama == 0.),
-                                 vcas2mach(bs.traf.aspd, bs.traf.alt), bs.traf.ama)
+                                 vcas2mach(bs.traf.aspd, bs.traf.alt, bs.traf.atm), bs.traf.ama)
 
         # ama is deleted when below crossover
         bs.traf.ama = np.where(bs.traf.belco, 0.0, bs.traf.ama)
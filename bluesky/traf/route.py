@@ -48,6 +48,11 @@ class Route():
         # default: False
         self.flag_landed_runway = False
 
+        # Adding a group of waypoints (see addwptBatch): the flight plan and
+        # the active waypoint are updated once, after the last waypoint
+        self.swbatch  = False
+        self.batchupd = False
+
         return
 
     def addwptStack(self, idx, *args):  # args: all arguments of addwpt
@@ -572,6 +577,11 @@ class Route():
             #update qdr in traffic
             bs.traf.actwp.next_qdr[iac] = self.getnextqdr()
 
+        # Group of waypoints: update after the last waypoint (addwptBatch)
+        if self.swbatch:
+            self.batchupd = self.batchupd or wpok
+            return idx
+
         # Update waypoints
         if not (wptype == self.calcwp):
             self.calcfp()
@@ -583,6 +593,25 @@ class Route():
 
         return idx
 
+    def addwptBatch(self, idx, wptargs):
+        """ Add a group of waypoints: wptargs is a list with the arguments of
+            addwptStack per waypoint. The flight plan calculation and the
+            autopilot settings are done once, after the last waypoint, instead
+            of after every waypoint. Returns the results of addwptStack. """
+        self.swbatch  = True
+        self.batchupd = False
+        try:
+            results = [self.addwptStack(idx, *args) for args in wptargs]
+        finally:
+            self.swbatch = False
+
+        # Update waypoints and autopilot settings
+        self.calcfp()
+        if self.batchupd and self.iactwp >= 0 and self.iactwp < self.nwp:
+            self.direct(idx, self.wpname[self.iactwp])
+
+        return results
+
     def direct(self, idx, wpnam):
         """Set active point to a waypoint by name"""
         name = wpnam.upper().strip()
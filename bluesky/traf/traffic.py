@@ -6,11 +6,13 @@ import bluesky as bs
 from bluesky.tools import datalog, geo
 from bluesky.tools.misc import latlon2txt
 from bluesky.tools.aero import fpm, kts, ft, g0, Rearth, nm, \
-                         vatmos,  vtas2cas, vtas2mach, casormach, vcasormach
+                         vatmos,  vtas2cas, vtas2mach, casormach, vcasormach, \
+                         vatmosstate, setatmostable, vpalt
 
-from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters, ElementSubset
 
 from windsim import WindSim
+from atmosfield import AtmosField
 
 from trails import Trails
 from adsbmodel import ADSB
@@ -20,24 +22,16 @@ from autopilot import Autopilot
 from activewpdata import ActiveWaypoint
 from turbulence import Turbulence
 from area import Area
+from flightstats import FlightStats
 
 from bluesky import settings
 
 # Register settings defaults
-settings.set_variable_defaults(performance_model='bluesky', snapdt=1.0, instdt=1.0, skydt=1.0, asas_pzr=5.0, asas_pzh=1000.0)
+settings.set_variable_defaults(performance_model='bluesky', snapdt=1.0, instdt=1.0, skydt=1.0, asas_pzr=5.0, asas_pzh=1000.0,
+                               atmos_table=False, multirate_dt=0.0)
 
-try:
-    if settings.performance_model == 'bluesky':
-        print 'Using BlueSky performance model'
-        from perf import Perf
-
-    elif settings.performance_model == 'bada':
-        from perfbada import PerfBADA as Perf
-
-except ImportError as err:
-    print err.args[0]
-    print 'Falling back to BlueSky performance model'
-    from perf import Perf
+from perf import Perf
+from perfkinematic import PerfKinematic
 
 
 class Traffic(DynamicArrays):
@@ -56,9 +50,28 @@ class Traffic(DynamicArrays):
     Members: see create
     Created by  : Jacco M. Hoekstra
     """
+    # Dictionary of performance models (BADA is added when first selected)
+    perfmodels = {"BLUESKY": Perf, "KINEMATIC": PerfKinematic}
+
+    @classmethod
+    def addPerfModel(traffic, name, model):
+        traffic.perfmodels[name] = model
+
+    @classmethod
+    def getPerfModel(traffic, name):
+        """ Get the performance model class of name (None if unavailable) """
+        # BADA is only loaded on demand, as it requires the BADA files
+        if name == "BADA" and name not in traffic.perfmodels:
+            try:
+                from perfbada import PerfBADA
+                traffic.addPerfModel(name, PerfBADA)
+            except ImportError as err:
+                print err.args[0]
+        return traffic.perfmodels.get(name)
 
     def __init__(self):
         self.wind = WindSim()
+        self.atmdev = AtmosField()
 
         # Define the periodic loggers
         # ToDo: explain what these line sdo in comments (type of logs?)
@@ -114,6 +127,8 @@ class Traffic(DynamicArrays):
             self.adsb   = ADSB()
             self.trails = Trails()
             self.actwp  = ActiveWaypoint()
+            self.Turbulence = Turbulence()
+            self.stats  = FlightStats()
 
             # Traffic performance data
             self.avsdef = np.array([])  # [m/s]default vertical speed of autopilot
@@ -121,6 +136,9 @@ class Traffic(DynamicArrays):
             self.ax     = np.array([])  # [m/s2] absolute value of longitudinal accelleration
             self.bank   = np.array([])  # nominal bank angle, [radian]
             self.hdgsel = np.array([], dtype=np.bool)  # determines whether aircraft is turning
+            self.swaltsel = np.array([], dtype=np.bool)  # determines whether aircraft is climbing/descending
+            self.delspd = np.array([])  # difference selected speed and tas [m/s]
+            self.delalt = np.array([])  # difference selected altitude and altitude [m]
 
             # Crossover altitude
             self.abco   = np.array([])
@@ -140,9 +158,38 @@ class Traffic(DynamicArrays):
             self.coslat = np.array([])  # Cosine of latitude for computations
             self.eps    = np.array([])  # Small nonzero numbers
 
+            # Multi-rate integration (see update)
+            self.steady = np.array([], dtype=np.bool)  # steady flight: state updated once per dtsteady
+
         # Default bank angles per flight phase
         self.bphase = np.deg2rad(np.array([15, 35, 35, 35, 15, 45]))
 
+        # Atmospheric state (p, rho, T, a) at aircraft altitudes, computed once
+        # per time step and passed to the speed conversions
+        if settings.atmos_table:
+            setatmostable(True)
+        self.atm = vatmosstate(np.array([]))
+        self.dpalt = 0.0  # pressure altitude minus altitude [m] (non-ISA)
+
+        # Wind at aircraft positions, sampled once per position update and
+        # shared by all users within a time step (see getwind)
+        self.windnorth   = np.array([])  # [m/s]
+        self.windeast    = np.array([])  # [m/s]
+        self.windversion = -1            # wind field version of samples, -1 = invalid
+
+        # Multi-rate integration: interval of the state update of aircraft in
+        # steady flight [s], 0 = all aircraft are updated every time step
+        self.dtsteady = settings.multirate_dt
+
+        # Performance model: default BlueSky internal performance model.
+        # Insert your BADA files to the folder "BlueSky/data/coefficients/BADA"
+        # for working with EUROCONTROL`s Base of Aircraft Data revision 3.12
+        self.perf_name = settings.performance_model.upper()
+        if Traffic.getPerfModel(self.perf_name) is None:
+            print 'Falling back to BlueSky performance model'
+            self.perf_name = 'BLUESKY'
+        print 'Using %s performance model' % self.perf_name
+
         self.reset()
 
     def reset(self):
@@ -150,21 +197,22 @@ class Traffic(DynamicArrays):
         # are all reset as well, so all lat,lon,sdp etc but also objects adsb
         super(Traffic, self).reset()
         self.ntraf = 0
+        self.windversion = -1
+        self.tsteady = 0.0  # [s] time up to which the steady aircraft are updated
+        self.tcoarse = 0.0  # [s] time of the next update of all aircraft
 
         # Reset models
         self.wind.clear()
+        self.atmdev.clear()
 
-        # Build new modules for area and turbulence
+        # Build new module for area
         self.area       = Area()
-        self.Turbulence = Turbulence()
 
         # Noise (turbulence, ADBS-transmission noise, ADSB-truncated effect)
         self.setNoise(False)
 
-        # Default: BlueSky internal performance model.
-        # Insert your BADA files to the folder "BlueSky/data/coefficients/BADA"
-        # for working with EUROCONTROL`s Base of Aircraft Data revision 3.12
-        self.perf    = Perf()
+        # Performance model
+        self.perf    = Traffic.perfmodels[self.perf_name]()
         self.trails.reset()
 
     def mcreate(self, count, actype=None, alt=None, spd=None, dest=None):
@@ -247,6 +295,9 @@ class Traffic(DynamicArrays):
         self.coslat[-n:] = np.cos(np.radians(aclats))  # Cosine of latitude for flat-earth aproximations
         self.eps[-n:] = 0.01
 
+        # Positions changed: invalidate wind samples
+        self.windversion = -1
+
         # ----- Submodules of Traffic -----
         self.ap.create(n)
         self.actwp.create(n)
@@ -256,14 +307,12 @@ class Traffic(DynamicArrays):
         self.asas.create(n)
         self.perf.create(n)
         self.trails.create(n)
+        self.Turbulence.create(n)
+        self.stats.create(n)
 
     def create(self, acid=None, actype="B744", aclat=None, aclon=None, achdg=None, acalt=None, casmach=None):
         """Create an aircraft"""
 
-        # Check if not already exist
-        if self.id.count(acid.upper()) > 0:
-            return False, acid + " already exists."  # already exists do nothing
-
         # Catch missing acid, replace by a default
         if acid is None or acid == "*":
             acid = "KL204"
@@ -272,81 +321,111 @@ class Traffic(DynamicArrays):
                 flno = flno + 1
                 acid = "KL" + str(flno)
 
-        # Check for (other) missing arguments
-        if actype is None or aclat is None or aclon is None or achdg is None \
-                or acalt is None or casmach is None:
+        return self.cregroup([acid], [actype], [aclat], [aclon], [achdg], [acalt], [casmach])[0]
+
+    def cregroup(self, acids, actypes, aclats, aclons, achdgs, acalts, casmachs):
+        """ Create a group of aircraft, with one update of the traffic arrays
+            for the whole group (e.g. the CRE commands at one time of a binary
+            scenario). The arguments are lists with a value per aircraft.
+            Returns a list with the result per aircraft (True, or False and
+            a message). """
+        results = []
+        sel     = []
+        ids     = set(self.id)
+        for i, acid in enumerate(acids):
+            # Check if not already exist
+            if acid.upper() in ids:
+                results.append((False, acid + " already exists."))  # already exists do nothing
+
+            # Check for (other) missing arguments
+            elif actypes[i] is None or aclats[i] is None or aclons[i] is None or \
+                    achdgs[i] is None or acalts[i] is None or casmachs[i] is None:
+                results.append((False, "CRE: Missing one or more arguments:"
+                                       "acid,actype,aclat,aclon,achdg,acalt,acspd"))
 
-            return False, "CRE: Missing one or more arguments:"\
-                          "acid,actype,aclat,aclon,achdg,acalt,acspd"
+            else:
+                ids.add(acid.upper())
+                sel.append(i)
+                results.append(True)
 
-        super(Traffic, self).create()
+        n = len(sel)
+        if n == 0:
+            return results
+
+        super(Traffic, self).create(n)
 
         # Increase number of aircraft
-        self.ntraf = self.ntraf + 1
+        self.ntraf = self.ntraf + n
 
         # Aircraft Info
-        self.id[-1]   = acid.upper()
-        self.type[-1] = actype
+        self.id[-n:]   = [acids[i].upper() for i in sel]
+        self.type[-n:] = [actypes[i] for i in sel]
 
         # Positions
-        self.lat[-1]  = aclat
-        self.lon[-1]  = aclon
-        self.alt[-1]  = acalt
+        self.lat[-n:]  = [aclats[i] for i in sel]
+        self.lon[-n:]  = [aclons[i] for i in sel]
+        self.alt[-n:]  = [acalts[i] for i in sel]
 
-        self.hdg[-1]  = achdg
-        self.trk[-1]  = achdg
+        self.hdg[-n:]  = [achdgs[i] for i in sel]
+        self.trk[-n:]  = self.hdg[-n:]
 
         # Velocities
-        self.tas[-1], self.cas[-1], self.M[-1] = casormach(casmach, acalt)
-        self.gs[-1]      = self.tas[-1]
-        self.gsnorth[-1] = self.tas[-1] * cos(radians(self.hdg[-1]))
-        self.gseast[-1]  = self.tas[-1] * sin(radians(self.hdg[-1]))
+        self.tas[-n:], self.cas[-n:], self.M[-n:] = \
+            zip(*[casormach(casmachs[i], acalts[i]) for i in sel])
+        self.gs[-n:]      = self.tas[-n:]
+        self.gsnorth[-n:] = self.tas[-n:] * np.cos(np.radians(self.hdg[-n:]))
+        self.gseast[-n:]  = self.tas[-n:] * np.sin(np.radians(self.hdg[-n:]))
 
         # Atmosphere
-        self.p[-1], self.rho[-1], self.Temp[-1] = vatmos(acalt)
+        self.p[-n:], self.rho[-n:], self.Temp[-n:] = vatmos(self.alt[-n:])
 
         # Wind
         if self.wind.winddim > 0:
-            vnwnd, vewnd     = self.wind.getdata(self.lat[-1], self.lon[-1], self.alt[-1])
-            self.gsnorth[-1] = self.gsnorth[-1] + vnwnd
-            self.gseast[-1]  = self.gseast[-1]  + vewnd
-            self.trk[-1]     = np.degrees(np.arctan2(self.gseast[-1], self.gsnorth[-1]))
-            self.gs[-1]      = np.sqrt(self.gsnorth[-1]**2 + self.gseast[-1]**2)
+            vnwnd, vewnd      = self.wind.getdata(self.lat[-n:], self.lon[-n:], self.alt[-n:])
+            self.gsnorth[-n:] = self.gsnorth[-n:] + vnwnd
+            self.gseast[-n:]  = self.gseast[-n:]  + vewnd
+            self.trk[-n:]     = np.degrees(np.arctan2(self.gseast[-n:], self.gsnorth[-n:]))
+            self.gs[-n:]      = np.sqrt(self.gsnorth[-n:]**2 + self.gseast[-n:]**2)
 
         # Traffic performance data
         #(temporarily default values)
-        self.avsdef[-1] = 1500. * fpm   # default vertical speed of autopilot
-        self.aphi[-1]   = radians(25.)  # bank angle setting of autopilot
-        self.ax[-1]     = kts           # absolute value of longitudinal accelleration
-        self.bank[-1]   = radians(25.)
+        self.avsdef[-n:] = 1500. * fpm   # default vertical speed of autopilot
+        self.aphi[-n:]   = radians(25.)  # bank angle setting of autopilot
+        self.ax[-n:]     = kts           # absolute value of longitudinal accelleration
+        self.bank[-n:]   = radians(25.)
 
         # Crossover altitude
-        self.abco[-1]   = 0  # not necessary to overwrite 0 to 0, but leave for clarity
-        self.belco[-1]  = 1
+        self.abco[-n:]   = 0  # not necessary to overwrite 0 to 0, but leave for clarity
+        self.belco[-n:]  = 1
 
         # Traffic autopilot settings
-        self.aspd[-1]  = self.cas[-1]
-        self.aptas[-1] = self.tas[-1]
-        self.apalt[-1] = self.alt[-1]
+        self.aspd[-n:]  = self.cas[-n:]
+        self.aptas[-n:] = self.tas[-n:]
+        self.apalt[-n:] = self.alt[-n:]
 
         # Display information on label
-        self.label[-1] = ['', '', '', 0]
+        self.label[-n:] = [['', '', '', 0] for i in sel]
 
         # Miscallaneous
-        self.coslat[-1] = cos(radians(aclat))  # Cosine of latitude for flat-earth aproximations
-        self.eps[-1] = 0.01
+        self.coslat[-n:] = np.cos(np.radians(self.lat[-n:]))  # Cosine of latitude for flat-earth aproximations
+        self.eps[-n:] = 0.01
+
+        # Positions changed: invalidate wind samples
+        self.windversion = -1
 
         # ----- Submodules of Traffic -----
-        self.ap.create()
-        self.actwp.create()
-        self.pilot.create()
-        self.adsb.create()
-        self.area.create()
-        self.asas.create()
-        self.perf.create()
-        self.trails.create()
+        self.ap.create(n)
+        self.actwp.create(n)
+        self.pilot.create(n)
+        self.adsb.create(n)
+        self.area.create(n)
+        self.asas.create(n)
+        self.perf.create(n)
+        self.trails.create(n)
+        self.Turbulence.create(n)
+        self.stats.create(n)
 
-        return True
+        return results
 
     def creconfs(self, acid, actype, targetidx, dpsi, cpa, tlosh, dH=None, tlosv=None, spd=None):
         latref  = self.lat[targetidx]  # deg
@@ -407,11 +486,18 @@ class Traffic(DynamicArrays):
         # Do nothing if not found
         if idx < 0:
             return False
+        # Log the flight statistics, with the position and statistics of an
+        # aircraft in steady flight brought up to date
+        if self.steady[idx]:
+            self.PropagateSteady([idx], bs.sim.simt - self.tsteady)
+        self.stats.log(idx)
+
         # Decrease number of aircraft
         self.ntraf = self.ntraf - 1
 
         # Delete all aircraft parameters
         super(Traffic, self).delete(idx)
+        self.windversion = -1
 
         # ----- Submodules of Traffic -----
         self.perf.delete(idx)
@@ -423,8 +509,32 @@ class Traffic(DynamicArrays):
         if self.ntraf == 0:
             return
 
+        #---------- Multi-rate integration --------------------
+        # Once per dtsteady all aircraft are updated: the aircraft in steady
+        # flight are first brought up to date, before the ADS-B, autopilot
+        # and ASAS use their positions
+        multirate = self.dtsteady > 0.
+        coarse    = not multirate or simt >= self.tcoarse - 0.5 * simdt
+        if multirate and coarse:
+            self.PropagateSteady(np.where(self.steady)[0], simt - self.tsteady)
+            self.steady[:] = False
+            self.tcoarse = (round(simt / self.dtsteady) + 1) * self.dtsteady
+
         #---------- Atmosphere --------------------------------
-        self.p, self.rho, self.Temp = vatmos(self.alt)
+        if self.atmdev.active:
+            # Non-ISA: sample deviations once, all conversions use self.atm
+            self.atmdev.settime(simt)
+            self.dtemp, dpres = self.atmdev.getdata(self.lat, self.lon, self.alt)
+            self.atm   = vatmosstate(self.alt, self.dtemp, dpres)
+            self.dpalt = vpalt(self.atm[0]) - self.alt
+        else:
+            self.atm   = vatmosstate(self.alt)
+            self.dpalt = 0.0
+            self.dtemp[:] = 0.0
+        self.p, self.rho, self.Temp = self.atm[:3]
+
+        #---------- Wind (time of gridded wind field) ---------
+        self.wind.settime(simt)
 
         #---------- ADSB Update -------------------------------
         self.adsb.update(simt)
@@ -434,13 +544,28 @@ class Traffic(DynamicArrays):
         self.asas.update(simt)
         self.pilot.FMSOrAsas()
 
-        #---------- Limit Speeds ------------------------------
-        self.pilot.FlightEnvelope()
+        #---------- State update ------------------------------
+        if coarse:
+            self.UpdateState(simt, simdt)
 
-        #---------- Kinematics --------------------------------
-        self.UpdateAirSpeed(simdt, simt)
-        self.UpdateGroundSpeed(simdt)
-        self.UpdatePosition(simdt)
+            # Aircraft in steady flight until the next update of all aircraft
+            if multirate:
+                self.steady  = self.SteadyFlight(simdt)
+                self.tsteady = simt + simdt
+        else:
+            # Aircraft leaving steady flight (e.g. a new heading, speed or
+            # altitude) are brought up to date, and updated from now on
+            leave = np.where(self.steady * ~self.SteadyFlight(simdt, check=False))[0]
+            if len(leave) > 0:
+                self.PropagateSteady(leave, simt - self.tsteady)
+                self.steady[leave] = False
+
+            # Only the manoeuvring aircraft are updated
+            idx = np.where(~self.steady)[0]
+            if len(idx) == self.ntraf:
+                self.UpdateState(simt, simdt)
+            elif len(idx) > 0:
+                self.UpdateGroup(idx, simt, simdt)
 
         #---------- Performance Update ------------------------
         self.perf.perf(simt)
@@ -453,6 +578,115 @@ class Traffic(DynamicArrays):
         self.area.check(simt)
         return
 
+    def UpdateState(self, simt, simdt):
+        """ Flight envelope, kinematics and flight statistics of one time step """
+        #---------- Limit Speeds ------------------------------
+        self.pilot.FlightEnvelope()
+
+        #---------- Kinematics --------------------------------
+        self.UpdateAirSpeed(simdt, simt)
+        self.UpdateGroundSpeed(simdt)
+        self.UpdatePosition(simdt)
+        self.stats.update(simdt)
+
+    def UpdateGroup(self, idx, simt, simdt):
+        """ State update (UpdateState) of the aircraft idx only. Within the
+            update, the aircraft arrays only contain these aircraft. """
+        atm, dpalt, ntraf = self.atm, self.dpalt, self.ntraf
+        windnorth, windeast = self.windnorth, self.windeast
+
+        self.atm   = tuple(None if x is None else x[idx] for x in atm)
+        self.dpalt = dpalt[idx] if isinstance(dpalt, np.ndarray) else dpalt
+        self.ntraf = len(idx)
+        if self.windversion >= 0 and len(windnorth) == ntraf:
+            self.windnorth, self.windeast = windnorth[idx], windeast[idx]
+        else:
+            self.windversion = -1
+
+        with ElementSubset(idx, self, self.pilot, self.perf, self.stats, self.asas):
+            self.UpdateState(simt, simdt)
+
+        self.atm, self.dpalt, self.ntraf = atm, dpalt, ntraf
+        self.windnorth, self.windeast = windnorth, windeast
+        self.windversion = -1
+
+    def SteadyFlight(self, simdt, check=True):
+        """ Multi-rate integration: aircraft in steady flight, which are not
+            accelerating, turning, climbing or descending (the switches of
+            UpdateAirSpeed), and do not follow the ASAS. With check, also
+            the aircraft that may pass their active waypoint or start their
+            descent within dtsteady, and all aircraft in a non-uniform wind
+            field or with turbulence, are not steady. """
+        turnrate = np.degrees(g0 * np.tan(self.bank) / np.maximum(self.tas, self.eps))
+        delhdg   = (self.pilot.hdg - self.hdg + 180.) % 360 - 180.
+        delalt   = self.pilot.alt - self.alt
+
+        steady = (np.abs(self.pilot.spd - self.tas) <= 0.4) * \
+                 (np.abs(delhdg) <= np.abs(2. * simdt * turnrate)) * \
+                 (np.abs(delalt) <= np.maximum(10 * ft, np.abs(2. * simdt * self.vs))) * \
+                 ~self.asas.active
+        if not check:
+            return steady
+
+        # Only a uniform wind keeps the ground speed constant along the track
+        if self.wind.winddim > 1 or self.Turbulence.active:
+            return np.zeros(self.ntraf, dtype=np.bool)
+
+        # Distance to active waypoint [m], which the FMS checks with the
+        # position of the last update
+        dy = self.actwp.lat - self.lat
+        dx = (self.actwp.lon - self.lon) * self.coslat
+        dist2wp = 60. * nm * np.sqrt(dx * dx + dy * dy)
+        margin  = self.gs * self.dtsteady
+
+        return steady * ~(self.swlnav * (dist2wp < self.actwp.turndist * nm + margin)) * \
+            ~(self.swvnav * (dist2wp < self.ap.dist2vs + margin))
+
+    def PropagateSteady(self, idx, dt):
+        """ Multi-rate integration: bring the aircraft idx in steady flight
+            up to date over dt, the time since their last update. The position
+            follows from the exact solution of the position equations of
+            UpdatePosition for a constant north and east ground speed (a rhumb
+            line), the altitude and speeds are constant. """
+        if len(idx) == 0 or dt <= 0.:
+            return
+
+        lat0 = np.radians(self.lat[idx])
+        lat1 = lat0 + dt * self.gsnorth[idx] / Rearth
+
+        # Longitude rate gseast/(R cos(lat)) integrated over latitude gives the
+        # difference in Mercator latitude; for a constant latitude 1/cos(lat)
+        dlat   = lat1 - lat0
+        ismove = np.abs(dlat) > 1e-10
+        seclat = np.where(ismove, (np.log(np.tan(0.25 * np.pi + 0.5 * lat1)) -
+                                   np.log(np.tan(0.25 * np.pi + 0.5 * lat0))) /
+                          np.where(ismove, dlat, 1.0), 1.0 / np.cos(lat0))
+
+        self.lat[idx]    = np.degrees(lat1)
+        self.lon[idx]    = self.lon[idx] + np.degrees(dt * self.gseast[idx] * seclat / Rearth)
+        self.coslat[idx] = np.cos(lat1)
+        self.stats.update(dt, idx)
+        self.windversion = -1
+
+    def setMultiRate(self, dt=None):
+        """ MULTIRATE command: set the interval of the state update of aircraft
+            in steady flight (0 or OFF: update all aircraft every time step) """
+        if dt is None:
+            return True, "MULTIRATE is currently " + \
+                ("%.2f s" % self.dtsteady if self.dtsteady > 0. else "OFF")
+        if isinstance(dt, str):
+            if dt.upper() not in ("OFF", "OF"):
+                return False, "MULTIRATE dt/OFF"
+            dt = 0.0
+
+        # Bring all aircraft up to date, the new interval starts at the next
+        # time step
+        self.PropagateSteady(np.where(self.steady)[0], bs.sim.simt - self.tsteady)
+        self.steady[:] = False
+        self.dtsteady  = max(0.0, dt)
+        self.tcoarse   = 0.0
+        return True
+
     def UpdateAirSpeed(self, simdt, simt):
         # Acceleration
         self.delspd = self.pilot.spd - self.tas
@@ -463,8 +697,8 @@ class Traffic(DynamicArrays):
         # Update velocities
         self.tas = self.tas + swspdsel * ax * np.sign(self.delspd) * simdt
 
-        self.cas = vtas2cas(self.tas, self.alt)
-        self.M   = vtas2mach(self.tas, self.alt)
+        self.cas = vtas2cas(self.tas, self.alt, self.atm)
+        self.M   = vtas2mach(self.tas, self.alt, self.atm)
 
         # Turning
         turnrate = np.degrees(g0 * np.tan(self.bank) / np.maximum(self.tas, self.eps))
@@ -489,7 +723,7 @@ class Traffic(DynamicArrays):
             self.trk = self.hdg
 
         else:
-            windnorth, windeast = self.wind.getdata(self.lat, self.lon, self.alt)
+            windnorth, windeast = self.getwind()
             self.gsnorth  = self.tas * np.cos(np.radians(self.hdg)) + windnorth
             self.gseast   = self.tas * np.sin(np.radians(self.hdg)) + windeast
 
@@ -503,6 +737,22 @@ class Traffic(DynamicArrays):
         self.coslat = np.cos(np.deg2rad(self.lat))
         self.lon = self.lon + np.degrees(simdt * self.gseast / self.coslat / Rearth)
 
+        # Aircraft have moved: wind needs to be sampled again
+        self.windversion = -1
+
+    def getwind(self):
+        """ Get north and east wind components at the aircraft positions.
+            The wind field is only sampled when the aircraft have moved or
+            the wind field has changed since the last call, so all users
+            within one time step share the same interpolation. """
+        if self.windversion != self.wind.version or \
+                len(self.windnorth) != self.ntraf:
+            self.windnorth, self.windeast = \
+                self.wind.getdata(self.lat, self.lon, self.alt)
+            self.windversion = self.wind.version
+
+        return self.windnorth, self.windeast
+
     def id2idx(self, acid):
         """Find index of aircraft id"""
         try:
@@ -519,14 +769,34 @@ class Traffic(DynamicArrays):
         self.adsb.SetNoise(noise)
         return True
 
-    def engchange(self, acid, engid):
+    def engchange(self, acid, engid=None):
         """Change of engines"""
-        self.perf.engchange(acid, engid)
-        return
+        return self.perf.engchange(acid, engid)
+
+    def setPerfModel(self, name=""):
+        """ Select the performance model. Existing aircraft are initialised
+            in the new model, so the model can be switched during a run. """
+        available = str.join(", ", sorted(set(Traffic.perfmodels.keys() + ["BADA"])))
+        if name == "":
+            return True, ("Current performance model: " + self.perf_name +
+                          "\nAvailable performance models: " + available)
+
+        if Traffic.getPerfModel(name) is None:
+            return False, (name + " is not available.\nAvailable performance models: " + available)
+
+        self.perf_name = name
+        self.perf      = Traffic.perfmodels[name]()
+        if self.ntraf > 0:
+            self.perf.create(self.ntraf)
+        # The PERF task keeps its interval; the new model updates in the next step
+        self.perf.task.reset(bs.sim.simt)
+        return True
 
     def move(self, idx, lat, lon, alt=None, hdg=None, casmach=None, vspd=None):
         self.lat[idx]      = lat
         self.lon[idx]      = lon
+        self.steady[idx]   = False
+        self.windversion   = -1
 
         if alt:
             self.alt[idx]   = alt
@@ -64,9 +64,9 @@ class Trails(DynamicArrays):
     def create(self,n=1):
         super(Trails, self).create(n)
 
-        self.accolor[-1] = self.defcolor
-        self.lastlat[-1] = bs.traf.lat[-1]
-        self.lastlon[-1] = bs.traf.lon[-1]
+        self.accolor[-n:] = [self.defcolor] * n
+        self.lastlat[-n:] = bs.traf.lat[-n:]
+        self.lastlon[-n:] = bs.traf.lon[-n:]
 
     def update(self, t):
         self.acid    = bs.traf.id
@@ -1,12 +1,43 @@
-""" Simple turbulence implementation."""
+""" Turbulence implementation: first-order Markov (Dryden-type) gust model."""
 import numpy as np
 import bluesky as bs
 from bluesky.tools.aero import Rearth
+from bluesky.tools.dynamicarrays import DynamicArrays, RegisterElementParameters
+from bluesky.tools.randomstreams import getstream
 
 
-class Turbulence:
-    """ Simple turbulence implementation."""
+class Turbulence(DynamicArrays):
+    """ Turbulence as correlated gust velocities per aircraft.
+
+        Each gust component follows a first-order Gauss-Markov process, the
+        discrete form of the Dryden spectrum for a given length scale L:
+
+            u(t+dt) = phi * u(t) + sd * sqrt(1 - phi^2) * w,  phi = exp(-V dt / L)
+
+        with w drawn from the dedicated TURBULENCE random stream, so runs
+        are reproducible per subsystem (see SEED).
+
+        The standards keep the unit of the former white position noise,
+        m/sqrt(s): the position spread after a time t is standard * sqrt(t).
+        For times longer than the correlation time L/V, the gust velocities
+        give the same spread with sd = standard * sqrt(V / (2 L)). """
     def __init__(self):
+        with RegisterElementParameters(self):
+            # Gust velocity state [m/s] per aircraft
+            self.uhf  = np.array([])  # horizontal flight direction
+            self.uhw  = np.array([])  # horizontal wing direction
+            self.ualt = np.array([])  # vertical
+
+        self.rng    = getstream('TURBULENCE')
+        self.active = False
+        self.SetStandards([0, 0.1, 0.1])
+
+        # Dryden length scales [m] (horizontal, horizontal, vertical)
+        # for altitudes above 2000 ft: Lu = Lv = 2 Lw = 1750 ft
+        self.length = np.array([533.4, 533.4, 266.7])
+
+    def reset(self):
+        super(Turbulence, self).reset()
         self.active = False
         self.SetStandards([0, 0.1, 0.1])
 
@@ -14,7 +45,7 @@ class Turbulence:
         self.active = n
 
     def SetStandards(self,s):
-        self.sd = np.array(s) # m/s standard turbulence  (nonnegative)
+        self.sd = np.array(s) # m/sqrt(s) standard turbulence  (nonnegative)
         # in (horizontal flight direction, horizontal wing direction, vertical)
         self.sd=np.where(self.sd>1e-6,self.sd,1e-6)
 
@@ -22,22 +53,24 @@ class Turbulence:
         if not self.active:
             return
 
-        timescale=np.sqrt(dt)
-        # Horizontal flight direction
-        turbhf=np.random.normal(0,self.sd[0]*timescale,bs.traf.ntraf) #[m]
-
-        # Horizontal wing direction
-        turbhw=np.random.normal(0,self.sd[1]*timescale,bs.traf.ntraf) #[m]
+        # One draw of white noise for all components of all aircraft
+        w = self.rng.standard_normal((3, bs.traf.ntraf))
 
-        # Vertical direction
-        turbalt=np.random.normal(0,self.sd[2]*timescale,bs.traf.ntraf) #[m]
+        # Propagate the gust velocities in place, correlation time L/V
+        V = np.maximum(bs.traf.tas, 1.0)
+        for u, sd, L, wi in zip((self.uhf, self.uhw, self.ualt), self.sd, self.length, w):
+            phi = np.exp(-dt / L * V)
+            u  *= phi
+            wi *= sd * np.sqrt(0.5 * V / L * (1. - phi * phi))  # scale noise row in place
+            u  += wi
 
         trkrad=np.radians(bs.traf.trk)
         # Lateral, longitudinal direction
-        turblat=np.cos(trkrad)*turbhf-np.sin(trkrad)*turbhw #[m]
-        turblon=np.sin(trkrad)*turbhf+np.cos(trkrad)*turbhw #[m]
+        costrk, sintrk = np.cos(trkrad), np.sin(trkrad)
+        turblat=(costrk*self.uhf-sintrk*self.uhw)*dt #[m]
+        turblon=(sintrk*self.uhf+costrk*self.uhw)*dt #[m]
 
         # Update the aircraft locations
-        bs.traf.alt = bs.traf.alt + turbalt
+        bs.traf.alt = bs.traf.alt + self.ualt*dt
         bs.traf.lat = bs.traf.lat + np.degrees(turblat/Rearth)
         bs.traf.lon = bs.traf.lon + np.degrees(turblon/Rearth/bs.traf.coslat)
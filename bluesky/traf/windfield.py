@@ -1,7 +1,8 @@
 """ Wind implementation for BlueSky."""
 from numpy import array, sin, cos, arange, radians, ones, append, ndarray, \
                   amin, minimum, repeat, delete, zeros, around, maximum, floor, \
-                  interp, pi
+                  interp, pi, searchsorted, clip, memmap, dtype, fromfile, \
+                  float32, float64, int32, asarray
 
 from bluesky.tools.aero import ft
 
@@ -23,6 +24,14 @@ class Windfield():
 
             remove(idx) = remove a defined profile using the index
 
+            loadgrid(fname)
+                       = load a gridded wind field from a binary file,
+                         (see savegrid for the format), which overrides
+                         the wind vectors defined with addpoint
+
+            settime(t) = set the time [s] used to interpolate between the
+                         snapshots of a gridded wind field
+
         Members:
             lat(nvec)          = latitudes of wind definitions
             lon(nvec)          = longitudes of wind definitions
@@ -37,7 +46,18 @@ class Windfield():
                           2 = 2D field (no alt profiles),
                           3 = 3D field (alt dependent wind at some points)
 
+            version   = change counter, increased on every modification of
+                        the field (used to invalidate cached wind samples)
+
+            grid      = gridded wind field (dict with axes "time", "alt",
+                        "lat", "lon" and (memory-mapped) data arrays
+                        "vnorth" and "veast" of shape (ntime,nalt,nlat,nlon)),
+                        None when no gridded field is loaded
+
     """
+    # Identification string at the start of a wind grid file
+    gridmagic = b"BSWINDGRID1"
+
     def __init__(self):
         # For altitude use fixed axis to allow vectorisation later
         self.altmax  = 45000. * ft   # [m]
@@ -51,6 +71,13 @@ class Windfield():
         # List of indices of points with an altitude profile (for 3D check)
         self.iprof   = []
 
+        # Change counter, increased whenever the field is modified
+        self.version = 0
+
+        # Gridded wind field and time to interpolate its snapshots
+        self.grid    = None
+        self.gridt   = 0.0
+
         # Clear actual field
         self.clear()
         return
@@ -65,6 +92,8 @@ class Windfield():
         self.vnorth  = array([[]])
         self.veast   = array([[]])
         self.nvec    = 0
+        self.grid    = None
+        self.version += 1
         return
 
     def addpoint(self,lat,lon,winddir,windspd,windalt=None):
@@ -117,6 +146,7 @@ class Windfield():
             self.iprof.append(idx)
 
         self.nvec = self.nvec+1
+        self.version += 1
 
         return idx # return index of added point
 
@@ -143,7 +173,10 @@ class Windfield():
             alt = zeros(npos)
 
         # Check dimension of wind field
-        if self.winddim == 0:   # None = no wind
+        if self.grid is not None: # Gridded field: interpolate in grid
+            vnorth, veast = self.getgriddata(lat.ravel(), lon.ravel(), alt)
+
+        elif self.winddim == 0:   # None = no wind
             vnorth = zeros(npos)
             veast  = zeros(npos)
 
@@ -222,7 +255,121 @@ class Windfield():
             if idx in self.iprof:
                 self.iprof.remove(idx)
 
-            if self.winddim<3 or len(self.iprof)==0 or len(self.lat)==0:
+            if self.grid is None and (self.winddim<3 or len(self.iprof)==0 \
+                                      or len(self.lat)==0):
                 self.winddim = min(2,len(self.lat)) # Check for 0, 1D, 2D or 3D
 
+            self.version += 1
+
         return
+
+    def settime(self, t):
+        """ Set the time [s] for interpolation between grid snapshots """
+        if self.grid is not None and len(self.grid["time"]) > 1 \
+                and t != self.gridt:
+            self.version += 1
+        self.gridt = t
+
+    def loadgrid(self, fname):
+        """ Load a gridded wind field from a binary wind grid file (see
+            savegrid). The wind data itself is memory-mapped, so only the
+            parts of the grid that are sampled are read from disk. """
+        grid = loadgridfile(fname, self.gridmagic, ("vnorth", "veast"))
+
+        # The grid replaces the current field
+        self.clear()
+        self.grid    = grid
+        self.winddim = 3
+
+        return grid["vnorth"].shape
+
+    @staticmethod
+    def savegrid(fname, time, alt, lat, lon, vnorth, veast):
+        """ Write a gridded wind field (north and east wind [m/s]) to a binary
+            wind grid file, e.g. to convert GRIB or NetCDF weather data with
+            external tools. See savegridfile for the layout. """
+        savegridfile(fname, Windfield.gridmagic, time, alt, lat, lon,
+                     vnorth, veast)
+
+    def getgriddata(self, lat, lon, alt):
+        """ Interpolate the gridded wind field (linear in time, altitude,
+            latitude and longitude) at the given positions. """
+        return interpgrid(self.grid, ("vnorth", "veast"), self.gridt,
+                          lat, lon, alt)
+
+
+def loadgridfile(fname, magic, names):
+    """ Read the axes of a binary grid file and memory-map its data arrays.
+        Returns a dict with axes "time", "alt", "lat", "lon" and an array
+        of shape (ntime,nalt,nlat,nlon) for each of the given names. """
+    with open(fname, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise IOError(fname + " is not a valid BlueSky grid file")
+
+        ntime, nalt, nlat, nlon = fromfile(f, dtype=int32, count=4)
+        grid = dict()
+        for name, n in (("time", ntime), ("alt", nalt),
+                        ("lat", nlat), ("lon", nlon)):
+            grid[name] = fromfile(f, dtype=float64, count=n)
+        offset = f.tell()
+
+    shape = (ntime, nalt, nlat, nlon)
+    size  = ntime * nalt * nlat * nlon * dtype(float32).itemsize
+    for i, name in enumerate(names):
+        grid[name] = memmap(fname, dtype=float32, mode='r',
+                            offset=offset + i * size, shape=shape)
+    return grid
+
+
+def savegridfile(fname, magic, time, alt, lat, lon, *data):
+    """ Write a binary grid file.
+
+        File layout: magic string, 4 x int32 (ntime,nalt,nlat,nlon),
+        float64 axes time [s], alt [m], lat [deg], lon [deg] (all
+        ascending), followed by the float32 data arrays of shape
+        (ntime,nalt,nlat,nlon) in the order given. """
+    axes  = [asarray(a, dtype=float64).ravel() for a in (time, alt, lat, lon)]
+    shape = tuple(len(a) for a in axes)
+    with open(fname, 'wb') as f:
+        f.write(magic)
+        array(shape, dtype=int32).tofile(f)
+        for a in axes:
+            a.tofile(f)
+        for v in data:
+            asarray(v, dtype=float32).reshape(shape).tofile(f)
+
+
+def interpgrid(grid, names, t, lat, lon, alt):
+    """ Interpolate the named arrays of a grid (linear in time, altitude,
+        latitude and longitude) at time t and the given positions. """
+    # Interpolation indices and factors per axis, time is scalar
+    it0, it1, ft = gridindex(grid["time"], asarray([t]))
+    ia0, ia1, fa = gridindex(grid["alt"], alt)
+    iy0, iy1, fy = gridindex(grid["lat"], lat)
+    ix0, ix1, fx = gridindex(grid["lon"], lon)
+
+    # Sum weighted contributions of the (up to) 16 surrounding grid points
+    result = [zeros(len(lat)) for name in names]
+    for it, wt in ((it0[0], 1. - ft[0]), (it1[0], ft[0])):
+        if wt <= 0.:
+            continue
+        for ia, wa in ((ia0, 1. - fa), (ia1, fa)):
+            for iy, wy in ((iy0, 1. - fy), (iy1, fy)):
+                for ix, wx in ((ix0, 1. - fx), (ix1, fx)):
+                    w = wt * wa * wy * wx
+                    for value, name in zip(result, names):
+                        value += w * grid[name][it, ia, iy, ix]
+
+    return result
+
+
+def gridindex(axis, x):
+    """ Get lower and upper index and interpolation factor of values x on
+        an ascending grid axis. Values outside the axis are clipped. """
+    n  = len(axis)
+    x  = clip(x, axis[0], axis[-1])
+    i0 = clip(searchsorted(axis, x, side='right') - 1, 0, max(0, n - 2))
+    i1 = minimum(i0 + 1, n - 1)
+    dx = axis[i1] - axis[i0]
+    f  = (x - axis[i0]) / maximum(dx, 1e-20) * (dx > 0.)
+    return i0, i1, f
@@ -1,6 +1,8 @@
+import os
 from numpy import arctan2,degrees,array,sqrt # to allow arrays, their functions and types
 from windfield import *
 from bluesky.tools.aero import kts
+from bluesky import settings
 
 class WindSim(Windfield):
     def add(self, *arg):
@@ -38,6 +40,23 @@ class WindSim(Windfield):
 
         return True
 
+    def load(self, fname):
+        """ Load a gridded wind field file (stack command WINDFILE) """
+        # Without a path, look for the file in the scenario folder
+        if not os.path.exists(fname) and len(os.path.dirname(fname)) == 0:
+            fname = os.path.join(settings.scenario_path, fname)
+
+        if not os.path.exists(fname):
+            return False, "Error: cannot find file: " + fname
+
+        try:
+            ntime, nalt, nlat, nlon = self.loadgrid(fname)
+        except (IOError, ValueError) as err:
+            return False, str(err)
+
+        return True, "Loaded wind grid with %d snapshot(s) of %dx%dx%d " \
+                     "(alt x lat x lon) points" % (ntime, nalt, nlat, nlon)
+
     def get(self,lat,lon,alt=None):
         """ Get wind vector at gioven position (and optioanlly altitude)"""
 
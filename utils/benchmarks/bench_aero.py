@@ -0,0 +1,57 @@
+""" Benchmark of the vectorised speed conversions in bluesky.tools.aero
+
+    Compares for n aircraft:
+      - the conversions evaluating the atmosphere themselves (old usage)
+      - the conversions with one precomputed atmospheric state (vatmosstate)
+      - the same with the float32 atmosphere lookup table
+
+    Usage: python bench_aero.py [n_aircraft] [n_repeat]
+"""
+import sys
+import os
+import imp
+from timeit import timeit
+import numpy as np
+
+# Load aero module directly, to avoid initialising the complete simulator
+aero = imp.load_source('aero', os.path.join(os.path.dirname(__file__),
+                       '..', '..', 'bluesky', 'tools', 'aero.py'))
+
+n       = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+nrepeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+alt = np.random.uniform(0., 12500., n)
+tas = np.random.uniform(70., 260., n)
+cas = aero.vtas2cas(tas, alt)
+M   = aero.vtas2mach(tas, alt)
+
+
+def conversions(atm=None):
+    aero.vtas2cas(tas, alt, atm)
+    aero.vcas2tas(cas, alt, atm)
+    aero.vtas2mach(tas, alt, atm)
+    aero.vmach2tas(M, alt, atm)
+    aero.vtas2eas(tas, alt, atm)
+    aero.veas2tas(tas, alt, atm)
+    aero.vmach2cas(M, alt, atm)
+    aero.vcas2mach(cas, alt, atm)
+
+
+def percall(fun):
+    return 1000. * timeit(fun, number=nrepeat) / nrepeat
+
+
+print "%d aircraft, %d repetitions" % (n, nrepeat)
+print "Atmosphere per conversion:     %8.3f ms" % percall(conversions)
+print "Precomputed atmosphere:        %8.3f ms" % percall(
+    lambda: conversions(aero.vatmosstate(alt)))
+
+aero.setatmostable(True)
+print "Precomputed, float32 table:    %8.3f ms" % percall(
+    lambda: conversions(aero.vatmosstate(alt)))
+
+# Accuracy of the lookup table w.r.t. the exact atmosphere
+exact = aero.vatmos(alt)
+table = aero.vatmosstate(alt)
+for name, ex, tab in zip(("p", "rho", "T"), exact, table):
+    print "Max. relative table error %-3s: %.2e" % (name, np.max(np.abs(tab / ex - 1.)))
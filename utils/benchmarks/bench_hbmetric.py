@@ -0,0 +1,86 @@
+""" Regression check and benchmark of the HB complexity metric (metric_HB)
+
+    Regression: the complexity of fixed, randomly generated traffic scenarios
+    is compared with reference values of the earlier implementation, which
+    evaluated the two-circle method on full ntraf x ntraf matrices. The
+    distances to the intruders now use the earth radius at the mean latitude,
+    which changes the scores in the order of 1e-4, hence the tolerance.
+
+    Benchmark: cpu time of one evaluation of the metric for 500 and 2000
+    aircraft. For reference, the matrix implementation took about 1 s and
+    15 s for these numbers of aircraft.
+
+    Usage (from the BlueSky root directory):
+        python utils/benchmarks/bench_hbmetric.py [nrepeat]
+"""
+import sys
+import os
+import time
+import numpy as np
+
+# Run from the BlueSky root directory, where settings.cfg is found
+sys.path.insert(0, os.getcwd())
+from bluesky.traf.metric import metric_HB
+from bluesky.tools import geo
+from bluesky.tools.aero import kts, nm
+
+nrepeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+# Scenarios (n aircraft, seed, radius [nm]) with the reference total
+# complexity, number of aircraft with a score and number within 5 nm
+reference = [(100, 1, 60.,  16.660476976046194, 12, 5),
+             (300, 2, 150., 14.33615879823188,   7, 6),
+             (500, 3, 80., 147.49761207672447, 116, 103)]
+rtol = 1e-3
+
+
+def scenario(n, seed, radius=150.):
+    """ n aircraft within radius around 52N, 4E, mostly at flight levels,
+        30% of them climbing or descending """
+    rng = np.random.RandomState(seed)
+    lat, lon = geo.qdrpos(52., 4., rng.uniform(0., 360., n),
+                          radius * np.sqrt(rng.uniform(0., 1., n)))
+    alt = rng.randint(25, 38, n) * 1000. + \
+        (rng.uniform(0., 1., n) < 0.3) * rng.uniform(-1000., 1000., n)
+    spd = rng.uniform(400., 500., n) * kts / nm
+    trk = rng.uniform(0., 360., n)
+    return lat, lon, alt, spd, trk
+
+
+def complexity(lat, lon, alt, spd, trk):
+    """ Evaluate the metric, returns the metric and the cpu time """
+    hb = metric_HB(np.zeros((4, 2)))
+    hb.lat, hb.lon, hb.alt, hb.spd, hb.trk = lat, lon, alt, spd, trk
+    hb.ntraf = len(lat)
+    hb.step  = 0
+
+    # Suppress the output of the metric
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    t0 = time.clock()
+    hb.apply_twoCircleMethod()
+    tcpu = time.clock() - t0
+    sys.stdout = stdout
+    return hb, tcpu
+
+
+np.seterr(all='ignore')
+ok = True
+print "Regression check, scenarios: n, seed, radius [nm]"
+for n, seed, radius, total, nscore, nlos in reference:
+    hb, _ = complexity(*scenario(n, seed, radius))
+    result = (hb.complexity[0][0], np.count_nonzero(hb.compl_ac),
+              np.count_nonzero(hb.compl_ac == 1.))
+    passed = abs(result[0] - total) <= rtol * total and result[1:] == (nscore, nlos)
+    ok = ok and passed
+    print "%4d %d %5.0f: complexity %10.4f (ref %10.4f), scored %3d (ref %3d), " \
+        "within range %3d (ref %3d) %s" % ((n, seed, radius, result[0], total,
+        result[1], nscore, result[2], nlos, "OK" if passed else "FAILED"))
+
+print
+print "Benchmark, cpu time per evaluation (%d repeats)" % nrepeat
+for n in (500, 2000):
+    sc    = scenario(n, 7)
+    tcpu  = min(complexity(*sc)[1] for i in range(nrepeat))
+    print "%5d aircraft: %.3f s" % (n, tcpu)
+
+sys.exit(0 if ok else 1)
@@ -0,0 +1,88 @@
+""" Regression check of the periodic loggers with traffic created after the
+    logger was switched on (SNAPLOG ON 1, followed by CRE)
+
+    With zero aircraft, the list columns of the logger (e.g. id and type) are
+    empty when the logger is opened, so that their type is not known yet.
+    These columns used to get the float format, and the first row with
+    traffic failed with "TypeError: float argument required, not str".
+
+    The check logs a few seconds of traffic for the text and binary formats,
+    with and without the writer thread, and compares the log files with the
+    traffic data.
+
+    Usage (from the BlueSky root directory):
+        python utils/benchmarks/check_datalog.py
+"""
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Run from the BlueSky root directory, where settings.cfg is found
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.join(os.getcwd(), 'utils'))
+import bluesky as bs
+from bluesky import settings
+from bluesky.tools import datalog
+from readlog import readlog
+
+acids   = ['KL204', 'KL205', 'KL206']
+nsteps  = 4
+
+
+def logtraffic(binary, logasync):
+    """ Switch SNAPLOG on with zero aircraft, create traffic and log it for
+        nsteps seconds. Returns the name of the log file. """
+    bs.traf.reset()
+    datalog.reset()
+    settings.log_async = logasync
+    logger = datalog.periodicloggers['SNAPLOG']
+
+    datalog.preupdate(0.0)
+    logger.stackio('ON', 1.0, 'BINARY' if binary else 'TEXT')
+    fname = logger.file.name
+    logger.log()
+
+    for i, acid in enumerate(acids):
+        bs.traf.create(acid, 'B744', 52.0 + 0.1 * i, 4.0, 90.0, 3000.0, 120.0)
+
+    for t in range(1, nsteps + 1):
+        datalog.preupdate(float(t))
+        logger.log()
+    logger.close()
+    return fname
+
+
+def readtext(fname):
+    """ Rows of a text log file, without the header """
+    with open(fname) as f:
+        return [line.strip().split(',') for line in f if not line.startswith('#')]
+
+
+def check(binary, logasync):
+    fname = logtraffic(binary, logasync)
+    if binary:
+        header, columns = readlog(fname)
+        ids  = list(columns['id'])
+        lats = columns['lat']
+    else:
+        rows = readtext(fname)
+        ids  = [row[1] for row in rows]
+        lats = np.array([float(row[3]) for row in rows])
+
+    ok = ids == nsteps * acids and np.allclose(lats, np.tile(bs.traf.lat, nsteps))
+    print '%-6s %-5s %s' % ('BINARY' if binary else 'TEXT',
+                            'async' if logasync else 'sync', 'OK' if ok else 'FAILED')
+    return ok
+
+
+settings.log_path = tempfile.mkdtemp()
+try:
+    results = [check(binary, logasync) for binary in (False, True) for logasync in (False, True)]
+finally:
+    datalog.reset()
+    shutil.rmtree(settings.log_path)
+
+if not all(results):
+    sys.exit(1)
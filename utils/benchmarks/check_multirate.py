@@ -0,0 +1,83 @@
+""" Accuracy and speed check of the multi-rate integration (MULTIRATE command)
+
+    Runs a scenario twice: with the uniform update of all aircraft every simdt
+    (the baseline), and with multi-rate integration, where the state of the
+    aircraft in steady flight is updated once per dtsteady. The trajectories
+    are sampled after the update of all aircraft, at a multiple of dtsteady,
+    and compared per aircraft. Random traffic (MCRE) is the same in both runs.
+
+    Usage (from the BlueSky root directory):
+        python utils/benchmarks/check_multirate.py scenfile [dtsteady] [tend] [tsample]
+"""
+import sys
+import os
+import time
+import numpy as np
+
+# Run from the BlueSky root directory, where settings.cfg is found
+sys.path.insert(0, os.getcwd())
+import bluesky as bs
+from bluesky import stack
+from bluesky.tools import geo
+from bluesky.tools.aero import nm, ft
+
+fname    = sys.argv[1]
+dtsteady = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+tend     = float(sys.argv[3]) if len(sys.argv) > 3 else 3600.
+tsample  = float(sys.argv[4]) if len(sys.argv) > 4 else 10.
+
+# Samples are taken when all aircraft are up to date
+tsample  = max(1, round(tsample / dtsteady)) * dtsteady
+
+
+def run(dt):
+    """ Run the scenario with state update interval dt for steady aircraft,
+        returns the sampled tracks {(acid, t): (lat, lon, alt)}, the cpu time
+        spent in the traffic update and the mean fraction of steady aircraft """
+    stack.setSeed(1)
+    stack.ic(fname)
+    bs.traf.setMultiRate(dt)
+    simt, simdt = 0.0, bs.sim.simdt
+    tnext   = tsample
+    tracks  = dict()
+    tcpu    = 0.0
+    nsteady = []
+    while simt < tend:
+        stack.checkfile(simt)
+        stack.process()
+        t0 = time.clock()
+        bs.traf.update(simt, simdt)
+        tcpu += time.clock() - t0
+
+        if simt >= tnext - 0.5 * simdt:
+            tnext += tsample
+            for i, acid in enumerate(bs.traf.id):
+                tracks[(acid, round(simt + simdt, 2))] = \
+                    (bs.traf.lat[i], bs.traf.lon[i], bs.traf.alt[i])
+        if bs.traf.ntraf > 0:
+            nsteady.append(np.count_nonzero(bs.traf.steady) / float(bs.traf.ntraf))
+        simt += simdt
+
+    return tracks, tcpu, np.mean(nsteady) if nsteady else 0.0
+
+
+stack.init()
+base, tbase, _ = run(0.0)
+mrate, tmrate, fsteady = run(dtsteady)
+bs.traf.setMultiRate(0.0)
+
+keys  = sorted(set(base.keys()) & set(mrate.keys()))
+lat0, lon0, alt0 = np.array([base[k] for k in keys]).T
+lat1, lon1, alt1 = np.array([mrate[k] for k in keys]).T
+dhor = geo.kwikdist(lat0, lon0, lat1, lon1) * nm
+dalt = np.abs(alt1 - alt0)
+
+print "Scenario %s, %.0f s, simdt = %.2f s, multi-rate dt = %.2f s" % \
+    (fname, tend, bs.sim.simdt, dtsteady)
+print "Samples compared:            %d (%d only in one run)" % \
+    (len(keys), len(set(base.keys()) ^ set(mrate.keys())))
+print "Aircraft in steady flight:   %.0f%% (mean over the run)" % (100. * fsteady)
+print "Horizontal error [m]:        max %.1f, mean %.2f" % (dhor.max(), dhor.mean())
+print "Altitude error [ft]:         max %.1f, mean %.2f" % (dalt.max() / ft, dalt.mean() / ft)
+print "Traffic update cpu time [s]: uniform %.2f, multi-rate %.2f (%.1fx)" % \
+    (tbase, tmrate, tbase / max(1e-6, tmrate))
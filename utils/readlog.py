@@ -0,0 +1,81 @@
+""" Reader of BlueSky binary log files (logger ON [dt] BINARY)
+
+    A binary log file starts with the same text header as the text log files,
+    with the column names in the last header line. The data follows in chunks,
+    one chunk per log time: the simulation time and the number of columns,
+    followed by the columns in .npy format.
+
+    Usage as a module:
+        from readlog import readlog
+        header, columns = readlog('output/SNAPLOG_scen_20170101_12-00-00.blog')
+        columns['simt'], columns['lat'], ...
+
+    Usage from the command line, to convert a binary log to a text log:
+        python utils/readlog.py logfile.blog [outfile]
+"""
+import sys
+import os
+from collections import OrderedDict
+import numpy as np
+
+binlogmarker = 'BlueSky binary log, version 1'
+
+
+def readlog(fname):
+    """ Read binary log file fname. Returns the header lines and an ordered
+        dict with the columns as numpy arrays, the first column is simt """
+    with open(fname, 'rb') as f:
+        if f.readline().strip() != '# ' + binlogmarker:
+            raise IOError(fname + ' is not a BlueSky binary log file')
+
+        # Text header, the last line contains the column names
+        header = []
+        while True:
+            pos  = f.tell()
+            line = f.readline()
+            if not line.startswith('# '):
+                f.seek(pos)
+                break
+            header.append(line[2:].rstrip('\n'))
+        names = [name.strip() for name in header.pop().split(',')]
+
+        # Data chunks
+        chunks = []
+        while True:
+            # Stop at the end of the file
+            pos = f.tell()
+            if len(f.read(1)) == 0:
+                break
+            f.seek(pos)
+            simt, ncols = np.load(f)
+            chunk = [np.load(f) for i in range(int(ncols))]
+            chunks.append([np.repeat(simt, len(chunk[0]))] + chunk)
+
+    if not chunks:
+        return header, OrderedDict((name, np.array([])) for name in names)
+
+    # Chunks can contain additional unnamed columns
+    names += ['col%d' % i for i in range(len(names), len(chunks[0]))]
+    return header, OrderedDict((name, np.concatenate([chunk[i] for chunk in chunks]))
+                               for i, name in enumerate(names))
+
+
+def writetext(header, columns, fname):
+    """ Write the log columns as a text log file """
+    with open(fname, 'w') as f:
+        for line in header:
+            f.write('# ' + line + '\n')
+        f.write('# ' + str.join(', ', columns.keys()) + '\n')
+        np.savetxt(f, np.vstack([col.astype(str) for col in columns.values()]).T,
+                   delimiter=',', newline='\n', fmt='%s')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print __doc__
+        sys.exit()
+    header, columns = readlog(sys.argv[1])
+    outfile = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(sys.argv[1])[0] + '.log'
+    writetext(header, columns, outfile)
+    print 'Converted %d rows of %d columns to %s' % \
+        (len(columns['simt']), len(columns), outfile)